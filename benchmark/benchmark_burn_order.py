@@ -0,0 +1,71 @@
+from pathlib import Path
+from time import perf_counter
+import argparse
+import json
+import numpy as np
+
+from attractor_finder.functions import frame_bounds
+from attractor_finder.renderer_batch import compute_burn_inline, compute_burn_sorted
+from attractor_finder.summary import OrbitSummary
+
+from benchmark_suite import synthetic_trajectory
+
+ROOT = Path(__file__).parents[1]
+
+
+def burn_args(data, xres, yres, summary, alpha = 0.025):
+	e = summary.extents()
+	xmin, ymin, xrng, yrng = frame_bounds(e['xmin'], e['xrng'], e['ymin'], e['yrng'], xres, yres)
+	xa, ya, za = (np.ascontiguousarray(data[:, k]) for k in range(3))
+	return (xres, yres, xa, ya, za, xrng, xmin, yrng, ymin, e['zrng'], e['zmin'],
+		alpha, summary.max_steps, np.asarray([0.75, 1.00, 1.25]))
+
+def time_burn(func, args, render, n_runs, **kwargs):
+	""" best of n_runs into a warm buffer, so page faults of a fresh image are not timed """
+	times = []
+	for _ in range(n_runs):
+		render.fill(1)
+		start = perf_counter()
+		func(*args, render=render, **kwargs)
+		times.append(perf_counter() - start)
+	return min(times)
+
+def benchmark_burn_order(n_iterates = 10_000_000, sizes = None, n_runs = 5, tile_size = 256, chunk_size = 2**20):
+	print_sizes = json.loads((ROOT / 'data' / 'print_sizes.json').read_text())
+	sizes = list(print_sizes) if sizes is None else sizes
+
+	data = synthetic_trajectory(3, n_iterates)
+	summary = OrbitSummary.from_data(data, (0, 1, 2))
+
+	print("────────────────────────────────────────────")
+	print(f" Burn Order ({n_iterates:,} points, tiles {tile_size}, chunks {chunk_size:,})")
+	print("────────────────────────────────────────────")
+	print(f"  {'size':<10} {'Mpixels':>8} {'orbit':>8} {'tile':>8} {'gain':>7}")
+	for size in sizes:
+		xres, yres = print_sizes[size]
+		args = burn_args(data, xres, yres, summary)
+		render = np.ones((yres, xres, 3))
+
+		# both orders have to give the same image
+		reference = np.asarray(compute_burn_inline(*args)).copy()
+		compute_burn_sorted(*args, render=render, tile_size=tile_size, chunk_size=chunk_size)
+		assert np.array_equal(render, reference)
+		del reference
+
+		orbit = time_burn(compute_burn_inline, args, render, n_runs)
+		tile = time_burn(compute_burn_sorted, args, render, n_runs, tile_size=tile_size, chunk_size=chunk_size)
+		print(f"• {size:<10} {xres * yres / 1e6:>8.1f} {orbit:>7.3f}s {tile:>7.3f}s {orbit / tile - 1:>+7.1%}", flush=True)
+	print()
+
+
+if __name__ == '__main__':
+
+	parser = argparse.ArgumentParser(description='orbit order vs tile order burn at every print size')
+	parser.add_argument('--iterates', type=int, default=10_000_000)
+	parser.add_argument('--sizes', nargs='+', default=None, help='print sizes (default: all in data/print_sizes.json)')
+	parser.add_argument('--runs', type=int, default=5)
+	parser.add_argument('--tile_size', type=int, default=256)
+	parser.add_argument('--chunk_size', type=int, default=2**20)
+	args = parser.parse_args()
+
+	benchmark_burn_order(args.iterates, args.sizes, args.runs, args.tile_size, args.chunk_size)
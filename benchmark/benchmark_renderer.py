@@ -10,6 +10,8 @@ from attractor_finder.functions_numba import (
 
 from attractor_finder.render import AttractorRenderPipeline
 
+from benchmark_suite import synthetic_trajectory
+
 
 
 def benchmark_difference_arrays(data, func, n_runs=25):
@@ -67,10 +69,10 @@ def load_print_sizes():
 	with open(data_path, 'r') as f:
 		return json.load(f)
 
-def load_data():
-	print('Loading data...', end=" ")
-	data_path = Path(__file__).parents[1] / "data" / "d3_test_data_50M_arr.npy"
-	data = np.load(data_path)
+def load_data(n_iterates = 50_000_000):
+	# deterministic synthetic trajectory, see benchmark_suite.py
+	print('Generating data...', end=" ")
+	data = synthetic_trajectory(3, n_iterates)
 	print('done.\n')
 	return data
 
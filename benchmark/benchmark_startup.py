@@ -0,0 +1,70 @@
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import os
+import numpy as np
+
+ROOT = Path(__file__).parents[1]
+
+# snippets timed in fresh interpreters, the time is measured inside the
+# child so interpreter start-up itself is excluded (except for --help)
+SNIPPETS = {
+	'import attractor_finder': 'import attractor_finder',
+	'import render kernels': 'import attractor_finder.render',
+	'first numba calls': '''
+from attractor_finder.pool import warm_up
+warm_up()''',
+	'WorkerPool(2) start': '''
+from attractor_finder import WorkerPool
+WorkerPool(2).shutdown()''',
+}
+
+
+def time_snippet(code, env):
+	timed = f'from time import perf_counter\n_start = perf_counter()\n{code}\nprint(perf_counter() - _start)'
+	out = subprocess.run([sys.executable, '-c', timed], env=env, capture_output=True, text=True, check=True)
+	return float(out.stdout.strip().splitlines()[-1])
+
+def time_command(args, env):
+	from time import perf_counter
+	start = perf_counter()
+	subprocess.run([sys.executable] + args, env=env, capture_output=True, check=True)
+	return perf_counter() - start
+
+def benchmark(name, func, n_runs = 5):
+	print(f'• {name:<28}', end=" ", flush=True)
+	times = [func() for _ in range(n_runs)]
+	print(f'{np.median(times):.3f} s (min {np.min(times):.3f}, max {np.max(times):.3f})')
+
+def benchmark_startup(n_runs = 5):
+	env = dict(os.environ, NUMBA_THREADING_LAYER=os.environ.get('NUMBA_THREADING_LAYER', 'omp'))
+
+	with tempfile.TemporaryDirectory() as cache_dir:
+		for label, cache_env in (('cold numba cache', dict(env, NUMBA_CACHE_DIR=cache_dir)), ('warm numba cache', env)):
+
+			# fills the cache for the warm runs
+			time_snippet(SNIPPETS['first numba calls'], env)
+
+			print("────────────────────────────────────────────")
+			print(f" Startup ({label})")
+			print("────────────────────────────────────────────")
+			for name, code in SNIPPETS.items():
+				if label.startswith('cold') and 'numba' not in name and 'Pool' not in name:
+					continue
+
+				def run(code = code):
+					# a cold cache has to be empty for every run
+					for path in Path(cache_dir).glob('**/*.nb*'):
+						path.unlink()
+					return time_snippet(code, cache_env)
+
+				benchmark(name, run, n_runs)
+
+			if label.startswith('warm'):
+				benchmark('main.py --help (wall)', lambda: time_command([str(ROOT / 'scripts' / 'main.py'), '--help'], env), n_runs)
+			print()
+
+
+if __name__ == '__main__':
+	benchmark_startup()
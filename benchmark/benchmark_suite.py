@@ -0,0 +1,218 @@
+from contextlib import redirect_stdout
+from pathlib import Path
+from time import perf_counter
+import argparse
+import io
+import json
+import platform
+import sys
+import tempfile
+
+import numpy as np
+
+try:
+	import resource
+except ImportError:
+	# windows, peak_rss_mb falls back to psutil if it is installed
+	resource = None
+
+from attractor_finder.iterator import iterator_optimized
+from attractor_finder.output import save_image
+from attractor_finder.pool import WorkerPool, available_cores
+from attractor_finder.render import AttractorRenderPipeline
+from attractor_finder.search import draw_candidates, find_hits
+from attractor_finder.summary import OrbitSummary, projection_columns
+
+ROOT = Path(__file__).parents[1]
+DEFAULT_BASELINE = Path(__file__).parent / 'baseline.json'
+
+# every input is derived from these, so runs on different commits or
+# machines benchmark the same attractors and trajectories
+SEED = 1234
+DIMENSIONS = (2, 3, 4, 5, 6)
+RENDER_DIMENSION = 3
+TRANSIENT = 1000
+SEARCH_BATCHES = 8
+SEARCH_BATCH_SIZE = 256
+
+
+def find_attractor(dimension, n_iterates, seed = SEED):
+	"""
+	coefficients and starting point of the first attractor found from seed
+	whose orbit of n_iterates stays finite, independent of any global state
+	"""
+	rng = np.random.RandomState(seed)
+	while True:
+		coeffs, x0 = draw_candidates(rng, dimension, SEARCH_BATCH_SIZE)
+		for c, _, _ in find_hits(coeffs, x0, dimension, 2000, max_hits=SEARCH_BATCH_SIZE):
+			end = np.asarray(iterator_optimized(TRANSIENT + n_iterates, coeffs[c], x0[c], dimension)[-1])
+			if np.all(np.isfinite(end)):
+				return coeffs[c], x0[c]
+
+def synthetic_trajectory(dimension, n_iterates, seed = SEED):
+	""" deterministic trajectory on the attractor, the transient is dropped """
+	coeffs, x0 = find_attractor(dimension, n_iterates, seed)
+	data = np.asarray(iterator_optimized(TRANSIENT + n_iterates, coeffs, x0, dimension))
+	return data[TRANSIENT:]
+
+def peak_rss_mb(_ = None):
+	"""
+	peak resident set size of the calling process in MB (linux reports kB,
+	macos bytes), None if neither resource nor psutil is available
+	"""
+	if resource is not None:
+		scale = 1 / 2**20 if sys.platform == 'darwin' else 1 / 2**10
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+	try:
+		import psutil
+	except ImportError:
+		return None
+	info = psutil.Process().memory_info()
+	return getattr(info, 'peak_wset', info.rss) / 2**20
+
+def time_runs(func, n_runs):
+	""" median wall time of n_runs calls, output of the pipeline stages is swallowed """
+	times = []
+	for _ in range(n_runs):
+		with redirect_stdout(io.StringIO()):
+			start = perf_counter()
+			func()
+			times.append(perf_counter() - start)
+	return float(np.median(times))
+
+def record(results, name, value, unit, higher_is_better = False):
+	results[name] = {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+	print(f'• {name:<28} {value:,.3f} {unit}')
+
+
+def benchmark_search(results, n_runs):
+	def run():
+		rng = np.random.RandomState(SEED)
+		for _ in range(SEARCH_BATCHES):
+			coeffs, x0 = draw_candidates(rng, RENDER_DIMENSION, SEARCH_BATCH_SIZE)
+			find_hits(coeffs, x0, RENDER_DIMENSION, 2000)
+	elapsed = time_runs(run, n_runs)
+	record(results, f'search.d{RENDER_DIMENSION}', SEARCH_BATCHES * SEARCH_BATCH_SIZE / elapsed, 'candidates/s', True)
+
+def benchmark_iterator(results, n_iterates, n_runs):
+	for d in DIMENSIONS:
+		coeffs, x0 = find_attractor(d, n_iterates)
+		out = np.empty((n_iterates, d))
+		elapsed = time_runs(lambda: iterator_optimized(n_iterates, coeffs, x0, d, out), n_runs)
+		record(results, f'iterator_optimized.d{d}', n_iterates / elapsed / 1e6, 'M it/s', True)
+
+def benchmark_render(results, data, xres, yres, pool, n_runs):
+	columns = projection_columns(RENDER_DIMENSION)
+	summary = None
+
+	def summarize():
+		nonlocal summary
+		summary = OrbitSummary.from_data(data, columns)
+	record(results, 'bounds_deltas', time_runs(summarize, n_runs), 's')
+
+	burn, pixel, save = [], [], []
+	with tempfile.TemporaryDirectory() as output_dir:
+		for _ in range(n_runs):
+			with redirect_stdout(io.StringIO()):
+				pipeline = AttractorRenderPipeline(data, xres, yres, pool=pool, summary=summary)
+				start = perf_counter()
+				pipeline.construct_args_list_burn()
+				pipeline.burn_pool()
+				burn.append(perf_counter() - start)
+
+				start = perf_counter()
+				pipeline.construct_args_list_pixel()
+				pipeline.pixel_pool()
+				pixel.append(perf_counter() - start)
+
+				start = perf_counter()
+				save_image(Path(output_dir) / 'render.png', pipeline._render)
+				save.append(perf_counter() - start)
+				pipeline.release_shared()
+
+	record(results, 'burn', float(np.median(burn)), 's')
+	record(results, 'pixel', float(np.median(pixel)), 's')
+	record(results, 'save', float(np.median(save)), 's')
+
+def run_suite(n_iterates, size, n_runs, n_workers):
+	xres, yres = json.loads((ROOT / 'data' / 'print_sizes.json').read_text())[size]
+	results = {}
+
+	print("────────────────────────────────────────────")
+	print(f" Benchmark Suite ({n_iterates:,} iterates, {size})")
+	print("────────────────────────────────────────────")
+	with WorkerPool(n_workers) as pool:
+		benchmark_search(results, n_runs)
+		benchmark_iterator(results, n_iterates, n_runs)
+		data = synthetic_trajectory(RENDER_DIMENSION, n_iterates)
+		benchmark_render(results, data, xres, yres, pool, n_runs)
+		# the workers are not children of this process (see pool.mp_context), they report their own peak
+		rss_workers = [rss for rss in pool.map(peak_rss_mb, range(4 * pool.n_workers)) if rss is not None]
+
+	for name, rss in (('peak_rss.main', peak_rss_mb()), ('peak_rss.workers', max(rss_workers, default=None))):
+		if rss is not None:
+			record(results, name, rss, 'MB')
+	print()
+
+	return {
+		'config': {'seed': SEED, 'iterates': n_iterates, 'size': size, 'xres': xres, 'yres': yres,
+			'runs': n_runs, 'workers': pool.n_workers},
+		'machine': {'platform': platform.platform(), 'processor': platform.processor(),
+			'cores': available_cores(), 'python': platform.python_version(), 'numpy': np.__version__},
+		'results': results}
+
+def compare(report, baseline, threshold):
+	"""
+	print the change of every result against the baseline, returns the names of
+	results that got worse by more than threshold (a fraction)
+	"""
+	if baseline['config'] != report['config']:
+		print('(baseline was recorded with a different configuration)')
+
+	print("────────────────────────────────────────────")
+	print(f" Baseline Comparison (threshold {threshold:.0%})")
+	print("────────────────────────────────────────────")
+	regressions = []
+	for name, result in report['results'].items():
+		if name not in baseline['results']:
+			continue
+		base = baseline['results'][name]['value']
+		change = result['value'] / base - 1 if base else 0.0
+		worse = -change if result['higher_is_better'] else change
+		flag = ''
+		if worse > threshold:
+			regressions.append(name)
+			flag = '  REGRESSION'
+		print(f'• {name:<28} {change:+7.1%}{flag}')
+	print()
+	return regressions
+
+
+if __name__ == '__main__':
+
+	parser = argparse.ArgumentParser(description='end-to-end benchmark on deterministic synthetic attractors')
+	parser.add_argument('--iterates', type=int, default=10_000_000, help='trajectory length for the iterator and render stages')
+	parser.add_argument('--size', type=str, default='A4', help='print size from data/print_sizes.json')
+	parser.add_argument('--runs', type=int, default=3, help='runs per stage, the median is reported')
+	parser.add_argument('--workers', type=int, default=None, help='pool size (default: all cores)')
+	parser.add_argument('--output', type=str, default=None, help='write the results as json to this file')
+	parser.add_argument('--baseline', type=str, default=str(DEFAULT_BASELINE), help='baseline json to compare against')
+	parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown flagged as a regression')
+	parser.add_argument('--save_baseline', action='store_true', help='store the results as the new baseline')
+
+	args = parser.parse_args()
+	report = run_suite(args.iterates, args.size, args.runs, args.workers)
+
+	if args.output is not None:
+		Path(args.output).write_text(json.dumps(report, indent=2))
+
+	regressions = []
+	baseline_path = Path(args.baseline)
+	if args.save_baseline:
+		baseline_path.write_text(json.dumps(report, indent=2))
+		print(f'baseline saved to {baseline_path}')
+	elif baseline_path.exists():
+		regressions = compare(report, json.loads(baseline_path.read_text()), args.threshold)
+
+	# a non-zero exit status lets scripts and CI fail on regressions
+	sys.exit(1 if regressions else 0)
@@ -0,0 +1,62 @@
+from attractor_finder import WorkerPool
+from attractor_finder.catalog import AttractorCatalog, DEFAULT_PATH
+from attractor_finder.output import FORMATS, ImageWriter
+from pathlib import Path
+
+import argparse
+import json
+
+
+def load_print_sizes():
+	data_path = Path(__file__).parents[1] / "data" / "print_sizes.json"
+	with open(data_path, 'r') as f:
+		return json.load(f)
+
+def main():
+
+	print_sizes = load_print_sizes()
+
+	parser = argparse.ArgumentParser(description="Animate the interpolation between two catalogued attractors.")
+	parser.add_argument("start", type=int, help="Catalog id of the first frame.")
+	parser.add_argument("end", type=int, help="Catalog id of the last frame.")
+	parser.add_argument("--frames", type=int, default=120, help="Number of frames.")
+	parser.add_argument("--frame_iterates", type=int, default=2_000_000, help="Number of iterations per frame.")
+	parser.add_argument("--alpha", type=float, default=0.025, help="Alpha blending value. Set lower if using a large number of iterates.")
+	parser.add_argument("--size", choices=print_sizes.keys(), default="A5")
+	parser.add_argument("--scale", type=float, default=0.5, help="Scale factor applied to the print size, e.g. for video frames.")
+	parser.add_argument("--framing", choices=("fixed", "track"), default="fixed", help="Frame every image on the bounds of the whole animation, or follow the smoothed bounds of each frame.")
+	parser.add_argument("--smoothing", type=int, default=9, help="Number of frames the bounds are averaged over with --framing track.")
+	parser.add_argument("--batch_size", type=int, default=None, help="Frames rendered in parallel. Defaults to the number of workers.")
+	parser.add_argument("--catalog", type=str, default=str(DEFAULT_PATH), help="SQLite catalog to read attractors from.")
+	parser.add_argument("--output", type=str, default=None, help="Directory of the image sequence. Default: output/animation-{start}-{end}.")
+	parser.add_argument("--format", choices=FORMATS, default="png", help="Image file format.")
+	parser.add_argument("--workers", type=int, default=None, help="Size of the worker pool. Defaults to all available cores.")
+	args = parser.parse_args()
+
+	catalog = AttractorCatalog(args.catalog)
+	start, end = catalog.get(args.start), catalog.get(args.end)
+	for i, entry in ((args.start, start), (args.end, end)):
+		if entry is None:
+			parser.error(f"catalog entry {i} does not exist")
+	if start['dimension'] != end['dimension']:
+		parser.error("both attractors need the same dimension")
+
+	xres, yres = (int(n * args.scale) for n in print_sizes[args.size])
+	output_dir = args.output
+	if output_dir is None:
+		output_dir = Path(__file__).parents[1] / "output" / f"animation-{args.start}-{args.end}"
+
+	# imported here so --help does not load the render kernels
+	from attractor_finder.animation import AnimationPipeline
+
+	with WorkerPool(args.workers) as pool, ImageWriter(args.format) as writer:
+		animation = AnimationPipeline(start['coeffs'], end['coeffs'], start['dimension'], args.frames, args.frame_iterates,
+			xres, yres, args.alpha, framing=args.framing, smoothing=args.smoothing, batch_size=args.batch_size,
+			pool=pool, writer=writer, output_dir=output_dir)
+		if animation.error:
+			print("Every frame diverged")
+			return
+		animation.render_animation()
+
+if __name__ == "__main__":
+	main()
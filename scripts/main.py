@@ -1,5 +1,8 @@
-from attractor_finder import search_attractor, compute_attractor
-from attractor_finder.render import AttractorRenderPipeline
+import attractor_finder as af
+from attractor_finder import metrics
+from attractor_finder.catalog import DEFAULT_PATH
+from attractor_finder.jobs import JobQueue, default_worker_id, seed_jobs
+from attractor_finder.output import FORMATS
 from pathlib import Path
 
 import argparse
@@ -13,14 +16,87 @@ def load_print_sizes():
 	with open(data_path, 'r') as f:
 		return json.load(f)
 
-def generate_attractor(render_iterates, xres, yres, alpha):
+def generate_attractor(render_iterates, xres, yres, alpha, pool, stream=False, search_workers=1, memory_budget=None,
+	threads=None, catalog=None, histogram=False, progressive=False, compact=False, views=1, writer=None, burn_order="orbit", seed=None):
 	dimension = 2 # np.random.randint(2,4)
-	coeffs, seed = search_attractor(dimension)
-	itdata, error = compute_attractor(coeffs, render_iterates, dimension)
+	if search_workers > 1:
+		hits, seed = af.search_attractor_parallel(dimension, search_workers, seed=seed, pool=pool, catalog=catalog)
+		coeffs = hits[0]
+	else:
+		coeffs, seed = af.search_attractor(dimension, seed=seed, catalog=catalog)
+	metrics.label(seed=seed, dimension=dimension)
+
+	if views > 1:
+		view_list = [af.View.default(dimension, xres, yres)] + [af.View.random(dimension, xres, yres) for _ in range(views - 1)]
+		attractor_pipeline = af.MultiViewRenderPipeline(coeffs, dimension, render_iterates, view_list, alpha, pool=pool,
+			writer=writer)
+		if not attractor_pipeline.error:
+			attractor_pipeline.render_attractor(seed)
+		return
+
+	if stream or progressive:
+		pipeline_class = af.ProgressiveRenderPipeline if progressive else af.StreamingRenderPipeline
+		attractor_pipeline = pipeline_class(coeffs, dimension, render_iterates, xres, yres, alpha, pool=pool, writer=writer)
+		if not attractor_pipeline.error:
+			attractor_pipeline.render_attractor(seed)
+			if catalog is not None:
+				catalog.update_render(dimension, coeffs, *attractor_pipeline.get_render_info())
+		return
+
+	if threads is not None:
+		itdata, error = af.compute_attractor_omp(coeffs, render_iterates, dimension, n_threads=threads)
+	else:
+		# a Trajectory, which carries the summary of the iteration workers to the render pipeline
+		itdata, error = af.iterate_attractor(coeffs, render_iterates, dimension, pool=pool, projected=compact,
+			dtype=np.float32 if compact else np.float64)
 
 	if not error:
-		attractor_pipeline = AttractorRenderPipeline(itdata, xres, yres, alpha)
-		attractor_pipeline.render_attractor(seed)
+		attractor_pipeline = af.AttractorRenderPipeline(itdata, xres, yres, alpha, pool=pool, writer=writer,
+			burn_order=burn_order)
+		if threads is not None:
+			attractor_pipeline.render_attractor(seed, n_threads=threads)
+		elif memory_budget is None:
+			attractor_pipeline.render_attractor(seed, histogram=histogram)
+		else:
+			attractor_pipeline.render_attractor(seed, tiled=True, memory_budget=memory_budget)
+		if catalog is not None:
+			catalog.update_render(dimension, coeffs, *attractor_pipeline.get_render_info())
+
+def work_jobs(job_queue, generate, writer, stale):
+	"""
+	claim jobs until the queue is empty, a job is only marked done once its
+	images are written, an interrupted job is handed back to the queue, a
+	job whose claim was requeued as stale is left to the worker that takes
+	it over
+	"""
+	worker = default_worker_id()
+	job_queue.requeue_stale(stale)
+	while (job := job_queue.claim(worker)) is not None:
+		print(f"Job {job['id']} claimed by {worker}\n")
+		start = time.perf_counter()
+		try:
+			attractors = []
+			requeued = False
+			for seed in job['seeds']:
+				attractors.append(generate(seed, seed))
+				if not job_queue.heartbeat(job):
+					requeued = True
+					break
+			writer.flush()
+		except Exception as e:
+			job_queue.fail(job, repr(e))
+			print(f"Job {job['id']} failed: {e!r}\n")
+			continue
+		except BaseException:
+			job_queue.release(job)
+			raise
+		if requeued:
+			print(f"Job {job['id']} was requeued after {stale} s without progress, abandoned\n")
+			continue
+		job_queue.complete(job, {'runtime_s': time.perf_counter() - start,
+			'attractors': [attractor.as_dict() for attractor in attractors]})
+		# claims of workers that crashed meanwhile are picked up by the ones still running
+		job_queue.requeue_stale(stale)
 
 def main():
 
@@ -31,16 +107,107 @@ def main():
 	parser.add_argument("--n_attractors", type=int, default=100, help="Number of attractors to generate.")
 	parser.add_argument("--alpha", type=float, default=0.025, help="Alpha blending value. Set lower if using a large number of iterates.")
 	parser.add_argument("--size", choices=print_sizes.keys(), default="A4")
+	parser.add_argument("--stream", action="store_true", help="Burn points while iterating instead of storing the trajectory.")
+	parser.add_argument("--search_workers", type=int, default=1, help="Number of processes used to search for attractors.")
+	parser.add_argument("--tile_budget", type=float, default=None, help="Render in tiles using at most this many GB of image buffers.")
+	parser.add_argument("--threads", type=int, default=None, help="Iterate and render in a single process with this many OpenMP threads.")
+	parser.add_argument("--histogram", action="store_true", help="Accumulate hit statistics and save them next to the image for re-toning.")
+	parser.add_argument("--progressive", action="store_true", help="Iterate in checkpointed chunks and stop once the image has converged.")
+	parser.add_argument("--resume", type=str, default=None, help="Finish an interrupted progressive render from its checkpoint directory.")
+	parser.add_argument("--compact", action="store_true", help="Store only the projected coordinates as float32 while iterating.")
+	parser.add_argument("--views", type=int, default=1, help="Render the default and views - 1 random projections in one streaming pass.")
+	parser.add_argument("--format", choices=FORMATS, default="png", help="Image file format.")
+	parser.add_argument("--bit_depth", type=int, choices=(8, 16), default=8, help="Bits per colour sample of the saved images.")
+	parser.add_argument("--compression", type=int, choices=range(10), default=6, metavar="0-9", help="Deflate level of the saved images.")
+	parser.add_argument("--pipeline", action="store_true", help="Overlap search, iteration and render/save of consecutive attractors.")
+	parser.add_argument("--catalog", type=str, default=str(DEFAULT_PATH), help="SQLite catalog every found attractor is recorded in.")
+	parser.add_argument("--workers", type=int, default=None, help="Size of the shared worker pool. Defaults to all available cores.")
+	parser.add_argument("--burn_order", choices=("orbit", "tile"), default="orbit", help="Burn points in orbit order or bucketed by image tile.")
+	parser.add_argument("--metrics", type=str, default=None, help="Write stage timings and counters per attractor to this .json or .csv file.")
+	parser.add_argument("--profile", type=str, default=None, help="Write cProfile stats of every stage to this directory.")
+	parser.add_argument("--jobs", type=str, default=None, help="Work on the job queue in this shared directory until it is empty.")
+	parser.add_argument("--submit", action="store_true", help="With --jobs: queue --n_attractors search seeds in jobs of --job_size and exit.")
+	parser.add_argument("--job_size", type=int, default=10, help="Number of attractors per job.")
+	parser.add_argument("--seed", type=int, default=None, help="First search seed of the submitted jobs. Defaults to a random seed.")
+	parser.add_argument("--stale", type=float, default=3600, help="Seconds after which a job claimed by a silent worker is handed out again.")
 	args = parser.parse_args()
 
+	if args.pipeline:
+		# the pipelined batch only runs the multi-pass render
+		ignored = [option for option, given in (("--stream", args.stream), ("--tile_budget", args.tile_budget is not None),
+			("--threads", args.threads is not None), ("--histogram", args.histogram), ("--progressive", args.progressive),
+			("--views", args.views > 1), ("--jobs", args.jobs is not None)) if given]
+		if ignored:
+			parser.error(f"--pipeline can not be combined with {', '.join(ignored)}")
+
+	# options of the render of a stored trajectory, the modes before them in generate_attractor skip it
+	streaming = (("--stream", args.stream), ("--progressive", args.progressive), ("--views", args.views > 1))
+	threads = (("--threads", args.threads is not None),)
+	tiled = (("--tile_budget", args.tile_budget is not None),)
+	for option, given, modes in (("--threads", args.threads is not None, streaming),
+		("--tile_budget", args.tile_budget is not None, streaming + threads),
+		("--histogram", args.histogram, streaming + threads + tiled),
+		("--compact", args.compact, streaming + threads),
+		("--burn_order", args.burn_order != "orbit", streaming + threads + tiled + (("--histogram", args.histogram),))):
+		ignored = [mode for mode, mode_given in modes if mode_given]
+		if given and ignored:
+			parser.error(f"{option} can not be combined with {', '.join(ignored)}")
+
+	job_queue = None
+	if args.jobs is not None:
+		job_queue = JobQueue(args.jobs)
+		if args.submit:
+			base_seed = np.random.randint(1, 2e9) if args.seed is None else args.seed
+			n_submitted = job_queue.submit(seed_jobs(args.n_attractors, args.job_size, base_seed))
+			print(f"{n_submitted} jobs submitted")
+			job_queue.print_status()
+			return
+
 	
 	xres, yres = print_sizes[args.size]
+	memory_budget = None if args.tile_budget is None else int(args.tile_budget * 2**30)
+	catalog = af.AttractorCatalog(args.catalog)
+	if args.profile is not None:
+		metrics.add_hook(metrics.CProfileHook(args.profile))
 
-	for i in range(args.n_attractors):
-		start = time.perf_counter()
-		generate_attractor(args.render_iterates, xres, yres, args.alpha)
-		print(f" Total Runtime:        {time.perf_counter()-start:.1f} s")
-		print("────────────────────────────────────────────\n")
+	# images are written in the background while the next attractor is searched
+	with af.WorkerPool(args.workers) as pool, af.ImageWriter(args.format, args.bit_depth, args.compression) as writer:
+		if args.resume is not None:
+			af.ProgressiveRenderPipeline.resume(args.resume, pool, writer).render_attractor()
+			return
+		if args.pipeline:
+			batch = af.BatchPipeline(args.render_iterates, xres, yres, args.alpha, pool, search_workers=args.search_workers,
+				catalog=catalog, compact=args.compact, writer=writer, burn_order=args.burn_order)
+			batch.run(args.n_attractors)
+			attractor_metrics = batch.metrics
+		else:
+			attractor_metrics = []
+
+			def generate(i, seed=None):
+				start = time.perf_counter()
+				with metrics.collecting(metrics.Metrics({'attractor': i})) as attractor:
+					generate_attractor(args.render_iterates, xres, yres, args.alpha, pool, args.stream, args.search_workers, memory_budget, args.threads, catalog,
+						args.histogram, args.progressive, args.compact, args.views, writer, args.burn_order, seed)
+				attractor.labels['runtime_s'] = time.perf_counter() - start
+				attractor_metrics.append(attractor)
+				print(f" Total Runtime:        {time.perf_counter()-start:.1f} s")
+				print("────────────────────────────────────────────\n")
+				# rewritten after every attractor, so an interrupted batch keeps its metrics
+				if args.metrics is not None:
+					metrics.write_metrics(args.metrics, attractor_metrics)
+				return attractor
+
+			if job_queue is not None:
+				work_jobs(job_queue, generate, writer, args.stale)
+				job_queue.print_status()
+			else:
+				for i in range(args.n_attractors):
+					generate(i)
+
+	# background image writes are only complete once the writer is closed
+	if args.metrics is not None:
+		metrics.write_metrics(args.metrics, attractor_metrics)
+		metrics.Metrics.merge_all(attractor_metrics).print_summary('Batch Metrics')
 
 if __name__ == "__main__":
 	main()
\ No newline at end of file
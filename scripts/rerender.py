@@ -0,0 +1,75 @@
+from attractor_finder import WorkerPool
+from attractor_finder.catalog import AttractorCatalog, DEFAULT_PATH
+from attractor_finder.output import FORMATS, ImageWriter
+from pathlib import Path
+
+import argparse
+import time
+import json
+
+
+def load_print_sizes():
+	data_path = Path(__file__).parents[1] / "data" / "print_sizes.json"
+	with open(data_path, 'r') as f:
+		return json.load(f)
+
+def print_entries(entries):
+	print("────────────────────────────────────────────")
+	print(" Catalog")
+	print("────────────────────────────────────────────")
+	for entry in entries:
+		cached = "cached" if entry['extents'] is not None else "-"
+		print(f"• {entry['id']:<6} D{entry['dimension']}-{entry['seed']:<12} fill {entry['fill'] or 0:5.1f} %   {cached}")
+	print()
+
+def rerender(entry, render_iterates, xres, yres, alpha, pool, catalog, writer=None):
+	""" stream render a catalog entry, the search is skipped entirely """
+	# imported here so --list and --help do not load the render kernels
+	from attractor_finder.render import StreamingRenderPipeline
+	attractor_pipeline = StreamingRenderPipeline(entry['coeffs'], entry['dimension'], render_iterates, xres, yres, alpha,
+		pool=pool, extents=entry['extents'], max_deltas=entry['max_deltas'], writer=writer)
+	if attractor_pipeline.error:
+		print(f"Attractor {entry['id']} diverged")
+		return
+	attractor_pipeline.render_attractor(entry['seed'])
+	if entry['extents'] is None:
+		catalog.update_render(entry['dimension'], entry['coeffs'], *attractor_pipeline.get_render_info())
+
+def main():
+
+	print_sizes = load_print_sizes()
+
+	parser = argparse.ArgumentParser(description="Re-render attractors recorded in the catalog.")
+	parser.add_argument("ids", type=int, nargs="*", help="Catalog ids to render.")
+	parser.add_argument("--seed", type=int, default=None, help="Render every catalog entry found with this seed.")
+	parser.add_argument("--list", action="store_true", help="List the catalog and exit.")
+	parser.add_argument("--render_iterates", type=int, default=10_000_000, help="Number of iterations per attractor.")
+	parser.add_argument("--alpha", type=float, default=0.025, help="Alpha blending value. Set lower if using a large number of iterates.")
+	parser.add_argument("--size", choices=print_sizes.keys(), default="A4")
+	parser.add_argument("--catalog", type=str, default=str(DEFAULT_PATH), help="SQLite catalog to read attractors from.")
+	parser.add_argument("--format", choices=FORMATS, default="png", help="Image file format.")
+	parser.add_argument("--bit_depth", type=int, choices=(8, 16), default=8, help="Bits per colour sample of the saved images.")
+	parser.add_argument("--workers", type=int, default=None, help="Size of the worker pool. Defaults to all available cores.")
+	args = parser.parse_args()
+
+	catalog = AttractorCatalog(args.catalog)
+	if args.list:
+		print_entries(catalog.find())
+		return
+
+	entries = [catalog.get(i) for i in args.ids]
+	if args.seed is not None:
+		entries += catalog.find(seed=args.seed)
+	entries = [entry for entry in entries if entry is not None]
+
+	xres, yres = print_sizes[args.size]
+
+	with WorkerPool(args.workers) as pool, ImageWriter(args.format, args.bit_depth) as writer:
+		for entry in entries:
+			start = time.perf_counter()
+			rerender(entry, args.render_iterates, xres, yres, args.alpha, pool, catalog, writer)
+			print(f" Total Runtime:        {time.perf_counter()-start:.1f} s")
+			print("────────────────────────────────────────────\n")
+
+if __name__ == "__main__":
+	main()
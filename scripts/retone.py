@@ -0,0 +1,28 @@
+from attractor_finder.histogram import Histogram
+from attractor_finder.output import FORMATS, save_image
+from pathlib import Path
+
+import argparse
+
+
+def main():
+
+	parser = argparse.ArgumentParser(description="Re-tone saved render histograms with new alpha or colours.")
+	parser.add_argument("histograms", type=Path, nargs="+", help="Histogram files saved with --histogram.")
+	parser.add_argument("--alpha", type=float, default=None, help="Alpha blending value. Defaults to the value used for the render.")
+	parser.add_argument("--bgcolor", type=float, nargs=3, default=None, help="Background colour as r g b between 0 and 1.")
+	parser.add_argument("--burn_factors", type=float, nargs=3, default=None, help="Per channel burn strength as r g b.")
+	parser.add_argument("--suffix", type=str, default="-retone", help="Appended to the file name of the new image.")
+	parser.add_argument("--format", choices=FORMATS, default="png", help="Image file format.")
+	parser.add_argument("--bit_depth", type=int, choices=(8, 16), default=8, help="Bits per colour sample.")
+	args = parser.parse_args()
+
+	for path in args.histograms:
+		histogram = Histogram.load(path)
+		render = histogram.tone_map(args.alpha, args.bgcolor, args.burn_factors)
+		fname = path.with_name(path.stem + args.suffix + "." + args.format)
+		save_image(fname, render, args.bit_depth)
+		print(f"• Saved:            {fname}")
+
+if __name__ == "__main__":
+	main()
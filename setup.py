@@ -12,6 +12,11 @@ extensions = [
         ["src/attractor_finder/iterator.pyx"],
         **openmp_args
     ),
+    Extension(
+        "attractor_finder.iterator_sparse",
+        ["src/attractor_finder/iterator_sparse.pyx"],
+        **openmp_args
+    ),
     Extension(
         "attractor_finder.renderer_batch",
         ["src/attractor_finder/renderer_batch.pyx"],
@@ -21,6 +26,21 @@ extensions = [
         "attractor_finder.renderer",
         ["src/attractor_finder/renderer.pyx"],
         **openmp_args
+    ),
+    Extension(
+        "attractor_finder.renderer_stream",
+        ["src/attractor_finder/renderer_stream.pyx"],
+        **openmp_args
+    ),
+    Extension(
+        "attractor_finder.renderer_omp",
+        ["src/attractor_finder/renderer_omp.pyx"],
+        **openmp_args
+    ),
+    Extension(
+        "attractor_finder.renderer_hist",
+        ["src/attractor_finder/renderer_hist.pyx"],
+        **openmp_args
     )
 ]
 
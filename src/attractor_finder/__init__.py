@@ -1,11 +1,53 @@
-from .compute import compute_attractor, compute_attractor_single_thread
-from .search import search_attractor
-from .functions import pixel_density, get_min_max_range, set_aspect, get_dx
-from .functions_numba import get_min_max_range_numba, get_dx_numba_parallel, get_min_numba, get_max_numba
-from .render import AttractorRenderPipeline
+# submodules are imported on first use, so importing the package (e.g. for
+# a script's --help) does not pull in numba and every compiled kernel
+_LAZY = {
+    "compute_attractor": "compute",
+    "compute_attractor_single_thread": "compute",
+    "compute_attractor_omp": "compute",
+    "iterate_attractor": "compute",
+    "Trajectory": "compute",
+    "search_attractor": "search",
+    "search_attractor_parallel": "search",
+    "pixel_density": "functions",
+    "get_min_max_range": "functions",
+    "set_aspect": "functions",
+    "get_dx": "functions",
+    "get_min_max_range_numba": "functions_numba",
+    "get_dx_numba_parallel": "functions_numba",
+    "get_min_numba": "functions_numba",
+    "get_max_numba": "functions_numba",
+    "AttractorRenderPipeline": "render",
+    "StreamingRenderPipeline": "render",
+    "ProgressiveRenderPipeline": "progressive",
+    "MultiViewRenderPipeline": "views",
+    "View": "views",
+    "AnimationPipeline": "animation",
+    "JobQueue": "jobs",
+    "AttractorCatalog": "catalog",
+    "ImageWriter": "output",
+    "WorkerPool": "pool",
+    "BatchPipeline": "batch"
+}
 
 __all__ = [
-"compute_attractor",
-"compute_attractor_single_thread",
-"search_attractor"
-]
\ No newline at end of file
+    "compute_attractor",
+    "compute_attractor_single_thread",
+    "compute_attractor_omp",
+    "iterate_attractor",
+    "search_attractor",
+    "search_attractor_parallel",
+    "WorkerPool",
+    "BatchPipeline"
+]
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f"{__name__}.{_LAZY[name]}"), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
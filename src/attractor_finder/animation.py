@@ -0,0 +1,227 @@
+from pathlib import Path
+import time
+
+import numpy as np
+
+from attractor_finder import metrics
+from attractor_finder.functions import frame_bounds, time_this
+from attractor_finder.iterator_sparse import iterator_sparse
+from attractor_finder.output import save_image
+from attractor_finder.pool import get_executor, get_n_workers
+from attractor_finder.render import AttractorRenderPipeline, stream_worker
+from attractor_finder.renderer_batch import compute_render_slice
+from attractor_finder.shared import SharedArray, attach_shared
+from attractor_finder.summary import OrbitSummary, projection_columns
+
+FRAMINGS = ('fixed', 'track')
+
+
+def frame_pixel_worker(args):
+    """ final image of one frame of a batch from its burn slot """
+    slots_handle, renders_handle, slot, xres, yres, bgcolor = args
+    compute_render_slice(xres, yres, 0, yres, bgcolor,
+        attach_shared(slots_handle)[slot], attach_shared(renders_handle)[slot])
+
+def smooth_frames(values, window):
+    """ centered moving average over the frames (rows), the edges are padded with the first and last row """
+    pad = window // 2
+    if pad == 0 or len(values) < 2:
+        return values
+    padded = np.concatenate([np.repeat(values[:1], pad, axis=0), values, np.repeat(values[-1:], pad, axis=0)])
+    kernel = np.ones(2 * pad + 1) / (2 * pad + 1)
+    return np.stack([np.convolve(padded[:, j], kernel, mode='valid') for j in range(values.shape[1])], axis=1)
+
+
+class AnimationPipeline(AttractorRenderPipeline):
+    """
+    animation that interpolates the coefficients of two attractors of the
+    same dimension linearly over n_frames, written as a numbered image
+    sequence frame_00000.png, frame_00001.png, ... to output_dir
+
+    a short pilot orbit is iterated for every frame in order, each starting
+    from the final state of the previous frame, so only the first frame
+    pays for a transient, the later ones discard settle iterations, the
+    pilots give the bounds and max deltas of every frame and the points the
+    frame orbits start from
+
+    framing = 'fixed' frames every image on the union of all pilot bounds,
+    'track' follows the pilot bounds smoothed over smoothing frames
+
+    frames are iterated and burned in parallel, one frame per task and
+    batch_size (default: the number of workers) frames at a time, so the
+    image buffers held at once scale with batch_size
+
+    frames whose coefficients have no attractor (the orbit diverges from a
+    warm and from a cold start) repeat the last frame that was rendered
+    """
+
+    def __init__(self, coeffs_start, coeffs_end, dimension, n_frames, frame_iterates, xres, yres, alpha = 0.025,
+        pilot_iterates = 50_000, transient = 10000, settle = 1000, framing = 'fixed', smoothing = 9,
+        batch_size = None, pool = None, writer = None, output_dir = None):
+
+        if framing not in FRAMINGS:
+            raise ValueError(f'unknown framing {framing}, use one of {FRAMINGS}')
+        if len(coeffs_start) != len(coeffs_end):
+            raise ValueError('both attractors need the same number of coefficients')
+
+        self.dimension = dimension
+        self.n_frames = n_frames
+        self.frame_iterates = frame_iterates
+        self.pilot_iterates = pilot_iterates
+        self.transient = transient
+        self.settle = settle
+        self.framing = framing
+        self.smoothing = smoothing
+        self.batch_size = batch_size
+        self.frames_per_minute = None
+
+        if output_dir is None:
+            output_dir = Path(__file__).parents[2] / "output" / f'D{dimension}-animation'
+        self.output_dir = Path(output_dir)
+
+        self._init_settings(xres, yres, alpha, pool, writer=writer)
+        self._columns = projection_columns(dimension)
+
+        t = np.linspace(0, 1, n_frames)[:, None]
+        self.coeffs = (1 - t) * np.asarray(coeffs_start, dtype=np.float64) + t * np.asarray(coeffs_end, dtype=np.float64)
+
+        self._starts = np.ones((n_frames, dimension + 1))
+        self._diverged = np.zeros(n_frames, dtype=bool)
+        self._frame_bounds = [None] * n_frames
+        self._frame_deltas = [None] * n_frames
+        self._last_render = None
+
+        self.pilot_chain()
+        self.error = bool(np.all(self._diverged))
+        if not self.error:
+            self.frame_extents()
+
+    def _pilot(self, k, x0, n_discard):
+        """ pilot orbit of frame k without the first n_discard points, None if it diverges """
+        n_iterations = n_discard + self.pilot_iterates
+        pilot = np.asarray(iterator_sparse(n_iterations, self.coeffs[k], x0, self.dimension))[n_discard:]
+        metrics.count('iterations', n_iterations)
+        return pilot if np.all(np.isfinite(pilot[-1])) else None
+
+    @time_this(stage='bounds')
+    def pilot_chain(self):
+        """
+        pilot orbits of every frame in order, warm started from the previous frame
+        """
+        print('... pilot_chain', end=" ")
+        summaries = []
+        x0 = None
+        for k in range(self.n_frames):
+            pilot = None if x0 is None else self._pilot(k, x0, self.settle)
+            if pilot is None:
+                # first frame, or the warm start left the basin of this frame
+                pilot = self._pilot(k, np.random.uniform(-1e-1, 1e-1, (self.dimension + 1)), self.transient)
+            if pilot is None:
+                self._diverged[k] = True
+                metrics.count('diverged_frames')
+                continue
+            summaries.append(OrbitSummary.from_data(pilot, self._columns))
+            self._starts[k, 1:] = pilot[-1]
+            x0 = self._starts[k]
+        self._summaries = summaries
+
+    def frame_extents(self):
+        """
+        image bounds and max deltas of every frame from the pilot summaries
+        """
+        mins = np.stack([s.mins for s in self._summaries])
+        maxs = np.stack([s.maxs for s in self._summaries])
+        max_steps = np.stack([s.max_steps for s in self._summaries])
+
+        if self.framing == 'fixed':
+            mins[:] = mins.min(axis=0)
+            maxs[:] = maxs.max(axis=0)
+            max_steps[:] = max_steps.max(axis=0)
+        else:
+            mins = smooth_frames(mins, self.smoothing)
+            maxs = smooth_frames(maxs, self.smoothing)
+            max_steps = smooth_frames(max_steps, self.smoothing)
+
+        for i, k in enumerate(np.flatnonzero(~self._diverged)):
+            xmin, ymin, xrng, yrng = frame_bounds(mins[i, 0], maxs[i, 0] - mins[i, 0],
+                mins[i, 1], maxs[i, 1] - mins[i, 1], self.xres, self.yres)
+            self._frame_bounds[k] = (xrng, xmin, yrng, ymin, maxs[i, 2] - mins[i, 2], mins[i, 2])
+            self._frame_deltas[k] = max_steps[i]
+
+    def _frame_params(self, k):
+        """ iterate_burn arguments of frame k """
+        ix, iy, iz = self._columns
+        return (self.frame_iterates, self.coeffs[k], self._starts[k], self.dimension, ix, iy, iz,
+            self.xres, self.yres, *self._frame_bounds[k], self.alpha, self._frame_deltas[k], self._burn_factors)
+
+    @time_this(stage='burn')
+    def burn_batch(self, frames):
+        """
+        iterate and burn the frames of a batch into their own slots, uses multiprocessing
+        """
+        print('... burn_batch', end=" ")
+        self._shared['burn_slots'] = SharedArray((len(frames), self.yres, self.xres, 3), fill = 1)
+        args_list = [(self._shared['burn_slots'].handle, slot, self._frame_params(k))
+            for slot, k in enumerate(frames) if not self._diverged[k]]
+        with get_executor(self.pool, self.n_processes) as executor:
+            n_outside = sum(executor.map(stream_worker, args_list))
+        n_iterations = len(args_list) * self.frame_iterates
+        metrics.count('iterations', n_iterations)
+        metrics.count('points_burned', n_iterations - n_outside)
+        metrics.count('out_of_bounds', n_outside)
+
+    @time_this(stage='pixel')
+    def pixel_batch(self, frames):
+        print('... pixel_batch', end=" ")
+        self._shared['renders'] = SharedArray((len(frames), self.yres, self.xres, 3))
+        args_list = [(self._shared['burn_slots'].handle, self._shared['renders'].handle, slot,
+            self.xres, self.yres, self._bgcolor) for slot in range(len(frames))]
+        with get_executor(self.pool, self.n_processes) as executor:
+            list(executor.map(frame_pixel_worker, args_list))
+        self._shared.pop('burn_slots').release()
+
+    @time_this(stage='save')
+    def save_batch(self, frames):
+        print('... save_batch', end=" ")
+        renders = self._shared['renders'].array
+        for slot, k in enumerate(frames):
+            render = renders[slot]
+            if not self._diverged[k]:
+                self._last_render = render
+            elif self._last_render is not None:
+                render = self._last_render
+            if self.writer is None:
+                save_image(self.output_dir / f'frame_{k:05d}.png', render)
+            else:
+                self.writer.save(self.output_dir / f'frame_{k:05d}{self.writer.suffix}', render)
+        metrics.count('frames', len(frames))
+
+    def render_animation(self, n_processes = None):
+        """ render and save every frame, returns the frames per minute """
+        print('... animation')
+        start = time.perf_counter()
+        self.n_processes = get_n_workers(self.pool, n_processes)
+        batch_size = self.batch_size or self.n_processes
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        for b in range(0, self.n_frames, batch_size):
+            frames = range(b, min(b + batch_size, self.n_frames))
+            self.burn_batch(frames)
+            self.pixel_batch(frames)
+            self.save_batch(frames)
+            self.release_shared()
+            self._shared = {}
+
+        elapsed = time.perf_counter() - start
+        self.frames_per_minute = 60 * self.n_frames / elapsed
+
+        print("────────────────────────────────────────────")
+        print(" Animation")
+        print("────────────────────────────────────────────")
+        print(f"• Frames:             {self.n_frames} ({np.count_nonzero(self._diverged)} diverged)")
+        print(f"• Framing:            {self.framing}")
+        print(f"• Render Time:        {elapsed:.1f} s")
+        print(f"• Frames per Minute:  {self.frames_per_minute:.1f}")
+        print(f"• Output:             {self.output_dir}")
+        print()
+        return self.frames_per_minute
@@ -0,0 +1,170 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+from attractor_finder import metrics
+from attractor_finder.compute import iterate_attractor
+from attractor_finder.render import AttractorRenderPipeline
+from attractor_finder.search import search_attractor_parallel
+
+# marks the end of the stream of work items passed between stages
+_DONE = None
+
+
+class BatchPipeline():
+    """
+    generate a batch of attractors with search, iteration and render/save
+    running in their own threads, connected by bounded queues
+
+    the heavy lifting of every stage runs in the shared worker pool (or in
+    kernels that release the GIL), the threads only hand work on, so while
+    attractor N is rendered and saved, N+1 is iterated and N+2 searched
+
+    queue_size bounds the number of finished items waiting for the next
+    stage, a full queue blocks the stage in front of it, so at most
+    queue_size + 2 trajectories are held at any time (one being iterated,
+    queue_size waiting and one being rendered)
+
+    hits and their render info are recorded in the catalog if one is given,
+    compact trajectories only hold the projected coordinates as float32,
+    images are saved by writer (an output.ImageWriter) if one is given,
+    burn_order is passed on to AttractorRenderPipeline
+
+    every attractor gets its own metrics.Metrics, each stage records into
+    the metrics of the item it works on, they are collected in self.metrics
+    """
+
+    def __init__(self, render_iterates, xres, yres, alpha = 0.025, pool = None,
+        dimension = 2, search_workers = 1, queue_size = 1, catalog = None, compact = False,
+        writer = None, burn_order = 'orbit'):
+
+        self.render_iterates = render_iterates
+        self.xres = xres
+        self.yres = yres
+        self.alpha = alpha
+        self.pool = pool
+        self.dimension = dimension
+        self.search_workers = search_workers
+        self.queue_size = queue_size
+        self.catalog = catalog
+        self.compact = compact
+        self.writer = writer
+        self.burn_order = burn_order
+
+        self.n_searched = 0
+        self.n_failed = 0
+        self.n_saved = 0
+        self.metrics = []
+
+        self._stop = threading.Event()
+        self._errors = []
+
+    def _put(self, q, item):
+        """ blocking put that gives up once another stage has failed """
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def _run_stage(self, stage, *args):
+        """ run one stage, stop the whole pipeline if it raises """
+        try:
+            stage(*args)
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+
+    def search_stage(self, n_attractors, out_queue):
+        for i in range(n_attractors):
+            attractor_metrics = metrics.Metrics({'attractor': i, 'dimension': self.dimension})
+            self.metrics.append(attractor_metrics)
+            # even a single search worker runs in the pool, so it never
+            # competes with the other stages for this process
+            with metrics.collecting(attractor_metrics):
+                hits, seed = search_attractor_parallel(self.dimension, self.search_workers, pool=self.pool,
+                    catalog=self.catalog)
+            attractor_metrics.labels['seed'] = seed
+            coeffs = hits[0]
+            self.n_searched += 1
+            if not self._put(out_queue, (coeffs, seed, attractor_metrics)):
+                return
+        self._put(out_queue, _DONE)
+
+    def compute_stage(self, in_queue, out_queue):
+        while True:
+            item = self._get(in_queue)
+            if item is _DONE:
+                break
+            coeffs, seed, attractor_metrics = item
+            with metrics.collecting(attractor_metrics):
+                trajectory, error = iterate_attractor(coeffs, self.render_iterates, self.dimension,
+                    pool=self.pool, projected=self.compact, dtype=np.float32 if self.compact else np.float64)
+            if error:
+                self.n_failed += 1
+                continue
+            if not self._put(out_queue, (trajectory, coeffs, seed, attractor_metrics)):
+                trajectory.release()
+                return
+        self._put(out_queue, _DONE)
+
+    def render_stage(self, in_queue):
+        while True:
+            item = self._get(in_queue)
+            if item is _DONE:
+                break
+            trajectory, coeffs, seed, attractor_metrics = item
+            with metrics.collecting(attractor_metrics):
+                attractor_pipeline = AttractorRenderPipeline(trajectory, self.xres, self.yres, self.alpha,
+                    pool=self.pool, writer=self.writer, burn_order=self.burn_order)
+                attractor_pipeline.render_attractor(seed)
+            if self.catalog is not None:
+                self.catalog.update_render(self.dimension, coeffs, *attractor_pipeline.get_render_info())
+            self.n_saved += 1
+
+    def run(self, n_attractors):
+        """
+        generate n_attractors attractors, returns the number of saved images
+        """
+        start = time.perf_counter()
+
+        found_queue = queue.Queue(maxsize=self.queue_size)
+        iterated_queue = queue.Queue(maxsize=self.queue_size)
+
+        threads = [
+            threading.Thread(target=self._run_stage, args=(self.search_stage, n_attractors, found_queue)),
+            threading.Thread(target=self._run_stage, args=(self.compute_stage, found_queue, iterated_queue)),
+            threading.Thread(target=self._run_stage, args=(self.render_stage, iterated_queue))]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+        self.print_summary(time.perf_counter() - start)
+        return self.n_saved
+
+    def print_summary(self, runtime):
+        print("────────────────────────────────────────────")
+        print(" Batch Complete")
+        print("────────────────────────────────────────────")
+        print(f"• Searched:         {self.n_searched}")
+        print(f"• Diverged:         {self.n_failed}")
+        print(f"• Saved:            {self.n_saved}")
+        print(f"• Runtime:          {runtime:.1f} s")
+        print(f"• Throughput:       {3600 * self.n_saved / runtime:.1f} attractors/h\n")
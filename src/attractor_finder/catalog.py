@@ -0,0 +1,111 @@
+from contextlib import closing
+from pathlib import Path
+import sqlite3
+
+import numpy as np
+
+DEFAULT_PATH = Path(__file__).parents[2] / "output" / "catalog.sqlite"
+
+_EXTENT_KEYS = ('xmin', 'xrng', 'ymin', 'yrng', 'zmin', 'zrng')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attractors (
+    id INTEGER PRIMARY KEY,
+    dimension INTEGER NOT NULL,
+    seed INTEGER,
+    coeffs BLOB NOT NULL,
+    fill REAL,
+    lyapunov REAL,
+    xmin REAL, xrng REAL,
+    ymin REAL, yrng REAL,
+    zmin REAL, zrng REAL,
+    max_dx REAL, max_dy REAL, max_dz REAL,
+    created TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (dimension, coeffs)
+);
+CREATE INDEX IF NOT EXISTS attractors_seed ON attractors (seed);
+"""
+
+
+class AttractorCatalog():
+    """
+    sqlite catalog of found attractors, one row per distinct set of coefficients
+
+    search hits are recorded with their seed, coefficients, fill and lyapunov
+    estimate, a render adds the raw (unframed) extents of the projected orbit
+    and the max deltas, so re-renders at any print size can start iterating
+    straight away
+
+    every call opens its own connection, so one catalog can be shared by the
+    threads of a batch pipeline
+    """
+
+    def __init__(self, path = None):
+        self.path = Path(DEFAULT_PATH if path is None else path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return closing(db)
+
+    def add(self, dimension, seed, coeffs, fill = None, lyapunov = None):
+        """ record a search hit, returns its id (existing id for known coefficients) """
+        blob = np.ascontiguousarray(coeffs, dtype=np.float64).tobytes()
+        with self._connect() as db, db:
+            db.execute(
+                "INSERT OR IGNORE INTO attractors (dimension, seed, coeffs, fill, lyapunov) VALUES (?, ?, ?, ?, ?)",
+                (int(dimension), int(seed), blob, fill, lyapunov))
+            row = db.execute(
+                "SELECT id FROM attractors WHERE dimension = ? AND coeffs = ?", (int(dimension), blob)).fetchone()
+        return row['id']
+
+    def update_render(self, dimension, coeffs, extents, max_deltas):
+        """ store raw extents and max deltas measured by a render pipeline """
+        blob = np.ascontiguousarray(coeffs, dtype=np.float64).tobytes()
+        values = [float(extents[key]) for key in _EXTENT_KEYS] + [float(d) for d in max_deltas]
+        with self._connect() as db, db:
+            db.execute(
+                "UPDATE attractors SET xmin = ?, xrng = ?, ymin = ?, yrng = ?, zmin = ?, zrng = ?, "
+                "max_dx = ?, max_dy = ?, max_dz = ? WHERE dimension = ? AND coeffs = ?",
+                values + [int(dimension), blob])
+
+    def get(self, entry_id):
+        """ catalog entry by id, None if there is no such entry """
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM attractors WHERE id = ?", (int(entry_id),)).fetchone()
+        return None if row is None else _entry(row)
+
+    def find(self, seed = None, dimension = None):
+        """ entries matching seed and/or dimension, in the order they were found """
+        query, params = "SELECT * FROM attractors WHERE 1", []
+        if seed is not None:
+            query += " AND seed = ?"
+            params.append(int(seed))
+        if dimension is not None:
+            query += " AND dimension = ?"
+            params.append(int(dimension))
+        with self._connect() as db:
+            rows = db.execute(query + " ORDER BY id", params).fetchall()
+        return [_entry(row) for row in rows]
+
+def _entry(row):
+    """
+    catalog row as a dict, extents and max_deltas are None until the
+    attractor has been rendered once
+    """
+    entry = {
+        'id': row['id'],
+        'dimension': row['dimension'],
+        'seed': row['seed'],
+        'coeffs': np.frombuffer(row['coeffs'], dtype=np.float64).copy(),
+        'fill': row['fill'],
+        'lyapunov': row['lyapunov'],
+        'extents': None,
+        'max_deltas': None}
+    if row['xrng'] is not None:
+        entry['extents'] = {key: row[key] for key in _EXTENT_KEYS}
+        entry['max_deltas'] = np.asarray([row['max_dx'], row['max_dy'], row['max_dz']])
+    return entry
@@ -1,22 +1,37 @@
-from concurrent.futures import ProcessPoolExecutor
 import time
 import numpy as np
-from attractor_finder.iterator import iterator_optimized
+from attractor_finder import metrics
+from attractor_finder.iterator import iterator_orbits_omp
+from attractor_finder.iterator_sparse import (
+    iterator_multi, iterator_multi_projected, iterator_projected, iterator_sparse)
+from attractor_finder.pool import available_cores, get_executor, get_n_workers
+from attractor_finder.shared import SharedArray, attach_shared
+from attractor_finder.summary import OrbitSummary, SAMPLES_PER_CHUNK, projection_columns
 
+# iterations every orbit discards before its points are stored, orbits
+# start from points of the check run so this only has to be short
+TRANSIENT_ITERATES = 1000
 
+
+@metrics.span('iterate')
 def compute_attractor_single_thread(coeffs, render_iterates, dimension, render_check_ratio = 0.01):
 
     check_index = int(render_iterates * render_check_ratio)
     x0 = np.random.uniform(-1e-1, 1e-1, (dimension + 1))
-    itdata = np.asarray(iterator_optimized(check_index, coeffs, x0, dimension))
+    itdata = np.asarray(iterator_sparse(check_index, coeffs, x0, dimension))
+    metrics.count('iterations', check_index)
 
     if np.isnan(itdata[-1,-1]) or np.isinf(itdata[-1,-1]):
         print('Error during calculation\n')
+        metrics.count('diverged')
         error = True
     else:
+        # continue from the end of the check run, past the transient
+        x0[1:] = itdata[-1]
         start = time.perf_counter()
-        itdata = np.asarray(iterator_optimized(render_iterates, coeffs, x0, dimension))
+        itdata = np.asarray(iterator_sparse(render_iterates, coeffs, x0, dimension))
         end = time.perf_counter()
+        metrics.count('iterations', render_iterates)
         iteration_time = end - start
 
         print(" Iteration")
@@ -28,28 +43,255 @@ def compute_attractor_single_thread(coeffs, render_iterates, dimension, render_c
 
     return itdata, error
 
+def default_orbits(dimension):
+    """
+    orbits advanced together per worker, the multi-orbit kernel only pays off
+    once there is enough work per step to vectorize (d >= 3)
+    """
+    return 1 if dimension <= 2 else 16
+
+def skip_transient(coeffs, x0, dimension, transient):
+    """
+    advance every orbit of x0 (n_orbits, dimension + 1) by transient
+    iterations without keeping them, returns the new starting points
+    """
+    if transient == 0:
+        return x0
+    if len(x0) == 1:
+        itdata = np.asarray(iterator_sparse(transient, coeffs, x0[0], dimension))
+    else:
+        itdata = np.asarray(iterator_multi(transient, coeffs, x0, dimension))
+    x1 = np.ones_like(x0)
+    x1[:, 1:] = itdata[transient - 1::transient]
+    return x1
+
 def worker(args):
-    thread_iterates, coeffs, x0, dimension = args
-    return np.asarray(iterator_optimized(thread_iterates, coeffs, x0, dimension))
+    """
+    iterate one task of orbits straight into the shared trajectory buffer,
+    every orbit first discards its own transient
+
+    returns (diverged, summary), the summary of the task is only computed
+    if it is requested and none of its orbits diverged
+    """
+    (orbit_iterates, coeffs, x0, dimension, itdata_handle, i0,
+        transient, projected, summarize, n_samples) = args
+    itdata = attach_shared(itdata_handle)
+    out = itdata[i0:i0 + len(x0) * orbit_iterates]
+
+    if projected:
+        columns = projection_columns(dimension)
+        if len(x0) == 1:
+            iterator_projected(orbit_iterates, coeffs, x0[0], dimension, columns, transient, out=out)
+        else:
+            iterator_multi_projected(orbit_iterates, coeffs, x0, dimension, columns, transient, out=out)
+        columns = (0, 1, 2)
+    else:
+        x0 = skip_transient(coeffs, x0, dimension, transient)
+        if len(x0) == 1:
+            iterator_sparse(orbit_iterates, coeffs, x0[0], dimension, out)
+        else:
+            iterator_multi(orbit_iterates, coeffs, x0, dimension, out)
+        columns = projection_columns(dimension)
+
+    # a diverged orbit ends in inf or nan, since nan propagates
+    if not np.all(np.isfinite(out[orbit_iterates - 1::orbit_iterates])):
+        return True, None
+    if summarize:
+        return False, OrbitSummary.from_data(out, columns, 0, orbit_iterates, n_samples)
+    return False, None
+
+def split_tasks(render_iterates, n_tasks, n_orbits):
+    """
+    (orbits, iterates per orbit) of every task, the tasks add up to exactly
+    render_iterates, a remainder smaller than n_orbits gets a one-orbit task
+    """
+    orbit_iterates, remainder = divmod(render_iterates, n_tasks * n_orbits)
+    n_longer, tail = divmod(remainder, n_orbits)
+    tasks = [(n_orbits, orbit_iterates + 1)] * n_longer + [(n_orbits, orbit_iterates)] * (n_tasks - n_longer)
+    if tail:
+        tasks.append((1, tail))
+    return [task for task in tasks if task[1] > 0]
+
+def reseed_rows(start_rows, tasks, check_index):
+    """
+    new random start rows for the orbits of tasks, drawn without replacement
+    from the check run points no other task starts from
+    """
+    kept = [rows for i, rows in enumerate(start_rows) if i not in tasks]
+    free = np.setdiff1d(np.arange(check_index // 2, check_index), np.concatenate(kept) if kept else [])
+    rows = np.random.choice(free, sum(len(start_rows[i]) for i in tasks), replace=False)
+    for i, task_rows in zip(tasks, np.split(rows, np.cumsum([len(start_rows[i]) for i in tasks])[:-1])):
+        start_rows[i] = task_rows
+
+class Trajectory():
+    """
+    trajectory computed by iterate_attractor: the points in a shared array
+    that render workers map in place, the merged OrbitSummary of the
+    iteration workers (None without summarize) and the data columns of the
+    x, y and z axes of the image
+
+    the backing file is removed by release(), AttractorRenderPipeline takes
+    over a trajectory passed to it and releases it with its own buffers
+    """
+
+    def __init__(self, shared, summary, dimension, projected = False):
+        self.shared = shared
+        self.summary = summary
+        self.dimension = dimension
+        self.columns = (0, 1, 2) if projected else tuple(projection_columns(dimension))
+
+    @property
+    def data(self):
+        return self.shared.array
+
+    def release(self):
+        self.shared.release()
 
 def compute_attractor(coeffs, render_iterates, dimension,
-    render_check_ratio = 0.01, n_processes = 6):
+    render_check_ratio = 0.01, n_processes = None, pool = None, n_orbits = None,
+    projected = False, dtype = np.float64,
+    transient = TRANSIENT_ITERATES, tasks_per_worker = 4, max_reseeds = 3):
+    """
+    returns (itdata, error), itdata is None if the orbit diverged, see
+    iterate_attractor for the arguments and for keeping the summary of the
+    iteration workers
+    """
+    trajectory, error = iterate_attractor(coeffs, render_iterates, dimension, render_check_ratio, n_processes,
+        pool, n_orbits, False, projected, dtype, transient, tasks_per_worker, max_reseeds)
+    if error:
+        return None, True
+    trajectory.release()
+    return trajectory.data, False
 
-    check_index = int(render_iterates * render_check_ratio)
+@metrics.span('iterate')
+def iterate_attractor(coeffs, render_iterates, dimension,
+    render_check_ratio = 0.01, n_processes = None, pool = None, n_orbits = None,
+    summarize = True, projected = False, dtype = np.float64,
+    transient = TRANSIENT_ITERATES, tasks_per_worker = 4, max_reseeds = 3):
+    """
+    the iterates are split into tasks_per_worker tasks per worker, handed
+    out to the workers as they become free, every task advances n_orbits
+    orbits with the multi-orbit kernel and the trajectory holds exactly
+    render_iterates points
+
+    orbits start from points of the check run and discard their own
+    transient, so the whole trajectory is rendered, tasks with a diverged
+    orbit are re-seeded from other check run points up to max_reseeds times
+
+    returns (trajectory, error), trajectory is a Trajectory (None if the
+    orbit diverged), its summary is the merged OrbitSummary of the tasks
+    with summarize, which AttractorRenderPipeline uses instead of scanning
+    the trajectory
+
+    projected only stores the x, y, z columns of the image as dtype (float32
+    halves it again)
+    """
+
+    n_processes = get_n_workers(pool, n_processes)
+    if n_orbits is None:
+        n_orbits = default_orbits(dimension)
+    tasks = split_tasks(render_iterates, n_processes * tasks_per_worker, n_orbits)
+    task_orbits = [k for k, _ in tasks]
+    offsets = np.cumsum([0] + [k * n for k, n in tasks])
+    n_samples = SAMPLES_PER_CHUNK * n_processes // len(tasks)
+
+    # orbits start from distinct points of the second half of the check run,
+    # which is made long enough to hold one point per orbit
+    check_index = max(int(render_iterates * render_check_ratio), 2 * sum(task_orbits))
+    x0 = np.random.uniform(-1e-1, 1e-1, (dimension + 1))
+    itdata = np.asarray(iterator_sparse(check_index, coeffs, x0, dimension))
+    metrics.count('iterations', check_index)
+
+    if np.isnan(itdata[-1,-1]) or np.isinf(itdata[-1,-1]):
+        print(' Error during calculation\n')
+        metrics.count('diverged')
+        return None, True
+
+    # later attempts draw random unused check run points for the tasks that diverged
+    start_rows = np.linspace(check_index // 2, check_index - 1, sum(task_orbits)).astype(int)
+    start_rows = np.split(start_rows, np.cumsum(task_orbits)[:-1])
+
+    if projected:
+        shared_itdata = SharedArray((render_iterates, 3), dtype)
+    else:
+        shared_itdata = SharedArray((render_iterates, dimension))
+
+    summaries = [None] * len(tasks)
+    pending = list(range(len(tasks)))
+    n_reseeded = 0
+
+    start = time.perf_counter()
+    with get_executor(pool, n_processes) as executor:
+        for attempt in range(max_reseeds + 1):
+            args_list = []
+            for i in pending:
+                task_x0 = np.ones((tasks[i][0], dimension + 1))
+                task_x0[:, 1:] = itdata[start_rows[i]]
+                args_list.append((tasks[i][1], coeffs, task_x0, dimension, shared_itdata.handle, offsets[i],
+                    transient, projected, summarize, n_samples))
+            results = list(executor.map(worker, args_list))
+            metrics.count('iterations', sum(tasks[i][0] * (tasks[i][1] + transient) for i in pending))
+
+            diverged = []
+            for i, (task_diverged, summary) in zip(pending, results):
+                if task_diverged:
+                    diverged.append(i)
+                summaries[i] = summary
+            if not diverged:
+                break
+            n_reseeded += len(diverged)
+            pending = diverged
+            reseed_rows(start_rows, diverged, check_index)
+    end = time.perf_counter()
+    iteration_time = end - start
+
+    print(" Iteration Phase")
+    print("────────────────────────────────────────────")
+    print(f"• Duration:         {iteration_time:.1f} s")
+    print(f"• Rate:             {render_iterates/iteration_time/1e6:.2f} M it/s")
+    print(f"• Tasks:            {len(tasks)} ({n_reseeded} re-seeded)\n")
+
+    metrics.count('reseeded_tasks', n_reseeded)
+
+    if diverged:
+        shared_itdata.release()
+        print(' Error during calculation\n')
+        metrics.count('diverged')
+        return None, True
+    summary = OrbitSummary.merge_all(summaries) if summarize else None
+    return Trajectory(shared_itdata, summary, dimension, projected), False
+
+@metrics.span('iterate')
+def compute_attractor_omp(coeffs, render_iterates, dimension,
+    render_check_ratio = 0.01, n_threads = None):
+    """
+    single process version of compute_attractor, one orbit per OpenMP thread,
+    returns (itdata, error) like compute_attractor
+    """
+
+    if n_threads is None:
+        n_threads = available_cores()
+
+    # long enough to give every thread its own starting point
+    check_index = max(int(render_iterates * render_check_ratio), 2 * n_threads)
     x0 = np.random.uniform(-1e-1, 1e-1, (dimension + 1))
-    itdata = np.asarray(iterator_optimized(check_index, coeffs, x0, dimension))
+    itdata = np.asarray(iterator_sparse(check_index, coeffs, x0, dimension))
+    metrics.count('iterations', check_index)
 
     if np.isnan(itdata[-1,-1]) or np.isinf(itdata[-1,-1]):
         print(' Error during calculation\n')
+        metrics.count('diverged')
         return None, True
 
-    thread_iterates = render_iterates // n_processes
-    x0_pool = np.random.uniform(-1e-1, 1e-1, (n_processes, dimension + 1))
-    args_list = [(thread_iterates, coeffs, x0_pool[i], dimension) for i in range(n_processes)]
+    # the first orbits run one more iteration, so they add up to render_iterates
+    thread_iterates, n_longer = divmod(render_iterates, n_threads)
+    start_rows = np.linspace(check_index // 2, check_index - 1, n_threads).astype(int)
+    x0_pool = np.ones((n_threads, dimension + 1))
+    x0_pool[:, 1:] = itdata[start_rows]
 
     start = time.perf_counter()
-    with ProcessPoolExecutor(max_workers = n_processes) as executor:
-        it_proc = list(executor.map(worker, args_list))
+    itdata = np.asarray(iterator_orbits_omp(thread_iterates, coeffs, x0_pool, dimension, n_threads, n_longer))
+    metrics.count('iterations', render_iterates)
     end = time.perf_counter()
     iteration_time = end - start
 
@@ -58,6 +300,4 @@ def compute_attractor(coeffs, render_iterates, dimension,
     print(f"• Duration:         {iteration_time:.1f} s")
     print(f"• Rate:             {render_iterates/iteration_time/1e6:.2f} M it/s\n")
 
-    itdata = np.vstack(it_proc)
-
     return itdata, False
@@ -2,8 +2,8 @@ import numpy as np
 import functools
 import time 
 
-from numba import njit, prange
-from attractor_finder.functions_numba import get_min_max_range_numba
+from attractor_finder import metrics
+from attractor_finder.functions_numba import get_min_max_range_numba, classify_orbit
 
 def get_min_max_range(data):
     max_val = np.max(data)
@@ -35,7 +35,20 @@ def set_aspect(xdata, ydata, width, height, debug=False, margin=1.1):
         print(f"• X Range:          {xrng:.2f}")
         print(f"• Y Range:          {yrng:.2f}")
         print(f"• Aspect Ratio:     {xrng/yrng:.2f}\n")
-    
+
+    xmin, ymin, xrng, yrng = frame_bounds(xmin, xrng, ymin, yrng, width, height, margin)
+
+    if debug:
+        print(" Rescaled Data")
+        print("────────────────────────────────────────────")
+        print(f"• X Range:          {xrng:.2f}")
+        print(f"• Y Range:          {yrng:.2f}")
+        print(f"• Aspect Ratio:     {xrng/yrng:.2f}\n")
+
+    return xmin, ymin, xrng, yrng
+
+def frame_bounds(xmin, xrng, ymin, yrng, width, height, margin=1.1):
+    """ boundaries for aspect ratio w/h from the raw extents of the data """
     xmid = xmin + xrng/2
     ymid = ymin + yrng/2
 
@@ -52,12 +65,6 @@ def set_aspect(xdata, ydata, width, height, debug=False, margin=1.1):
 
     xmin = xmid - xrng/2.
     ymin = ymid - yrng/2
-    if debug:
-        print(" Rescaled Data")
-        print("────────────────────────────────────────────")
-        print(f"• X Range:          {xrng:.2f}")
-        print(f"• Y Range:          {yrng:.2f}")
-        print(f"• Aspect Ratio:     {xrng/yrng:.2f}\n")
 
     return xmin, ymin, xrng, yrng
 
@@ -78,6 +85,14 @@ def pixel_density(xl, yl, xres=320, yres=320):
 
     return check_density(render)
     
+def orbit_stats(itdata, coeffs, dimension, xres=320, yres=320):
+    """ fill percentage and largest lyapunov exponent of a finite orbit """
+    xmin, ymin, xrng, yrng = set_aspect(itdata[:,0], itdata[:,1], xres, yres)
+    if not (xrng > 0 and yrng > 0):
+        return 0.0, -np.inf
+    fill, lyapunov = classify_orbit(itdata, coeffs, dimension, xmin, ymin, xrng, yrng, xres, yres)
+    return 100 * fill, lyapunov
+
 def check_density(render, min_fill = 1.5):
     """ check if pixel density exceeds threshold """
     filled_pixels = np.count_nonzero(render)
@@ -86,11 +101,20 @@ def check_density(render, min_fill = 1.5):
         return True
     return False
 
-def time_this(func):
+def time_this(func = None, stage = None):
+    """
+    print the run time of func and record it as a metrics span, named
+    after the stage (search, iterate, bounds, burn, pixel or save) if one
+    is given, else after func, use as @time_this or @time_this(stage='burn')
+    """
+    if func is None:
+        return functools.partial(time_this, stage=stage)
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         start = time.perf_counter()
-        result = func(*args, **kwargs)
+        with metrics.span(func.__name__ if stage is None else stage):
+            result = func(*args, **kwargs)
         end = time.perf_counter()
         elapsed = end - start
         print(f"{elapsed:.2f}s")
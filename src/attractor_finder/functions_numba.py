@@ -1,7 +1,7 @@
 from numba import njit, prange
 import numpy as np
 
-@njit
+@njit(cache=True)
 def get_min_max_range_numba(data):
     min_val = max_val = data[0]
     for x in data:
@@ -11,7 +11,7 @@ def get_min_max_range_numba(data):
             max_val = x 
     return min_val, max_val - min_val
 
-@njit
+@njit(cache=True)
 def get_min_numba(data):
     min_val = data[0]
     for x in data:
@@ -19,7 +19,7 @@ def get_min_numba(data):
             min_val = x
     return min_val
 
-@njit
+@njit(cache=True)
 def get_max_numba(data):
     max_val = data[0]
     for x in data:
@@ -27,7 +27,7 @@ def get_max_numba(data):
             max_val = x
     return max_val
 
-@njit
+@njit(cache=True)
 def get_dx_numba(xdata):
     n = xdata.shape[0] - 1
     out = np.empty(n, dtype=xdata.dtype)
@@ -35,7 +35,7 @@ def get_dx_numba(xdata):
         out[i] = abs(xdata[i+1] - xdata[i])
     return out
 
-@njit(parallel=True)
+@njit(parallel=True, cache=True)
 def get_dx_numba_parallel(xdata):
     n = xdata.shape[0] - 1
     out = np.empty(n, dtype=xdata.dtype)
@@ -43,7 +43,7 @@ def get_dx_numba_parallel(xdata):
         out[i] = abs(xdata[i+1] - xdata[i])
     return out
 
-@njit(parallel=True)
+@njit(parallel=True, cache=True)
 def get_IJ(x, xmin, xrng, xres):
     n = x.shape[0]
     xrng_recip = 1/xrng
@@ -52,10 +52,113 @@ def get_IJ(x, xmin, xrng, xres):
         out[i] = int((x[i] - xmin) * xrng_recip * (xres - 1))
     return out
 
-@njit(parallel=True)
+@njit(parallel=True, cache=True)
 def scale_to_range(x, xmin, xrng, a=0, b=1):
     n = x.shape[0]
     out = np.empty(n, dtype=x.dtype)
     for i in prange(n):
         out[i] = a + b * (x[i] - xmin) / xrng
-    return out
\ No newline at end of file
+    return out
+
+@njit(cache=True)
+def classify_orbit(itdata, coeffs, dimension, xmin, ymin, xrng, yrng, xres, yres):
+    """
+    fill fraction of the (x, y) projection on a uint8 grid and an estimate
+    of the largest lyapunov exponent, computed in the same pass over the orbit
+
+    the lyapunov exponent follows a tangent vector along the stored orbit
+    using the jacobian of the cubic map
+    """
+    grid = np.zeros((yres, xres), dtype=np.uint8)
+    n_filled = 0
+    n = itdata.shape[0]
+    d1 = dimension + 1
+
+    coords = np.ones(d1)
+    v = np.zeros(d1)
+    v_new = np.zeros(d1)
+    v[1] = 1.0
+    log_sum = 0.0
+
+    for t in range(n):
+        J = int((itdata[t, 0] - xmin) / xrng * (xres - 1))
+        I = int((itdata[t, 1] - ymin) / yrng * (yres - 1))
+        if grid[I, J] == 0:
+            grid[I, J] = 1
+            n_filled += 1
+
+        if t == n - 1:
+            break
+
+        for m in range(dimension):
+            coords[m + 1] = itdata[t, m]
+
+        # directional derivative of the map at coords along v
+        c = 0
+        for m in range(dimension):
+            fsum = 0.0
+            for i in range(d1):
+                for j in range(i, d1):
+                    for k in range(j, d1):
+                        fsum += coeffs[c] * (v[i] * coords[j] * coords[k]
+                            + coords[i] * v[j] * coords[k]
+                            + coords[i] * coords[j] * v[k])
+                        c += 1
+            v_new[m + 1] = fsum
+
+        norm = 0.0
+        for m in range(1, d1):
+            norm += v_new[m] * v_new[m]
+        norm = np.sqrt(norm)
+        if norm == 0.0:
+            return n_filled / (xres * yres), -np.inf
+
+        log_sum += np.log(norm)
+        for m in range(1, d1):
+            v[m] = v_new[m] / norm
+
+    return n_filled / (xres * yres), log_sum / max(n - 1, 1)
+
+@njit(cache=True)
+def summarize_projection(data, columns, start, orbit_length, n_samples):
+    """
+    min, max and largest absolute step of three columns in one pass over
+    data[start:], plus a strided sample of n_samples rows
+
+    steps are not taken across orbit boundaries (rows that are a multiple
+    of orbit_length), any non-finite value makes the extents nan, an empty
+    range gives inf / -inf which are neutral when merging
+    """
+    mins = np.full(3, np.inf)
+    maxs = np.full(3, -np.inf)
+    max_steps = np.zeros(3)
+    finite = True
+    n = data.shape[0]
+
+    for t in range(start, n):
+        for a in range(3):
+            x = data[t, columns[a]]
+            if not np.isfinite(x):
+                finite = False
+            if x < mins[a]:
+                mins[a] = x
+            if x > maxs[a]:
+                maxs[a] = x
+            if t > start and t % orbit_length != 0:
+                step = abs(x - data[t - 1, columns[a]])
+                if step > max_steps[a]:
+                    max_steps[a] = step
+
+    if not finite:
+        mins[:] = np.nan
+        maxs[:] = np.nan
+
+    n_samples = min(n_samples, max(n - start, 0))
+    samples = np.empty((n_samples, 3))
+    if n_samples > 0:
+        stride = (n - start) // n_samples
+        for s in range(n_samples):
+            for a in range(3):
+                samples[s, a] = data[start + s * stride, columns[a]]
+
+    return mins, maxs, max_steps, samples
@@ -0,0 +1,62 @@
+import numpy as np
+
+
+class Histogram():
+    """
+    per-pixel hit statistics of a render, independent of alpha and colours
+
+    counts (uint32) and wsum (float64, 3 channels) are filled by
+    renderer_hist.accumulate_histogram, the alpha and colours of the render
+    that produced them are kept as defaults for tone_map
+
+    saved histograms can be re-toned for any alpha or palette without
+    iterating the map again
+    """
+
+    def __init__(self, counts, wsum, alpha = 0.025,
+        bgcolor = (0.9, 0.9, 0.85), burn_factors = (0.75, 1.00, 1.25)):
+
+        self.counts = counts
+        self.wsum = wsum
+        self.alpha = float(alpha)
+        self.bgcolor = np.asarray(bgcolor, dtype=np.float64)
+        self.burn_factors = np.asarray(burn_factors, dtype=np.float64)
+
+    @classmethod
+    def empty(cls, xres, yres, **settings):
+        return cls(
+            np.zeros((yres, xres), dtype=np.uint32),
+            np.zeros((yres, xres, 3), dtype=np.float64),
+            **settings)
+
+    @property
+    def shape(self):
+        return self.counts.shape
+
+    def tone_map(self, alpha = None, bgcolor = None, burn_factors = None):
+        """ image of shape (yres, xres, 3), settings default to those of the render """
+        # imported here, so scripts/retone.py --help does not load the kernels
+        from attractor_finder.renderer_hist import tone_map
+        alpha = self.alpha if alpha is None else alpha
+        bgcolor = self.bgcolor if bgcolor is None else np.asarray(bgcolor, dtype=np.float64)
+        burn_factors = self.burn_factors if burn_factors is None else np.asarray(burn_factors, dtype=np.float64)
+        return np.asarray(tone_map(self.counts, self.wsum, alpha, bgcolor, burn_factors))
+
+    def save(self, path):
+        np.savez(path,
+            counts=self.counts,
+            wsum=self.wsum,
+            alpha=self.alpha,
+            bgcolor=self.bgcolor,
+            burn_factors=self.burn_factors)
+
+    @classmethod
+    def load(cls, path):
+        # histograms saved before wsum was accumulated in float64 still load
+        with np.load(path) as data:
+            return cls(
+                data['counts'],
+                data['wsum'].astype(np.float64),
+                float(data['alpha']),
+                data['bgcolor'],
+                data['burn_factors'])
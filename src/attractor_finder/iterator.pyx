@@ -1,6 +1,7 @@
 #cython: boundscheck=False, wraparound=False, nonecheck=False
 
 import numpy as np 
+from cython.parallel import prange
 
 def iterator(int n_iterations, double[:] coeffs, double[:] x0, int dimension):
 
@@ -59,7 +60,8 @@ def iterator(int n_iterations, double[:] coeffs, double[:] x0, int dimension):
 
 	return itdata
 
-def iterator_optimized(int n_iterations, double[:] coeffs, double[:] x0, int dimension):
+def iterator_optimized(int n_iterations, double[:] coeffs, double[:] x0, int dimension,
+	double[:,:] out = None):
 
 	"""
 	parameters
@@ -76,6 +78,9 @@ def iterator_optimized(int n_iterations, double[:] coeffs, double[:] x0, int dim
 	
 	dimension : int
 		number of variables
+
+	out : np.ndarray of shape (n_iterations, dimension), optional
+		buffer the trajectory is written into, e.g. a shared array
 	"""
 
 	cdef double fsum = 0
@@ -91,7 +96,12 @@ def iterator_optimized(int n_iterations, double[:] coeffs, double[:] x0, int dim
 
 	cdef double[:] coords = np.copy(x0)
 	cdef double[:] sums = np.zeros(dimension)
-	cdef double[:,:] itdata = np.zeros((n_iterations, dimension))
+	cdef double[:,:] itdata
+
+	if out is None:
+		itdata = np.zeros((n_iterations, dimension))
+	else:
+		itdata = out
 
 	coords[0] = 1
 
@@ -117,4 +127,204 @@ def iterator_optimized(int n_iterations, double[:] coeffs, double[:] x0, int dim
 			coords[i + 1] = sums[i]
 			itdata[t, i] = sums[i]
 
-	return itdata
\ No newline at end of file
+	return itdata
+
+def iterator_batch(int n_iterations, double[:,:] coeffs, double[:,:] x0, int dimension,
+	double escape = 1e6, double fixed_tol = 1e-10):
+
+	"""
+	advance a batch of candidate coefficient sets in lockstep, candidates
+	are retired as soon as they diverge or collapse onto a fixed point
+
+	parameters
+	----------
+
+	n_iterations : int 
+		number of iterations
+
+	coeffs : np.ndarray of shape (n_candidates, num_coeffs)
+		attractor coefficients, one row per candidate
+
+	x0 : np.ndarray of shape (n_candidates, dimension + 1)
+		initial position vectors
+	
+	dimension : int
+		number of variables
+
+	escape : float
+		candidates with a coordinate larger than this are considered diverged
+
+	fixed_tol : float
+		candidates that move less than this in one step are considered fixed points
+
+	returns
+	-------
+
+	itdata : np.ndarray of shape (n_candidates, n_iterations, dimension)
+		trajectories, only complete for surviving candidates
+
+	status : np.ndarray of shape (n_candidates,)
+		0 = survived, 1 = diverged, 2 = fixed point
+	"""
+
+	cdef int n_candidates = coeffs.shape[0]
+	cdef int d1 = dimension + 1
+
+	cdef int t
+	cdef int m
+	cdef int n
+	cdef int i
+	cdef int j
+	cdef int k
+	cdef int a
+	cdef int c
+	cdef int n_active = n_candidates
+	cdef int n_keep
+	cdef double v
+	cdef double step
+	cdef double max_step
+
+	# structure-of-arrays layout, the candidate index runs fastest
+	cdef double[:,:] coords = np.ones((d1, n_candidates))
+	cdef double[:,:] sums = np.zeros((dimension, n_candidates))
+	cdef int[:] active = np.arange(n_candidates, dtype=np.intc)
+	cdef signed char[:] status = np.zeros(n_candidates, dtype=np.int8)
+	cdef double[:,:,:] itdata = np.zeros((n_candidates, n_iterations, dimension))
+
+	for c in range(n_candidates):
+		for i in range(1, d1):
+			coords[i, c] = x0[c, i]
+
+	for t in range(n_iterations):
+
+		if n_active == 0:
+			break
+
+		n = 0
+
+		for m in range(dimension):
+
+			for a in range(n_active):
+				sums[m, a] = 0
+
+			for i in range(d1):
+				for j in range(i, d1):
+					for k in range(j, d1):
+
+						for a in range(n_active):
+							c = active[a]
+							sums[m, a] += coeffs[c, n] * coords[i, c] * coords[j, c] * coords[k, c]
+
+						n += 1
+
+		n_keep = 0
+
+		for a in range(n_active):
+			c = active[a]
+			max_step = 0
+
+			for m in range(dimension):
+				v = sums[m, a]
+				step = abs(v - coords[m + 1, c])
+				if step > max_step:
+					max_step = step
+				coords[m + 1, c] = v
+				itdata[c, t, m] = v
+
+				# nan fails the comparison, so it is caught as well
+				if not abs(v) < escape:
+					status[c] = 1
+
+			if status[c] == 0 and max_step < fixed_tol:
+				status[c] = 2
+
+			if status[c] == 0:
+				active[n_keep] = c
+				n_keep += 1
+
+		n_active = n_keep
+
+	return itdata, status
+
+
+cdef inline void _iterate_orbit(Py_ssize_t n_iterations, double[:] coeffs, double[:] coords,
+	double[:] sums, int dimension, double[:,:] itdata) noexcept nogil:
+
+	cdef Py_ssize_t t
+	cdef int m, n, i, j, k
+	cdef int d1 = dimension + 1
+	cdef double fsum
+
+	coords[0] = 1
+
+	for t in range(n_iterations):
+
+		n = 0
+
+		for m in range(dimension):
+
+			fsum = 0
+
+			for i in range(d1):
+				for j in range(i, d1):
+					for k in range(j, d1):
+
+						fsum = fsum + coeffs[n] * coords[i] * coords[j] * coords[k]
+
+						n += 1
+
+			sums[m] = fsum
+
+		for i in range(dimension):
+			coords[i + 1] = sums[i]
+			itdata[t, i] = sums[i]
+
+
+def iterator_orbits_omp(Py_ssize_t n_iterations, double[:] coeffs, double[:,:] x0, int dimension, int n_threads,
+	Py_ssize_t n_longer = 0):
+
+	"""
+	iterate one orbit per row of x0 on n_threads OpenMP threads
+
+	parameters
+	----------
+
+	n_iterations : int
+		number of iterations per orbit
+
+	coeffs : np.ndarray of shape (num_coeffs,)
+		attractor coefficients
+
+	x0 : np.ndarray of shape (n_orbits, dimension + 1)
+		initial position vectors
+
+	dimension : int
+		number of variables
+
+	n_threads : int
+		number of OpenMP threads
+
+	n_longer : int
+		number of leading orbits that run one more iteration, so the
+		orbits add up to any total
+
+	returns
+	-------
+
+	itdata : np.ndarray of shape (n_orbits * n_iterations + n_longer, dimension)
+		orbits stacked one after the other
+	"""
+
+	cdef int n_orbits = x0.shape[0]
+	cdef double[:,:] coords = np.copy(x0)
+	cdef double[:,:] sums = np.zeros((n_orbits, dimension))
+	cdef double[:,:] itdata = np.zeros((n_orbits * n_iterations + n_longer, dimension))
+	cdef Py_ssize_t start, length
+	cdef int o
+
+	for o in prange(n_orbits, nogil=True, num_threads=n_threads, schedule='dynamic'):
+		start = o * n_iterations + (o if o < n_longer else n_longer)
+		length = n_iterations + (1 if o < n_longer else 0)
+		_iterate_orbit(length, coeffs, coords[o], sums[o], dimension, itdata[start:start + length])
+
+	return itdata
@@ -0,0 +1,485 @@
+#cython: boundscheck=False, wraparound=False, nonecheck=False
+
+import numpy as np
+
+
+def compact_coeffs(coeffs, int dimension):
+
+	"""
+	nonzero coefficients of an attractor as parallel arrays
+
+	returns
+	-------
+
+	term_start : np.ndarray of int, shape (dimension + 1,)
+		terms of output coordinate m are term_start[m] <= s < term_start[m + 1]
+
+	term_mono : np.ndarray of int
+		index of the monomial (in i <= j <= k order) of each term
+
+	term_coeff : np.ndarray of float
+		coefficient of each term
+	"""
+
+	coeffs = np.asarray(coeffs, dtype=np.float64)
+	n_monomials = len(coeffs) // dimension
+	nonzero = np.flatnonzero(coeffs)
+	term_start = np.searchsorted(nonzero, np.arange(dimension + 1) * n_monomials).astype(np.intc)
+	term_mono = (nonzero % n_monomials).astype(np.intc)
+	return term_start, term_mono, coeffs[nonzero]
+
+
+cdef inline void _iterate(Py_ssize_t n_iterations, int d1, double[::1] coords, double[::1] mono, double[::1] sums,
+	int[::1] term_start, int[::1] term_mono, double[::1] term_coeff, double[:,:] itdata) noexcept nogil:
+
+	# d1 is a literal in the specialized callers below, the C compiler
+	# propagates it and unrolls the monomial loops for each dimension
+
+	cdef Py_ssize_t t
+	cdef int m
+	cdef int q
+	cdef int s
+	cdef int i
+	cdef int j
+	cdef int k
+	cdef double p
+	cdef double fsum
+
+	for t in range(n_iterations):
+
+		# every cubic monomial is computed once per step and shared by all outputs
+		q = 0
+
+		for i in range(d1):
+			for j in range(i, d1):
+				p = coords[i] * coords[j]
+				for k in range(j, d1):
+					mono[q] = p * coords[k]
+					q += 1
+
+		for m in range(d1 - 1):
+			fsum = 0
+			for s in range(term_start[m], term_start[m + 1]):
+				fsum = fsum + term_coeff[s] * mono[term_mono[s]]
+			sums[m] = fsum
+
+		for m in range(d1 - 1):
+			coords[m + 1] = sums[m]
+			itdata[t, m] = sums[m]
+
+
+cdef void _iterate_d2(Py_ssize_t n_iterations, double[::1] coords, double[::1] mono, double[::1] sums,
+	int[::1] term_start, int[::1] term_mono, double[::1] term_coeff, double[:,:] itdata) noexcept nogil:
+	_iterate(n_iterations, 3, coords, mono, sums, term_start, term_mono, term_coeff, itdata)
+
+cdef void _iterate_d3(Py_ssize_t n_iterations, double[::1] coords, double[::1] mono, double[::1] sums,
+	int[::1] term_start, int[::1] term_mono, double[::1] term_coeff, double[:,:] itdata) noexcept nogil:
+	_iterate(n_iterations, 4, coords, mono, sums, term_start, term_mono, term_coeff, itdata)
+
+cdef void _iterate_d4(Py_ssize_t n_iterations, double[::1] coords, double[::1] mono, double[::1] sums,
+	int[::1] term_start, int[::1] term_mono, double[::1] term_coeff, double[:,:] itdata) noexcept nogil:
+	_iterate(n_iterations, 5, coords, mono, sums, term_start, term_mono, term_coeff, itdata)
+
+cdef void _iterate_d5(Py_ssize_t n_iterations, double[::1] coords, double[::1] mono, double[::1] sums,
+	int[::1] term_start, int[::1] term_mono, double[::1] term_coeff, double[:,:] itdata) noexcept nogil:
+	_iterate(n_iterations, 6, coords, mono, sums, term_start, term_mono, term_coeff, itdata)
+
+cdef void _iterate_d6(Py_ssize_t n_iterations, double[::1] coords, double[::1] mono, double[::1] sums,
+	int[::1] term_start, int[::1] term_mono, double[::1] term_coeff, double[:,:] itdata) noexcept nogil:
+	_iterate(n_iterations, 7, coords, mono, sums, term_start, term_mono, term_coeff, itdata)
+
+
+def iterator_sparse(Py_ssize_t n_iterations, double[:] coeffs, double[:] x0, int dimension,
+	double[:,:] out = None):
+
+	"""
+	drop-in replacement for iterator_optimized that computes the monomial
+	basis once per step and skips zero coefficients, dimensions 2 to 6 use
+	specialized kernels
+
+	parameters
+	----------
+
+	n_iterations : int
+		number of iterations
+
+	coeffs : np.ndarray of shape (num_coeffs,)
+		attractor coefficients
+
+	x0 : np.ndarray of shape (dimension + 1,)
+		initial position vector
+
+	dimension : int
+		number of variables
+
+	out : np.ndarray of shape (n_iterations, dimension), optional
+		buffer the trajectory is written into, e.g. a shared array
+	"""
+
+	cdef int d1 = dimension + 1
+	cdef int[::1] term_start
+	cdef int[::1] term_mono
+	cdef double[::1] term_coeff
+	cdef double[::1] coords = np.array(x0, dtype=np.float64)
+	cdef double[::1] mono = np.zeros(d1 * (d1 + 1) * (d1 + 2) // 6)
+	cdef double[::1] sums = np.zeros(dimension)
+	cdef double[:,:] itdata
+
+	term_start, term_mono, term_coeff = compact_coeffs(coeffs, dimension)
+
+	if out is None:
+		itdata = np.zeros((n_iterations, dimension))
+	else:
+		itdata = out
+
+	coords[0] = 1
+
+	with nogil:
+		if dimension == 2:
+			_iterate_d2(n_iterations, coords, mono, sums, term_start, term_mono, term_coeff, itdata)
+		elif dimension == 3:
+			_iterate_d3(n_iterations, coords, mono, sums, term_start, term_mono, term_coeff, itdata)
+		elif dimension == 4:
+			_iterate_d4(n_iterations, coords, mono, sums, term_start, term_mono, term_coeff, itdata)
+		elif dimension == 5:
+			_iterate_d5(n_iterations, coords, mono, sums, term_start, term_mono, term_coeff, itdata)
+		elif dimension == 6:
+			_iterate_d6(n_iterations, coords, mono, sums, term_start, term_mono, term_coeff, itdata)
+		else:
+			_iterate(n_iterations, d1, coords, mono, sums, term_start, term_mono, term_coeff, itdata)
+
+	return itdata
+
+
+def iterator_multi(Py_ssize_t n_iterations, double[:] coeffs, double[:,:] x0, int dimension,
+	double[:,:] out = None):
+
+	"""
+	advance several independent orbits of the same attractor in lockstep,
+	the state is stored structure-of-arrays so the innermost loops run over
+	orbits and can be vectorized by the compiler
+
+	parameters
+	----------
+
+	n_iterations : int
+		number of iterations per orbit
+
+	coeffs : np.ndarray of shape (num_coeffs,)
+		attractor coefficients
+
+	x0 : np.ndarray of shape (n_orbits, dimension + 1)
+		initial position vectors
+
+	dimension : int
+		number of variables
+
+	out : np.ndarray of shape (n_orbits * n_iterations, dimension), optional
+		buffer the trajectories are written into, e.g. a shared array
+
+	returns
+	-------
+
+	itdata : np.ndarray of shape (n_orbits * n_iterations, dimension)
+		orbits stacked one after the other, the same layout as stacking the
+		output of iterator_sparse for each orbit
+
+	the output is orbit-major rather than interleaved, the renderers take the
+	step of a point from the row before it, which has to belong to the same orbit
+	"""
+
+	cdef int d1 = dimension + 1
+	cdef int n_orbits = x0.shape[0]
+	cdef int n_monomials = d1 * (d1 + 1) * (d1 + 2) // 6
+	cdef int[::1] term_start
+	cdef int[::1] term_mono
+	cdef double[::1] term_coeff
+	cdef double[:,::1] coords = np.ones((d1, n_orbits))
+	cdef double[:,::1] mono = np.zeros((n_monomials, n_orbits))
+	cdef double[:,::1] sums = np.zeros((dimension, n_orbits))
+	cdef double[::1] pair = np.zeros(n_orbits)
+	cdef double[:,:] itdata
+
+	cdef Py_ssize_t t
+	cdef int m, q, s, i, j, k, o
+	cdef double c
+
+	term_start, term_mono, term_coeff = compact_coeffs(coeffs, dimension)
+
+	if out is None:
+		itdata = np.zeros((n_orbits * n_iterations, dimension))
+	else:
+		itdata = out
+
+	for o in range(n_orbits):
+		for i in range(1, d1):
+			coords[i, o] = x0[o, i]
+
+	with nogil:
+		for t in range(n_iterations):
+
+			q = 0
+
+			for i in range(d1):
+				for j in range(i, d1):
+					for o in range(n_orbits):
+						pair[o] = coords[i, o] * coords[j, o]
+					for k in range(j, d1):
+						for o in range(n_orbits):
+							mono[q, o] = pair[o] * coords[k, o]
+						q += 1
+
+			for m in range(dimension):
+				for o in range(n_orbits):
+					sums[m, o] = 0
+				for s in range(term_start[m], term_start[m + 1]):
+					c = term_coeff[s]
+					q = term_mono[s]
+					for o in range(n_orbits):
+						sums[m, o] += c * mono[q, o]
+
+			for m in range(dimension):
+				for o in range(n_orbits):
+					coords[m + 1, o] = sums[m, o]
+					itdata[o * n_iterations + t, m] = sums[m, o]
+
+	return itdata
+
+
+ctypedef fused real:
+	float
+	double
+
+
+cdef inline void _iterate_projected(Py_ssize_t n_iterations, Py_ssize_t n_discard, int d1, int ix, int iy, int iz,
+	double[::1] coords, double[::1] mono, double[::1] sums,
+	int[::1] term_start, int[::1] term_mono, double[::1] term_coeff, real[:,:] out) noexcept nogil:
+
+	# same step as _iterate, only the projected columns are stored
+
+	cdef Py_ssize_t t
+	cdef int m
+	cdef int q
+	cdef int s
+	cdef int i
+	cdef int j
+	cdef int k
+	cdef double p
+	cdef double fsum
+
+	for t in range(n_discard + n_iterations):
+
+		q = 0
+
+		for i in range(d1):
+			for j in range(i, d1):
+				p = coords[i] * coords[j]
+				for k in range(j, d1):
+					mono[q] = p * coords[k]
+					q += 1
+
+		for m in range(d1 - 1):
+			fsum = 0
+			for s in range(term_start[m], term_start[m + 1]):
+				fsum = fsum + term_coeff[s] * mono[term_mono[s]]
+			sums[m] = fsum
+
+		for m in range(d1 - 1):
+			coords[m + 1] = sums[m]
+
+		if t >= n_discard:
+			out[t - n_discard, 0] = <real>coords[ix + 1]
+			out[t - n_discard, 1] = <real>coords[iy + 1]
+			out[t - n_discard, 2] = <real>coords[iz + 1]
+
+
+cdef void _dispatch_projected(Py_ssize_t n_iterations, Py_ssize_t n_discard, int dimension, int ix, int iy, int iz,
+	double[::1] coords, double[::1] mono, double[::1] sums,
+	int[::1] term_start, int[::1] term_mono, double[::1] term_coeff, real[:,:] out) noexcept nogil:
+
+	# literal d1 per branch, as in the _iterate_d* kernels
+	if dimension == 2:
+		_iterate_projected(n_iterations, n_discard, 3, ix, iy, iz, coords, mono, sums, term_start, term_mono, term_coeff, out)
+	elif dimension == 3:
+		_iterate_projected(n_iterations, n_discard, 4, ix, iy, iz, coords, mono, sums, term_start, term_mono, term_coeff, out)
+	elif dimension == 4:
+		_iterate_projected(n_iterations, n_discard, 5, ix, iy, iz, coords, mono, sums, term_start, term_mono, term_coeff, out)
+	elif dimension == 5:
+		_iterate_projected(n_iterations, n_discard, 6, ix, iy, iz, coords, mono, sums, term_start, term_mono, term_coeff, out)
+	elif dimension == 6:
+		_iterate_projected(n_iterations, n_discard, 7, ix, iy, iz, coords, mono, sums, term_start, term_mono, term_coeff, out)
+	else:
+		_iterate_projected(n_iterations, n_discard, dimension + 1, ix, iy, iz, coords, mono, sums, term_start, term_mono, term_coeff, out)
+
+
+def iterator_projected(Py_ssize_t n_iterations, double[:] coeffs, double[:] x0, int dimension, columns,
+	Py_ssize_t n_discard = 0, dtype = np.float64, out = None):
+
+	"""
+	iterator_sparse that only stores the three projected columns, optionally
+	as float32, and skips a warm-up transient without storing it
+
+	parameters
+	----------
+
+	n_iterations : int
+		number of stored iterations
+
+	columns : sequence of 3 ints
+		coordinate indices stored as the x, y and z columns
+
+	n_discard : int
+		number of iterations skipped before storing
+
+	dtype : np.float32 or np.float64
+		storage type, ignored if out is given
+
+	out : np.ndarray of shape (n_iterations, 3), optional
+		buffer the projected trajectory is written into, e.g. a shared array
+	"""
+
+	cdef int d1 = dimension + 1
+	cdef int ix = columns[0]
+	cdef int iy = columns[1]
+	cdef int iz = columns[2]
+	cdef int[::1] term_start
+	cdef int[::1] term_mono
+	cdef double[::1] term_coeff
+	cdef double[::1] coords = np.array(x0, dtype=np.float64)
+	cdef double[::1] mono = np.zeros(d1 * (d1 + 1) * (d1 + 2) // 6)
+	cdef double[::1] sums = np.zeros(dimension)
+	cdef float[:,:] out_f
+	cdef double[:,:] out_d
+
+	term_start, term_mono, term_coeff = compact_coeffs(coeffs, dimension)
+
+	if out is None:
+		out = np.zeros((n_iterations, 3), dtype=dtype)
+
+	coords[0] = 1
+
+	if out.dtype == np.float32:
+		out_f = out
+		with nogil:
+			_dispatch_projected(n_iterations, n_discard, dimension, ix, iy, iz,
+				coords, mono, sums, term_start, term_mono, term_coeff, out_f)
+	else:
+		out_d = out
+		with nogil:
+			_dispatch_projected(n_iterations, n_discard, dimension, ix, iy, iz,
+				coords, mono, sums, term_start, term_mono, term_coeff, out_d)
+
+	return out
+
+
+cdef void _multi_projected(Py_ssize_t n_iterations, Py_ssize_t n_discard, int dimension, int n_orbits, int ix, int iy, int iz,
+	double[:,::1] coords, double[:,::1] mono, double[:,::1] sums, double[::1] pair,
+	int[::1] term_start, int[::1] term_mono, double[::1] term_coeff, real[:,:] out) noexcept nogil:
+
+	# same lockstep step as iterator_multi, only the projected columns are stored
+
+	cdef int d1 = dimension + 1
+	cdef Py_ssize_t t
+	cdef int m, q, s, i, j, k, o
+	cdef double c
+
+	for t in range(n_discard + n_iterations):
+
+		q = 0
+
+		for i in range(d1):
+			for j in range(i, d1):
+				for o in range(n_orbits):
+					pair[o] = coords[i, o] * coords[j, o]
+				for k in range(j, d1):
+					for o in range(n_orbits):
+						mono[q, o] = pair[o] * coords[k, o]
+					q += 1
+
+		for m in range(dimension):
+			for o in range(n_orbits):
+				sums[m, o] = 0
+			for s in range(term_start[m], term_start[m + 1]):
+				c = term_coeff[s]
+				q = term_mono[s]
+				for o in range(n_orbits):
+					sums[m, o] += c * mono[q, o]
+
+		for m in range(dimension):
+			for o in range(n_orbits):
+				coords[m + 1, o] = sums[m, o]
+
+		if t >= n_discard:
+			for o in range(n_orbits):
+				out[o * n_iterations + t - n_discard, 0] = <real>coords[ix + 1, o]
+				out[o * n_iterations + t - n_discard, 1] = <real>coords[iy + 1, o]
+				out[o * n_iterations + t - n_discard, 2] = <real>coords[iz + 1, o]
+
+
+def iterator_multi_projected(Py_ssize_t n_iterations, double[:] coeffs, double[:,:] x0, int dimension, columns,
+	Py_ssize_t n_discard = 0, dtype = np.float64, out = None):
+
+	"""
+	iterator_multi that only stores the three projected columns, optionally
+	as float32, and skips a warm-up transient of every orbit without storing it
+
+	parameters
+	----------
+
+	n_iterations : int
+		number of stored iterations per orbit
+
+	x0 : np.ndarray of shape (n_orbits, dimension + 1)
+		initial position vectors
+
+	columns : sequence of 3 ints
+		coordinate indices stored as the x, y and z columns
+
+	n_discard : int
+		number of iterations skipped before storing
+
+	dtype : np.float32 or np.float64
+		storage type, ignored if out is given
+
+	out : np.ndarray of shape (n_orbits * n_iterations, 3), optional
+		buffer the projected orbits are written into, stacked one after the other
+	"""
+
+	cdef int d1 = dimension + 1
+	cdef int n_orbits = x0.shape[0]
+	cdef int n_monomials = d1 * (d1 + 1) * (d1 + 2) // 6
+	cdef int[::1] term_start
+	cdef int[::1] term_mono
+	cdef double[::1] term_coeff
+	cdef double[:,::1] coords = np.ones((d1, n_orbits))
+	cdef double[:,::1] mono = np.zeros((n_monomials, n_orbits))
+	cdef double[:,::1] sums = np.zeros((dimension, n_orbits))
+	cdef double[::1] pair = np.zeros(n_orbits)
+	cdef int ix = columns[0]
+	cdef int iy = columns[1]
+	cdef int iz = columns[2]
+	cdef float[:,:] out_f
+	cdef double[:,:] out_d
+	cdef int o, i
+
+	term_start, term_mono, term_coeff = compact_coeffs(coeffs, dimension)
+
+	if out is None:
+		out = np.zeros((n_orbits * n_iterations, 3), dtype=dtype)
+
+	for o in range(n_orbits):
+		for i in range(1, d1):
+			coords[i, o] = x0[o, i]
+
+	if out.dtype == np.float32:
+		out_f = out
+		with nogil:
+			_multi_projected(n_iterations, n_discard, dimension, n_orbits, ix, iy, iz,
+				coords, mono, sums, pair, term_start, term_mono, term_coeff, out_f)
+	else:
+		out_d = out
+		with nogil:
+			_multi_projected(n_iterations, n_discard, dimension, n_orbits, ix, iy, iz,
+				coords, mono, sums, pair, term_start, term_mono, term_coeff, out_d)
+
+	return out
@@ -0,0 +1,159 @@
+from pathlib import Path
+import json
+import os
+import socket
+import time
+
+STATES = ('pending', 'claimed', 'done', 'failed')
+
+
+def default_worker_id():
+    """ host and process id, dots are replaced since they separate job and worker in claim names """
+    return f'{socket.gethostname()}-{os.getpid()}'.replace('.', '_')
+
+def _write_atomic(path, data):
+    """ write json next to path and rename it into place, readers never see a partial file """
+    tmp = path.with_name(f'.{path.name}.{default_worker_id()}.tmp')
+    tmp.write_text(json.dumps(data, indent=2, default=str))
+    os.replace(tmp, path)
+
+
+class JobQueue():
+    """
+    work queue in a (possibly network mounted) shared directory, no service
+    is needed, every state is a file:
+
+        pending/{id}.json              jobs waiting for a worker
+        claimed/{id}.{worker}.json     jobs a worker is working on
+        done/{id}.json                 completion markers holding the result
+        failed/{id}.json               jobs that raised, with the error
+
+    a job is claimed by renaming it from pending/ to claimed/, the rename is
+    atomic, so when several workers race for a job exactly one succeeds, the
+    others move on to the next one
+
+    workers touch their claim (heartbeat) as they make progress, claims that
+    were not touched for longer than a timeout belong to a crashed worker and
+    are moved back to pending/ by requeue_stale, jobs that are done are never
+    handed out again, so restarted coordinators and workers skip finished work
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        for state in STATES:
+            (self.directory / state).mkdir(parents=True, exist_ok=True)
+
+    def _path(self, state, job_id):
+        return self.directory / state / f'{job_id}.json'
+
+    def _claim_path(self, job):
+        return self.directory / 'claimed' / f"{job['id']}.{job['worker']}.json"
+
+    def _ids(self, state):
+        return {path.name.split('.')[0] for path in (self.directory / state).glob('*.json')}
+
+    def submit(self, jobs):
+        """ queue jobs (dicts with a unique 'id'), ids the queue already knows are skipped, returns the number queued """
+        known = set().union(*(self._ids(state) for state in STATES))
+        n_submitted = 0
+        for job in jobs:
+            if job['id'] in known:
+                continue
+            _write_atomic(self._path('pending', job['id']), job)
+            n_submitted += 1
+        return n_submitted
+
+    def claim(self, worker):
+        """ claim the first pending job that is not done yet, None once the queue is empty """
+        done = self._ids('done')
+        for path in sorted((self.directory / 'pending').glob('*.json')):
+            job_id = path.name.split('.')[0]
+            if job_id in done:
+                path.unlink(missing_ok=True)
+                continue
+            claim = self.directory / 'claimed' / f'{job_id}.{worker}.json'
+            try:
+                os.rename(path, claim)
+                # the rename keeps the submission time, which would look stale
+                os.utime(claim)
+                job = json.loads(claim.read_text())
+            except FileNotFoundError:
+                # another worker claimed it first (or requeued it right away)
+                continue
+            job['worker'] = worker
+            return job
+        return None
+
+    def heartbeat(self, job):
+        """ mark the claim as alive, False if it was requeued meanwhile """
+        try:
+            os.utime(self._claim_path(job))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, job, result):
+        """ write the completion marker, then drop the claim """
+        _write_atomic(self._path('done', job['id']), {'job': job, 'result': result, 'finished': time.time()})
+        self._claim_path(job).unlink(missing_ok=True)
+
+    def fail(self, job, error):
+        _write_atomic(self._path('failed', job['id']), {'job': job, 'error': error, 'finished': time.time()})
+        self._claim_path(job).unlink(missing_ok=True)
+
+    def release(self, job):
+        """ hand an unfinished job back, e.g. when the worker is interrupted """
+        try:
+            os.rename(self._claim_path(job), self._path('pending', job['id']))
+        except FileNotFoundError:
+            pass
+
+    def requeue_stale(self, timeout):
+        """ move claims without a heartbeat for timeout seconds back to pending, returns their number """
+        n_requeued = 0
+        now = time.time()
+        done = self._ids('done')
+        for claim in (self.directory / 'claimed').glob('*.json'):
+            job_id = claim.name.split('.')[0]
+            try:
+                if now - claim.stat().st_mtime < timeout:
+                    continue
+                if job_id in done:
+                    claim.unlink()
+                else:
+                    os.rename(claim, self._path('pending', job_id))
+                    n_requeued += 1
+            except FileNotFoundError:
+                # finished or requeued by someone else in the meantime
+                continue
+        return n_requeued
+
+    def results(self):
+        """ completion markers of every finished job, in job order """
+        return [json.loads(path.read_text()) for path in sorted((self.directory / 'done').glob('*.json'))]
+
+    def status(self):
+        return {state: len(self._ids(state)) for state in STATES}
+
+    def print_status(self):
+        status = self.status()
+        print("────────────────────────────────────────────")
+        print(f" Job Queue {self.directory}")
+        print("────────────────────────────────────────────")
+        for state in STATES:
+            print(f"• {state.capitalize() + ':':<17} {status[state]}")
+        print()
+
+
+def seed_jobs(n_attractors, job_size, base_seed):
+    """
+    split n_attractors into jobs of job_size consecutive search seeds, the id
+    holds the first and last seed (zero padded, so jobs are claimed in seed
+    order), submitting the same seeds again is a no-op while other seeds
+    give new jobs
+    """
+    jobs = []
+    for i in range(0, n_attractors, job_size):
+        seeds = list(range(base_seed + i, base_seed + min(i + job_size, n_attractors)))
+        jobs.append({'id': f'job-{seeds[0]:010d}-{seeds[-1]:010d}', 'seeds': seeds})
+    return jobs
@@ -0,0 +1,197 @@
+from contextlib import contextmanager
+from pathlib import Path
+import cProfile
+import csv
+import json
+import pickle
+import threading
+import time
+
+# collectors events are recorded into, per thread so the stages of a batch
+# pipeline each record into the metrics of the attractor they work on
+_local = threading.local()
+
+# objects with start(name) and stop(name), called around every span
+_hooks = []
+
+
+class Metrics():
+    """
+    named spans (wall time and number of calls) and counters of one unit of
+    work, an attractor or a whole batch
+
+    spans are inclusive, a span that runs inside another one (e.g. bounds
+    computed on demand by a burn) is counted in both
+
+    work done in worker processes is recorded by the parent from what the
+    workers return, so every event of a run ends up in the parent's metrics
+    """
+
+    def __init__(self, labels = None):
+        self.labels = dict(labels or {})
+        self.spans = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name, elapsed):
+        with self._lock:
+            calls, seconds = self.spans.get(name, (0, 0.0))
+            self.spans[name] = (calls + 1, seconds + elapsed)
+
+    def add(self, name, n = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other):
+        merged = Metrics(self.labels)
+        for metrics in (self, other):
+            for name, (calls, seconds) in metrics.spans.items():
+                total_calls, total_seconds = merged.spans.get(name, (0, 0.0))
+                merged.spans[name] = (total_calls + calls, total_seconds + seconds)
+            for name, n in metrics.counters.items():
+                merged.counters[name] = merged.counters.get(name, 0) + n
+        return merged
+
+    @staticmethod
+    def merge_all(metrics_list, labels = None):
+        merged = Metrics(labels)
+        for metrics in metrics_list:
+            merged = merged.merge(metrics)
+        return merged
+
+    def as_dict(self):
+        return {
+            'labels': dict(self.labels),
+            'spans': {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in self.spans.items()},
+            'counters': dict(self.counters)}
+
+    def as_row(self):
+        """ flat record for csv export """
+        row = dict(self.labels)
+        for name, (calls, seconds) in self.spans.items():
+            row[f'{name}_s'] = seconds
+            row[f'{name}_calls'] = calls
+        row.update(self.counters)
+        return row
+
+    def print_summary(self, title = 'Metrics'):
+        print("────────────────────────────────────────────")
+        print(f" {title}")
+        print("────────────────────────────────────────────")
+        for name, (calls, seconds) in sorted(self.spans.items(), key=lambda item: -item[1][1]):
+            print(f"• {name + ':':<21} {seconds:.2f} s ({calls} calls)")
+        for name, n in self.counters.items():
+            print(f"• {name + ':':<21} {n:,}")
+        print()
+
+
+def active():
+    """ collectors of the calling thread """
+    return tuple(getattr(_local, 'collectors', ()))
+
+@contextmanager
+def collecting(*collectors):
+    """ record the spans and counters of the calling thread into collectors """
+    previous = active()
+    _local.collectors = previous + tuple(c for c in collectors if c not in previous)
+    try:
+        yield collectors[0] if len(collectors) == 1 else collectors
+    finally:
+        _local.collectors = previous
+
+@contextmanager
+def span(name):
+    """ time a block (or, as a decorator, a function) as the span name """
+    for hook in _hooks:
+        hook.start(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for hook in reversed(_hooks):
+            hook.stop(name)
+        for collector in active():
+            collector.add_span(name, elapsed)
+
+def label(**labels):
+    """ add labels (e.g. the seed once it is known) to the collectors of the calling thread """
+    for collector in active():
+        collector.labels.update(labels)
+
+def count(name, n = 1):
+    for collector in active():
+        collector.add(name, int(n))
+
+def count_pickled(name, obj):
+    """ count the pickled size of obj, only pickled if anything is recorded """
+    if active():
+        count(name, len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)))
+
+def add_hook(hook):
+    _hooks.append(hook)
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+
+class CProfileHook():
+    """
+    profile spans with cProfile and dump the stats of every call to
+    directory/{span}-{i}.prof (readable with pstats or snakeviz)
+
+    only the outermost profiled span of a thread is profiled, the profiler
+    can not be nested, spans = None profiles every span
+    """
+
+    def __init__(self, directory, spans = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.spans = None if spans is None else set(spans)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._n_dumped = {}
+
+    def _profiled(self, name):
+        return self.spans is None or name in self.spans
+
+    def start(self, name):
+        if not self._profiled(name) or getattr(self._local, 'name', None) is not None:
+            return
+        self._local.name = name
+        self._local.profiler = cProfile.Profile()
+        self._local.profiler.enable()
+
+    def stop(self, name):
+        if getattr(self._local, 'name', None) != name:
+            return
+        self._local.profiler.disable()
+        with self._lock:
+            i = self._n_dumped.get(name, 0)
+            self._n_dumped[name] = i + 1
+        self._local.profiler.dump_stats(self.directory / f'{name}-{i}.prof')
+        self._local.name = None
+
+
+def write_metrics(path, attractors, batch = None):
+    """
+    export per attractor metrics (and the batch total, merged from them if
+    not given) as json, or as csv with one row per attractor and a last
+    batch row, depending on the suffix of path
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if batch is None:
+        batch = Metrics.merge_all(attractors, {'attractor': 'batch'})
+
+    if path.suffix.lower() == '.csv':
+        rows = [metrics.as_row() for metrics in attractors] + [batch.as_row()]
+        fields = list(dict.fromkeys(key for row in rows for key in row))
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        path.write_text(json.dumps({
+            'batch': batch.as_dict(),
+            'attractors': [metrics.as_dict() for metrics in attractors]}, indent=2, default=str))
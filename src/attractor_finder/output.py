@@ -0,0 +1,244 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import os
+import queue
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from attractor_finder import metrics
+from attractor_finder.pool import available_cores
+
+# the scripts read FORMATS for their --help, so the compiled kernels are
+# only imported once an image is encoded
+FORMATS = ('png', 'tiff')
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# bytes per independently deflated band of a png, or per tiff strip
+_BAND_BYTES = 2**22
+
+
+def quantize_image(render, bit_depth = 8):
+    """ (yres, xres, 3) image in [0, 1] as uint8 or uint16 samples """
+    from attractor_finder.renderer_batch import quantize
+    dtype = np.uint8 if bit_depth == 8 else np.uint16
+    out = np.empty(render.shape, dtype=dtype)
+    quantize(np.asarray(render, dtype=np.float64), out)
+    return out
+
+def _compress_bands(bands, compression, n_threads):
+    """
+    deflate the bands in parallel (zlib releases the gil), every band is
+    flushed to a byte boundary so the results can be concatenated
+    """
+    def compress(i):
+        c = zlib.compressobj(compression, zlib.DEFLATED, -15)
+        flush = zlib.Z_FINISH if i == len(bands) - 1 else zlib.Z_SYNC_FLUSH
+        return c.compress(bands[i]) + c.flush(flush)
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        return list(executor.map(compress, range(len(bands))))
+
+def _png_chunk(tag, data):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+def encode_png(render, bit_depth = 8, compression = 6, dpi = 300, n_threads = None):
+    """
+    rgb png of an image in [0, 1], rows are stored unfiltered, the zlib
+    stream is built from bands deflated on n_threads threads
+    """
+    yres, xres, _ = render.shape
+    n_threads = min(available_cores(), 4) if n_threads is None else n_threads
+
+    # every row starts with its filter type byte (0, none)
+    row_bytes = xres * 3 * bit_depth // 8
+    raw = np.zeros((yres, 1 + row_bytes), dtype=np.uint8)
+    if bit_depth == 8:
+        from attractor_finder.renderer_batch import quantize
+        quantize(np.asarray(render, dtype=np.float64), raw[:, 1:].reshape(yres, xres, 3))
+    else:
+        raw[:, 1:] = quantize_image(render, 16).astype('>u2').view(np.uint8).reshape(yres, row_bytes)
+
+    raw = raw.reshape(-1)
+    band = max(1, _BAND_BYTES // (1 + row_bytes)) * (1 + row_bytes)
+    bands = [raw[i:i + band] for i in range(0, len(raw), band)]
+
+    adler = 1
+    for data in bands:
+        adler = zlib.adler32(data, adler)
+    idat = b'\x78\x9c' + b''.join(_compress_bands(bands, compression, n_threads)) + struct.pack('>I', adler)
+
+    ppm = int(round(dpi / 0.0254))
+    return b''.join([
+        _PNG_SIGNATURE,
+        _png_chunk(b'IHDR', struct.pack('>IIBBBBB', xres, yres, bit_depth, 2, 0, 0, 0)),
+        _png_chunk(b'pHYs', struct.pack('>IIB', ppm, ppm, 1)),
+        _png_chunk(b'IDAT', idat),
+        _png_chunk(b'IEND', b'')])
+
+def encode_tiff(render, bit_depth = 8, compression = 6, dpi = 300, n_threads = None):
+    """
+    baseline rgb tiff (little endian) of an image in [0, 1], strips are
+    deflate compressed unless compression is 0
+    """
+    yres, xres, _ = render.shape
+    n_threads = min(available_cores(), 4) if n_threads is None else n_threads
+
+    image = quantize_image(render, bit_depth)
+    if bit_depth == 16:
+        image = image.astype('<u2')
+    rows = image.view(np.uint8).reshape(yres, -1)
+    rows_per_strip = max(1, _BAND_BYTES // rows.shape[1])
+    strips = [rows[i:i + rows_per_strip].tobytes() for i in range(0, yres, rows_per_strip)]
+    if compression > 0:
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            strips = list(executor.map(lambda strip: zlib.compress(strip, compression), strips))
+
+    tags = [
+        (256, 4, [xres]),
+        (257, 4, [yres]),
+        (258, 3, [bit_depth] * 3),
+        (259, 3, [8 if compression > 0 else 1]),
+        (262, 3, [2]),
+        (273, 4, [0] * len(strips)),
+        (277, 3, [3]),
+        (278, 4, [rows_per_strip]),
+        (279, 4, [len(strip) for strip in strips]),
+        (282, 5, [dpi, 1]),
+        (283, 5, [dpi, 1]),
+        (284, 3, [1]),
+        (296, 3, [2])]
+
+    # the ifd size does not depend on the strip offsets, so lay it out once to find them
+    header_size = 8 + len(_tiff_ifd(tags))
+    header_size += header_size % 2
+    tags[5] = (273, 4, header_size + np.cumsum([0] + [len(strip) for strip in strips[:-1]]))
+    header = (b'II*\0' + struct.pack('<I', 8) + _tiff_ifd(tags)).ljust(header_size, b'\0')
+
+    return b''.join([header] + strips)
+
+def _tiff_ifd(tags):
+    """ ifd at offset 8 followed by the values that do not fit into its entries """
+    formats = {3: 'H', 4: 'I', 5: 'I'}
+    extra_offset = 8 + 2 + 12 * len(tags) + 4
+    ifd = struct.pack('<H', len(tags))
+    extra = b''
+    for tag, kind, values in tags:
+        data = struct.pack('<' + formats[kind] * len(values), *(int(v) for v in values))
+        count = len(values) // 2 if kind == 5 else len(values)
+        if len(data) <= 4:
+            ifd += struct.pack('<HHI', tag, kind, count) + data.ljust(4, b'\0')
+        else:
+            ifd += struct.pack('<HHII', tag, kind, count, extra_offset + len(extra))
+            extra += data
+    return ifd + struct.pack('<I', 0) + extra
+
+def save_image(path, render, bit_depth = 8, compression = 6, dpi = 300):
+    """
+    write an image in [0, 1] as png or tiff (chosen by the suffix of path),
+    the file is written under a temporary name and renamed when complete
+    """
+    path = Path(path)
+    if path.suffix.lower() in ('.tif', '.tiff'):
+        data = encode_tiff(render, bit_depth, compression, dpi)
+    else:
+        data = encode_png(render, bit_depth, compression, dpi)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    metrics.count('image_bytes', len(data))
+
+
+class ImageWriter():
+    """
+    output stage that encodes and writes images in a background thread,
+    so a pipeline can go on with the next attractor while its image is saved
+
+    at most queue_size images wait to be written, save() blocks beyond that,
+    errors of the writer thread are raised by the next save() or by close()
+
+    the render passed to save() must not be modified afterwards
+
+    encoding and writing is recorded as the write_image span, into the
+    metrics that were collected by the thread calling save()
+    """
+
+    def __init__(self, image_format = 'png', bit_depth = 8, compression = 6, dpi = 300,
+        queue_size = 2, background = True):
+
+        if image_format not in FORMATS:
+            raise ValueError(f'unknown image format {image_format}, use one of {FORMATS}')
+        if bit_depth not in (8, 16):
+            raise ValueError('bit_depth has to be 8 or 16')
+
+        self.image_format = image_format
+        self.bit_depth = bit_depth
+        self.compression = compression
+        self.dpi = dpi
+        self.background = background
+        self.n_saved = 0
+
+        self._errors = []
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    @property
+    def suffix(self):
+        return '.' + self.image_format
+
+    def _write(self, path, render):
+        with metrics.span('write_image'):
+            save_image(path, render, self.bit_depth, self.compression, self.dpi)
+        self.n_saved += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, render, collectors = item
+            try:
+                with metrics.collecting(*collectors):
+                    self._write(path, render)
+            except BaseException as e:
+                self._errors.append(e)
+            finally:
+                self._queue.task_done()
+
+    def _raise_errors(self):
+        if self._errors:
+            raise self._errors.pop(0)
+
+    def save(self, path, render):
+        self._raise_errors()
+        if self._thread is None:
+            self._write(path, render)
+        else:
+            self._queue.put((path, render, metrics.active()))
+
+    def flush(self):
+        """ wait until the images queued so far are written, the writer stays open """
+        if self._thread is not None:
+            self._queue.join()
+        self._raise_errors()
+
+    def close(self):
+        """ wait until every queued image is written """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self._raise_errors()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
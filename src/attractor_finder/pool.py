@@ -0,0 +1,114 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import multiprocessing
+import os
+
+import numpy as np
+
+from attractor_finder import metrics
+
+
+def mp_context():
+    """
+    start workers from a fresh interpreter (forkserver, spawn where there is
+    no fork), a child forked after this process has run numba parallel or
+    OpenMP kernels inherits their thread pool in an unusable state: it
+    aborts once it uses it itself and the tbb layer deadlocks at exit
+
+    like on windows and macos, scripts using the pools need the
+    if __name__ == '__main__' guard
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    # imported once by the server instead of by every worker it forks
+    context.set_forkserver_preload(['attractor_finder.compute', 'attractor_finder.render', 'attractor_finder.search'])
+    return context
+
+def available_cores():
+    """ number of cores this process is allowed to run on """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def warm_up():
+    """
+    import the kernels and trigger numba compilation once per worker,
+    so the first task of every stage does not pay for it
+    """
+    from attractor_finder.functions import orbit_stats
+    from attractor_finder.search import get_ncoeffs
+    from attractor_finder.summary import OrbitSummary
+    from attractor_finder import iterator, renderer_batch, renderer_hist, renderer_stream
+
+    xa = np.linspace(0, 1, 16)
+    orbit_stats(np.stack([xa, xa[::-1]], axis=1), np.zeros(get_ncoeffs(2)), 2)
+    for dtype in (np.float64, np.float32):
+        OrbitSummary.from_data(np.stack([xa, xa, xa], axis=1).astype(dtype), (0, 1, 2), orbit_length=8, n_samples=4)
+
+class WorkerPool():
+    """
+    long-lived process pool shared by the search, compute, burn and pixel
+    stages, create it once per batch and pass it to every stage
+    """
+
+    def __init__(self, n_workers = None, warm = True):
+
+        if n_workers is None:
+            n_workers = available_cores()
+        self.n_workers = n_workers
+
+        initializer = warm_up if warm else None
+        self._executor = ProcessPoolExecutor(max_workers = n_workers, mp_context = mp_context(),
+            initializer = initializer)
+
+        # start the workers now, so they are ready (and warm) once the first stage runs
+        self._executor.submit(int).result()
+
+    def map(self, func, args_list):
+        return self._executor.map(func, args_list)
+
+    def submit(self, func, *args):
+        return self._executor.submit(func, *args)
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+class MeteredExecutor():
+    """ executor proxy counting the pickled size of the tasks handed to the workers """
+
+    def __init__(self, executor):
+        self._executor = executor
+
+    def map(self, func, args_list):
+        args_list = list(args_list)
+        metrics.count_pickled('bytes_to_workers', args_list)
+        return self._executor.map(func, args_list)
+
+    def submit(self, func, *args):
+        metrics.count_pickled('bytes_to_workers', args)
+        return self._executor.submit(func, *args)
+
+@contextmanager
+def get_executor(pool, n_workers):
+    """ use the shared pool if there is one, otherwise a temporary executor """
+    if pool is not None:
+        yield MeteredExecutor(pool)
+    else:
+        with ProcessPoolExecutor(max_workers = n_workers, mp_context = mp_context()) as executor:
+            yield MeteredExecutor(executor)
+
+def get_n_workers(pool, n_workers = None):
+    """ explicit worker count, else the size of the shared pool, else all cores """
+    if n_workers is not None:
+        return n_workers
+    if pool is not None:
+        return pool.n_workers
+    return available_cores()
@@ -0,0 +1,339 @@
+from pathlib import Path
+import os
+import time
+
+import numpy as np
+
+from attractor_finder import metrics
+from attractor_finder.functions import time_this
+from attractor_finder.histogram import Histogram
+from attractor_finder.iterator_sparse import iterator_sparse
+from attractor_finder.pool import get_executor, get_n_workers
+from attractor_finder.render import StreamingRenderPipeline, projection_columns
+from attractor_finder.renderer_hist import accumulate_histogram, tone_map
+from attractor_finder.shared import SharedArray, attach_shared
+
+_HIST_KEYS = ('counts', 'wsum')
+
+# the files a checkpoint consists of, nothing else in its directory is removed
+_CHECKPOINT_FILES = tuple(f'{key}.*.npy' for key in _HIST_KEYS) + ('state*.npz',)
+
+# tone maps used for the convergence metric are computed on a strided
+# view of the histogram with at most this many pixels
+_METRIC_PIXELS = 2**20
+
+
+def progressive_worker(args):
+    """
+    continue one orbit for a chunk, its points go to rows i0 + 1 to i1 of
+    the shared chunk buffer, row i0 gets the last point of the previous chunk
+    for the first delta, returns the position vector that continues the orbit
+    """
+    points_handle, i0, i1, coeffs, x0, dimension = args
+    points = attach_shared(points_handle)
+    points[i0] = x0[1:]
+    iterator_sparse(i1 - i0 - 1, coeffs, x0, dimension, points[i0 + 1:i1])
+    coords = np.ones_like(x0)
+    coords[1:] = points[i1 - 1]
+    return coords
+
+def band_worker(args):
+    """
+    add the points of the chunk that fall into the rows y0 <= y < y1 to the
+    shared histogram, one orbit segment at a time, returns the number of
+    points added
+    """
+    points_handle, columns, segments, hist_handles, y0, y1, params = args
+    points = attach_shared(points_handle)
+    counts, wsum = (attach_shared(handle) for handle in hist_handles)
+    n_added = 0
+    for i0, i1 in segments:
+        orbit = points[i0:i1]
+        n_added += accumulate_histogram(*params[:2], *(orbit[:, c] for c in columns), *params[2:],
+            counts, wsum, y0, y1)
+    return n_added
+
+
+class ProgressiveRenderPipeline(StreamingRenderPipeline):
+    """
+    streaming render that iterates in chunks until the image stops changing
+
+    every chunk continues one orbit per task into a shared chunk buffer,
+    then the workers add it to a single shared histogram (see renderer_hist),
+    each one owning a band of rows, so the memory is one histogram and one
+    chunk of points whatever the number of workers
+
+    the histogram is checkpointed together with the orbit state once
+    checkpoint_interval seconds have passed, an interrupted render can be
+    resumed with resume() and repeats the chunks since the last checkpoint,
+    the histogram is copied into the older of two preallocated pairs of
+    files ({key}.0.npy and {key}.1.npy) and the atomic replace of the orbit
+    state switches to it, so the checkpoint on disk is always consistent
+
+    the image after n iterates is tone mapped with alpha scaled by
+    render_iterates / n, which keeps its brightness independent of n, the
+    render stops once the estimated noise of that image falls below tol,
+    render_iterates is the upper limit
+
+    a chunk of m iterates changes the image by about noise * sqrt(m / n),
+    so the noise is estimated as mean |change| * sqrt(n / m), independent
+    of the chunk size
+    """
+
+    def __init__(self, coeffs, dimension, render_iterates, xres, yres, alpha = 0.025,
+        chunk_iterates = 2_000_000, tol = 1e-2, pool = None, checkpoint_interval = 60.0, **kwargs):
+
+        super().__init__(coeffs, dimension, render_iterates, xres, yres, alpha, pool=pool, **kwargs)
+        self.chunk_iterates = chunk_iterates
+        self.tol = tol
+        self.checkpoint_interval = checkpoint_interval
+
+        self.seed = None
+        self.checkpoint_dir = None
+        self._coords = None
+        self._iterations = 0
+        self._n_chunks = 0
+        self._generation = 0
+        self._n_outside = 0
+        self._noise = []
+        self._metric_image = None
+        self._files = None
+        self._checkpoint_time = None
+
+    @classmethod
+    def resume(cls, checkpoint_dir, pool = None, writer = None):
+        """ pipeline continuing the render saved in checkpoint_dir """
+        self = cls.__new__(cls)
+        with np.load(Path(checkpoint_dir) / 'state.npz') as state:
+            self._init_settings(int(state['xres']), int(state['yres']), float(state['alpha']), pool, writer=writer)
+            self.coeffs = state['coeffs']
+            self.dimension = int(state['dimension'])
+            self.render_iterates = int(state['render_iterates'])
+            self.chunk_iterates = int(state['chunk_iterates'])
+            self.tol = float(state['tol'])
+            self.checkpoint_interval = float(state['checkpoint_interval'])
+            self.seed = int(state['seed'])
+            self._extents = {str(key): float(value) for key, value in zip(state['extent_keys'], state['extents'])}
+            self._max_deltas = state['max_deltas']
+            self._coords = state['coords']
+            self._iterations = int(state['iterations'])
+            self._n_chunks = int(state['n_chunks'])
+            self._generation = int(state['generation'])
+            self._n_outside = int(state['n_outside'])
+            self._noise = list(state['noise'])
+
+        self.error = False
+        self._frame_extents()
+        self._open_checkpoint(checkpoint_dir)
+        self._metric_image = self._tone_map_metric()
+        return self
+
+    def _open_checkpoint(self, checkpoint_dir, create = False):
+        """
+        memory-map (or create) both file pairs of the checkpoint directory,
+        the shared histogram starts from the pair the orbit state points to
+        """
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self._files = [self._map_histogram(slot, create) for slot in range(2)]
+
+        for key, array in self._files[self._generation % 2].items():
+            self._shared[f'hist_{key}'] = SharedArray(array.shape, array.dtype)
+            self._shared[f'hist_{key}'].array[:] = array
+        self._hist = {key: self._shared[f'hist_{key}'].array for key in _HIST_KEYS}
+
+        # every orbit segment of a chunk starts with the last point of the previous chunk
+        self._shared['chunk'] = SharedArray((self.chunk_iterates + len(self._coords), self.dimension))
+        self._checkpoint_time = time.monotonic()
+
+    def _map_histogram(self, slot, create = False):
+        """ memory-map (or create) the histogram files of one slot """
+        shapes = {'counts': (self.yres, self.xres), 'wsum': (self.yres, self.xres, 3)}
+        dtypes = {'counts': np.uint32, 'wsum': np.float64}
+        mode = 'w+' if create else 'r+'
+        return {key: np.lib.format.open_memmap(self.checkpoint_dir / f'{key}.{slot}.npy', mode=mode,
+            dtype=dtypes[key], shape=shapes[key]) for key in _HIST_KEYS}
+
+    def checkpoint(self):
+        """
+        copy the histogram into the file pair the orbit state does not point
+        to, then switch the state to it
+        """
+        files = self._files[(self._generation + 1) % 2]
+        for key in _HIST_KEYS:
+            files[key][:] = self._hist[key]
+            files[key].flush()
+        self._generation += 1
+        self._write_state()
+        self._checkpoint_time = time.monotonic()
+
+    def remove_checkpoint(self):
+        """ remove the checkpoint files, the directory only if nothing else is left in it """
+        self._files = None
+        for pattern in _CHECKPOINT_FILES:
+            for path in self.checkpoint_dir.glob(pattern):
+                path.unlink()
+        try:
+            self.checkpoint_dir.rmdir()
+        except OSError:
+            pass
+
+    def _write_state(self):
+        """ write the orbit state, replacing the previous one atomically """
+        path = self.checkpoint_dir / 'state.npz'
+        tmp_path = self.checkpoint_dir / 'state.tmp.npz'
+        extent_keys = list(self._extents)
+        np.savez(tmp_path,
+            coeffs=self.coeffs,
+            dimension=self.dimension,
+            seed=self.seed,
+            xres=self.xres,
+            yres=self.yres,
+            alpha=self.alpha,
+            render_iterates=self.render_iterates,
+            chunk_iterates=self.chunk_iterates,
+            tol=self.tol,
+            checkpoint_interval=self.checkpoint_interval,
+            extent_keys=extent_keys,
+            extents=[self._extents[key] for key in extent_keys],
+            max_deltas=self._max_deltas,
+            coords=self._coords,
+            iterations=self._iterations,
+            n_chunks=self._n_chunks,
+            generation=self._generation,
+            n_outside=self._n_outside,
+            noise=np.asarray(self._noise, dtype=np.float64))
+        os.replace(tmp_path, path)
+
+    def start(self, seed, checkpoint_dir = None, n_orbits = None):
+        """
+        create the checkpoint of a new render, one orbit per task starting
+        from pilot points, by default one task per worker
+        """
+        self.seed = seed
+        n_orbits = get_n_workers(self.pool, n_orbits)
+        start_rows = np.linspace(len(self._pilot) - 1, 0, n_orbits).astype(int)
+        self._coords = np.ones((n_orbits, self.dimension + 1))
+        self._coords[:, 1:] = self._pilot[start_rows]
+
+        if checkpoint_dir is None:
+            checkpoint_dir = self._output_path(seed, '.ckpt')
+        self._open_checkpoint(checkpoint_dir, create=True)
+        self._write_state()
+
+    def _chunk_counts(self):
+        """ iterates per orbit for the next chunk, never past render_iterates """
+        n_iterations = min(self.chunk_iterates, self.render_iterates - self._iterations)
+        n_orbits = len(self._coords)
+        it_counts = np.full(n_orbits, n_iterations // n_orbits)
+        it_counts[:n_iterations % n_orbits] += 1
+        return it_counts
+
+    @time_this(stage='burn')
+    def progressive_chunk(self):
+        """
+        iterate one chunk, add it to the histogram and checkpoint once
+        checkpoint_interval seconds have passed since the last checkpoint
+        """
+        print(f'... progressive_chunk {self._n_chunks + 1}', end=" ")
+        it_counts = self._chunk_counts()
+        offsets = np.concatenate([[0], np.cumsum(it_counts + 1)])
+        segments = list(zip(offsets[:-1], offsets[1:]))
+        points_handle = self._shared['chunk'].handle
+        args_list = [(points_handle, i0, i1, self.coeffs, coords, self.dimension)
+            for (i0, i1), coords in zip(segments, self._coords)]
+
+        hist_handles = tuple(self._shared[f'hist_{key}'].handle for key in _HIST_KEYS)
+        params = (
+            self.xres,
+            self.yres,
+            self._bounds['xrng'],
+            self._bounds['xmin'],
+            self._bounds['yrng'],
+            self._bounds['ymin'],
+            self._bounds['zrng'],
+            self._bounds['zmin'],
+            self._max_deltas
+            )
+        band_rows = -(-self.yres // self.n_processes)
+        band_args_list = [(points_handle, projection_columns(self.dimension), segments, hist_handles,
+            y0, min(y0 + band_rows, self.yres), params) for y0 in range(0, self.yres, band_rows)]
+
+        with get_executor(self.pool, self.n_processes) as executor:
+            coords = list(executor.map(progressive_worker, args_list))
+            n_added = sum(executor.map(band_worker, band_args_list))
+
+        n_outside = int(it_counts.sum()) - n_added
+        self._coords = np.stack(coords)
+        self._n_outside += n_outside
+        self._iterations += int(it_counts.sum())
+        metrics.count('iterations', it_counts.sum())
+        metrics.count('points_burned', n_added)
+        metrics.count('out_of_bounds', n_outside)
+        self._n_chunks += 1
+
+        previous, self._metric_image = self._metric_image, self._tone_map_metric()
+        if previous is None:
+            noise = np.inf
+        else:
+            noise = float(np.mean(np.abs(self._metric_image - previous)) * np.sqrt(self._iterations / it_counts.sum()))
+        self._noise.append(noise)
+        if time.monotonic() - self._checkpoint_time >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def _scaled_alpha(self):
+        return self.alpha * self.render_iterates / max(self._iterations, 1)
+
+    def _tone_map_metric(self):
+        """ normalized image on a strided view of the histogram """
+        step = max(1, int(np.sqrt(self.xres * self.yres / _METRIC_PIXELS)))
+        counts = self._hist['counts'][::step, ::step]
+        wsum = self._hist['wsum'][::step, ::step]
+        return np.asarray(tone_map(counts, wsum, self._scaled_alpha(), self._bgcolor, self._burn_factors))
+
+    def converged(self):
+        return len(self._noise) > 0 and self._noise[-1] < self.tol
+
+    def finished(self):
+        return self._iterations >= self.render_iterates or self.converged()
+
+    def get_histogram(self):
+        """ histogram of the render so far, toned for the iterates done """
+        return Histogram(*(np.array(self._hist[key]) for key in _HIST_KEYS),
+            self._scaled_alpha(), self._bgcolor, self._burn_factors)
+
+    def print_summary(self):
+        print("────────────────────────────────────────────")
+        print(" Progressive Render")
+        print("────────────────────────────────────────────")
+        print(f"• Chunks:           {self._n_chunks}")
+        print(f"• Iterates:         {self._iterations:,} of {self.render_iterates:,}")
+        print(f"• Outside Bounds:   {self._n_outside:,}")
+        print(f"• Noise Estimate:   {self._noise[-1]:.2e}")
+        print(f"• Converged:        {self.converged()}\n")
+
+    def render_attractor(self, seed = None, n_processes = None, checkpoint_dir = None,
+        keep_checkpoint = False):
+        """
+        start a new render (seed given) or continue a resumed one, the
+        checkpoint is removed once the image and histogram are saved, with
+        keep_checkpoint it is brought up to date instead
+        """
+        print('... progressive_render')
+        self.n_processes = get_n_workers(self.pool, n_processes)
+        if self.checkpoint_dir is None:
+            self.start(seed, checkpoint_dir)
+
+        while not self.finished():
+            self.progressive_chunk()
+
+        self.print_summary()
+        self._histogram = self.get_histogram()
+        self._render = self._histogram.tone_map()
+        self._save_image(self.seed)
+        self._save_histogram(self.seed)
+        if keep_checkpoint:
+            self.checkpoint()
+        else:
+            self.remove_checkpoint()
+        self.release_shared()
@@ -1,102 +1,226 @@
-from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import numpy as np
-import matplotlib.pyplot as plt
 
-from attractor_finder.functions import set_aspect, time_this
-from attractor_finder.functions_numba import (
-    get_dx_numba_parallel, get_max_numba, get_min_max_range_numba)
-from attractor_finder.renderer_batch import compute_burn, compute_render_slice
-from attractor_finder.renderer import render_pixels
+from attractor_finder import metrics
+from attractor_finder.compute import Trajectory
+from attractor_finder.functions import frame_bounds, time_this
+from attractor_finder.histogram import Histogram
+from attractor_finder.iterator_sparse import iterator_sparse
+from attractor_finder.output import save_image
+from attractor_finder.pool import get_executor, get_n_workers
+from attractor_finder.renderer_batch import (
+    bin_rows, compute_burn_inline, compute_burn_sorted, compute_burn_tile, compute_render_slice)
+from attractor_finder.renderer_hist import accumulate_histogram
+from attractor_finder.renderer_omp import compute_burn_omp, compute_render_omp
+from attractor_finder.renderer_stream import iterate_burn
+from attractor_finder.shared import SharedArray, attach_shared
+from attractor_finder.summary import OrbitSummary, SAMPLES_PER_CHUNK, projection_columns
 
+BURN_ORDERS = ('orbit', 'tile')
+
+
+def attach_trajectory(trajectory, i0 = 0, i1 = None):
+    """
+    x, y and z columns of rows i0:i1 of the shared trajectory as views,
+    trajectory is the (handle, columns) pair the pipeline hands to workers
+    """
+    handle, columns = trajectory
+    itdata = attach_shared(handle)[i0:i1]
+    return [itdata[:, c] for c in columns]
 
 def burn_worker(args):
-    return np.asarray(compute_burn(*args))
+    """
+    burn points i0 <= i < i1 into its own slot of the shared burn buffer,
+    the point before i0 is passed along for the first delta, with
+    tile_order the points are bucketed by image tile before they are burned
+    """
+    trajectory, slots_handle, slot, i0, i1, params, tile_order = args
+    burn_slots = attach_shared(slots_handle)
+    burn = compute_burn_sorted if tile_order else compute_burn_inline
+    burn(*params[:2], *attach_trajectory(trajectory, i0 - 1, i1), *params[2:], burn_slots[slot])
 
 def pixel_worker(args):
-    return np.asarray(compute_render_slice(*args))
+    """ write one row slice of the final image into the shared render buffer """
+    xres, yres, y0, y1, bgcolor, burn_handle, render_handle = args
+    compute_render_slice(xres, yres, y0, y1, bgcolor,
+        attach_shared(burn_handle), attach_shared(render_handle))
+
+def tile_worker(args):
+    """
+    burn and finalize one band of image rows straight into the shared render
+    buffer, only the points binned into the band (order[b0:b1]) are visited
+    """
+    trajectory, render_handle, order_handle, b0, b1, params = args
+    compute_burn_tile(*params[:4], *attach_trajectory(trajectory),
+        *params[4:], attach_shared(render_handle), attach_shared(order_handle)[b0:b1])
+
+def stream_worker(args):
+    """ iterate and burn into its own slot of the shared burn buffer, returns the points outside """
+    slots_handle, slot, params = args
+    burn_slots = attach_shared(slots_handle)
+    _, _, n_outside = iterate_burn(*params, render=burn_slots[slot])
+    return n_outside
+
+def hist_worker(args):
+    """ accumulate one trajectory slice into its own slot of the shared histogram buffers """
+    trajectory, hist_handles, slot, i0, i1, params = args
+    counts, wsum = (attach_shared(handle)[slot] for handle in hist_handles)
+    accumulate_histogram(*params[:2], *attach_trajectory(trajectory, i0 - 1, i1), *params[2:], counts, wsum)
 
 class AttractorRenderPipeline():
+    """
+    data is a Trajectory from iterate_attractor or an (N, dimension) array,
+    bounds and max deltas come from the summary of the trajectory (or the
+    OrbitSummary passed as summary), the data is only scanned without one
+
+    percentiles = (low, high) frames the image on those percentiles of the
+    summary sample instead of the extremes, points outside are dropped
+
+    every render mode burns a point with its step from the previous point as
+    the delta, clamped at the largest step within an orbit (the max_steps of
+    the summary), so the jumps between stacked orbits do not change colours
+
+    the whole trajectory is rendered, the compute functions discard the
+    transient before storing points
+
+    pass the dimension for arrays from compute_attractor(..., projected=True),
+    their three columns are used as they are and float32 data stays float32
+
+    images are saved by the output.ImageWriter passed as writer (in the
+    background if it has a writer thread), else as 8 bit png right away
 
-    def __init__(self, data, xres, yres, alpha = 0.025):
+    burn_order = 'tile' makes the multi-pass burn bucket the points by image
+    tile first (same image), which keeps the updates of images larger than
+    the cache local, whether that pays off depends on the machine, see
+    benchmark/benchmark_burn_order.py
+    """
 
-        self.dimension = (data.shape)[1]
+    def __init__(self, data, xres, yres, alpha = 0.025, pool = None, summary = None, percentiles = None,
+        dimension = None, writer = None, burn_order = 'orbit'):
 
-        self._xa = np.asarray(data[10000:, self.dimension - 3])
-        self._ya = np.asarray(data[10000:, self.dimension - 2])
-        self._za = np.asarray(data[10000:, self.dimension - 1])
+        if burn_order not in BURN_ORDERS:
+            raise ValueError(f'unknown burn order {burn_order}, use one of {BURN_ORDERS}')
+        self.burn_order = burn_order
+        self._init_settings(xres, yres, alpha, pool, percentiles, writer)
 
+        if isinstance(data, Trajectory):
+            # the shared file of the trajectory is released with the buffers of the pipeline
+            self._shared['itdata'] = data.shared
+            self._shared_columns = data.columns
+            self.dimension, self._columns = data.dimension, data.columns
+            if summary is None:
+                summary = data.summary
+            data = data.data
+        elif dimension is None:
+            self.dimension = (data.shape)[1]
+            self._columns = projection_columns(self.dimension)
+        else:
+            self.dimension = dimension
+            self._columns = (0, 1, 2)
+
+        # views of the columns, workers map the shared trajectory instead of receiving pickled slices
+        ix, iy, iz = self._columns
+        self._xa, self._ya, self._za = data[:, ix], data[:, iy], data[:, iz]
+
+        if summary is None:
+            summary = self.summarize(data)
+        self.apply_summary(summary)
+
+    def _trajectory_handle(self):
+        """
+        (handle, columns) of the shared trajectory for the workers, a plain
+        array is copied to shared memory (only its x, y, z columns) the
+        first time a pool stage needs it
+        """
+        if 'itdata' not in self._shared:
+            shared = SharedArray((len(self._xa), 3), self._xa.dtype)
+            for k, column in enumerate((self._xa, self._ya, self._za)):
+                shared.array[:, k] = column
+            self._shared['itdata'] = shared
+            self._shared_columns = (0, 1, 2)
+        return self._shared['itdata'].handle, self._shared_columns
+
+    def _init_settings(self, xres, yres, alpha, pool, percentiles = None, writer = None):
         self.xres = xres
         self.yres = yres
         self.alpha = alpha
+        self.percentiles = percentiles
+        self.writer = writer
 
         self._bgcolor = np.asarray([0.9,0.9,0.85])
         self._burn_factors = np.asarray([0.75,1.00,1.25])
 
-        self.n_processes = 6
+        self.pool = pool
+        self.n_processes = get_n_workers(pool)
 
         self._args_list_burn = None
         self._args_list_pixel = None
-        self._args_list_one_pass = None
+        self._args_list_tile = None
+        self._args_list_hist = None
         self._full_burn = None
+        self._histogram = None
         self._render = None
+        self._extents = None
+        self._shared = {}
+
+    @time_this(stage='bounds')
+    def summarize(self, data):
+        """
+        summary of the trajectory in one pass, used when the iteration
+        workers did not provide one
+        """
+        print('... summarize', end=" ")
+        n_samples = 0 if self.percentiles is None else SAMPLES_PER_CHUNK * self.n_processes
+        return OrbitSummary.from_data(data, self._columns, n_samples=n_samples)
 
-        self.get_bounds()
-        if not self._xnan:
-            self.compute_deltas()
+    def apply_summary(self, summary):
+        """
+        raw extents and max deltas from a summary
+        """
+        self._extents = summary.extents(self.percentiles)
+        self._max_deltas = summary.max_steps
+        self._frame_extents()
 
-    @time_this
-    def get_bounds(self):
+    def _frame_extents(self):
         """
-        rescale bounding box to print size
+        bounding box of the raw extents rescaled to the print size
         """
-        print('... get_bounds', end=" ")
-        xmin, ymin, xrng, yrng = set_aspect(self._xa, self._ya, self.xres, self.yres)
-        zmin, zrng = get_min_max_range_numba(self._za)
+        e = self._extents
+        xmin, ymin, xrng, yrng = frame_bounds(e['xmin'], e['xrng'], e['ymin'], e['yrng'], self.xres, self.yres)
         self._bounds = {
-        'xmin': xmin, 'ymin': ymin, 'zmin': zmin, 
-        'xrng': xrng, 'yrng': yrng, 'zrng': zrng
+        'xmin': xmin, 'ymin': ymin, 'zmin': e['zmin'],
+        'xrng': xrng, 'yrng': yrng, 'zrng': e['zrng']
         }
 
         self._xnan = np.isnan(xrng)
 
-    @time_this
-    def compute_deltas(self):
+    def get_render_info(self):
         """
-        compute delta = x[i+1]-x[i] for each coordinate array
-        get maximum delta for each coordinate (used in pixel colors)
+        raw extents (independent of the print size) and max deltas,
+        stored in the catalog so re-renders can skip estimating them
         """
-        print('... compute_deltas', end=" ")
-        self._dx = get_dx_numba_parallel(self._xa)
-        self._dy = get_dx_numba_parallel(self._ya)
-        self._dz = get_dx_numba_parallel(self._za)
-        max_dx = get_max_numba(self._dx)
-        max_dy = get_max_numba(self._dy)
-        max_dz = get_max_numba(self._dz)
-        self._max_deltas = np.asarray([max_dx, max_dy, max_dz])
+        return dict(self._extents), np.copy(self._max_deltas)
 
-    @time_this
+    @time_this(stage='burn')
     def construct_args_list_burn(self):
         """
         construct argument list to pass to burn_worker
         """
         print('... construct_args_list_burn', end=" ")
         self._args_list_burn = []
-        it_ranges = np.linspace(1, len(self._xa[1:]), self.n_processes + 1)
+        tile_order = self.burn_order == 'tile'
+        # the first point only provides the delta of the second
+        it_ranges = np.linspace(1, len(self._xa), self.n_processes + 1)
         it_ranges = it_ranges.astype(int)
 
+        self._shared['burn_slots'] = SharedArray((self.n_processes, self.yres, self.xres, 3), fill = 1)
+
         for i in range(self.n_processes):
             i0, i1 = it_ranges[i], it_ranges[i+1]
-            args = (
+            params = (
                 self.xres,
                 self.yres,
-                self._xa[i0:i1],
-                self._ya[i0:i1],
-                self._za[i0:i1],
-                self._dx[i0+1:i1+1],
-                self._dy[i0+1:i1+1],
-                self._dz[i0+1:i1+1],
                 self._bounds['xrng'],
                 self._bounds['xmin'],
                 self._bounds['yrng'],
@@ -107,9 +231,13 @@ class AttractorRenderPipeline():
                 self._max_deltas,
                 self._burn_factors
                 )
+            args = (
+                self._trajectory_handle(),
+                self._shared['burn_slots'].handle,
+                i, i0, i1, params, tile_order)
             self._args_list_burn.append(args)
 
-    @time_this
+    @time_this(stage='pixel')
     def construct_args_list_pixel(self):
         """
         construct argument list to pass to pixel_worker
@@ -117,89 +245,421 @@ class AttractorRenderPipeline():
         print('... construct_args_list_pixel', end=" ")
         y_slice = np.linspace(0, self.yres, self.n_processes + 1)
         y_slice = y_slice.astype(int)
+        self._shared['render'] = SharedArray((self.yres, self.xres, 3))
         self._args_list_pixel = [(
             self.xres,
             self.yres,
             y_slice[i],
             y_slice[i+1],
             self._bgcolor,
-            self._full_burn) for i in range(self.n_processes)]
+            self._shared['full_burn'].handle,
+            self._shared['render'].handle) for i in range(self.n_processes)]
 
-    @time_this
-    def construct_args_list_one_pass(self):
+    def get_tile_rows(self, memory_budget):
         """
-        construct argument list to pass to render_pixels (one-pass render)
+        rows per tile such that one float64 tile buffer per worker fits in
+        memory_budget bytes, capped so every worker gets at least one tile
         """
-        self._args_list_one_pass = (
-            self.xres,
-            self.yres,
-            self._xa[1:],
-            self._ya[1:],
-            self._za[1:],
-            self._dx,
-            self._dy,
-            self._dz,
-            self._bounds['xrng'],
-            self._bounds['xmin'],
-            self._bounds['yrng'],
-            self._bounds['ymin'],
-            self._bounds['zrng'],
-            self._bounds['zmin'],
-            self.alpha,
-            self._bgcolor,
-            self._burn_factors)
+        row_bytes = self.xres * 3 * 8
+        tile_rows = max(1, memory_budget // (self.n_processes * row_bytes))
+        return int(min(tile_rows, -(-self.yres // self.n_processes)))
+
+    @time_this(stage='burn')
+    def construct_args_list_tile(self, memory_budget):
+        """
+        construct argument list to pass to tile_worker, one entry per band of rows
+
+        the points are binned by band first (one pass, 8 bytes per point of
+        shared index buffer), so every tile only visits its own points
+        """
+        print('... construct_args_list_tile', end=" ")
+        tile_rows = self.get_tile_rows(memory_budget)
+        self._shared['render'] = SharedArray((self.yres, self.xres, 3))
+
+        self._shared['order'] = SharedArray((len(self._ya),), dtype=np.intp)
+        starts = bin_rows(self._ya, self._bounds['yrng'], self._bounds['ymin'], self.yres, tile_rows,
+            self._shared['order'].array)
 
-    @time_this
+        self._args_list_tile = []
+        for b, y0 in enumerate(range(0, self.yres, tile_rows)):
+            params = (
+                self.xres,
+                self.yres,
+                y0,
+                min(y0 + tile_rows, self.yres),
+                self._bounds['xrng'],
+                self._bounds['xmin'],
+                self._bounds['yrng'],
+                self._bounds['ymin'],
+                self._bounds['zrng'],
+                self._bounds['zmin'],
+                self.alpha,
+                self._max_deltas,
+                self._burn_factors,
+                self._bgcolor
+                )
+            args = (
+                self._trajectory_handle(),
+                self._shared['render'].handle,
+                self._shared['order'].handle,
+                starts[b], starts[b + 1], params)
+            self._args_list_tile.append(args)
+
+    @time_this(stage='burn')
+    def tile_pool(self):
+        """
+        burn and finalize disjoint bands of rows, workers write their pixels
+        straight into the shared render buffer so there is no reduction step
+        """
+        print(f'... tile_pool ({len(self._args_list_tile)} tiles)', end=" ")
+        with get_executor(self.pool, self.n_processes) as executor:
+            list(executor.map(tile_worker, self._args_list_tile))
+        metrics.count('points_burned', len(self._xa) - 1)
+        self._render = self._shared['render'].array
+
+    @time_this(stage='burn')
     def burn_pool(self):
         """
         compute burn factors which are used to darken pixels
         uses multiprocessing
         """
         print('... burn_pool', end=" ")
-        with ProcessPoolExecutor(max_workers = self.n_processes) as executor:
-            burn_batch = list(executor.map(burn_worker, self._args_list_burn))
-        self._full_burn = np.ones((self.yres, self.xres, 3))
-        for batch in burn_batch:
-            self._full_burn *= batch
+        with get_executor(self.pool, self.n_processes) as executor:
+            list(executor.map(burn_worker, self._args_list_burn))
+        metrics.count('points_burned', len(self._xa) - 1)
+        self._reduce_burn_slots()
+
+    def _reduce_burn_slots(self):
+        """ multiply the per-worker burn slots into the shared full burn buffer """
+        burn_slots = self._shared.pop('burn_slots')
+        self._shared['full_burn'] = SharedArray((self.yres, self.xres, 3))
+        self._full_burn = self._shared['full_burn'].array
+        np.prod(burn_slots.array, axis=0, out=self._full_burn)
+        burn_slots.release()
 
-    @time_this
+    @time_this(stage='pixel')
     def pixel_pool(self):
         print('... pixel_pool', end=" ")
-        with ProcessPoolExecutor(max_workers = self.n_processes) as executor:
-            pixel_batch = list(executor.map(pixel_worker, self._args_list_pixel))
-        self._render = np.zeros((self.yres, self.xres, 3))
-        for batch in pixel_batch:
-            self._render += batch
-        self._render = np.clip(self._render, 0, 1)
+        with get_executor(self.pool, self.n_processes) as executor:
+            list(executor.map(pixel_worker, self._args_list_pixel))
+        self._render = self._shared['render'].array
 
-    @time_this
-    def render_one_pass(self):
-        self._render = np.asarray(render_pixels(*self._args_list_one_pass))
+    @time_this(stage='burn')
+    def burn_one_pass(self):
+        """
+        burn every point in this process, with the kernel of the multi-pass
+        render so both give the same image
+        """
+        print('... burn_one_pass', end=" ")
+        self._full_burn = np.asarray(compute_burn_inline(
+            self.xres,
+            self.yres,
+            self._xa,
+            self._ya,
+            self._za,
+            self._bounds['xrng'],
+            self._bounds['xmin'],
+            self._bounds['yrng'],
+            self._bounds['ymin'],
+            self._bounds['zrng'],
+            self._bounds['zmin'],
+            self.alpha,
+            self._max_deltas,
+            self._burn_factors))
+        metrics.count('points_burned', len(self._xa) - 1)
+
+    @time_this(stage='pixel')
+    def pixel_one_pass(self):
+        print('... pixel_one_pass', end=" ")
+        self._render = np.asarray(compute_render_slice(
+            self.xres, self.yres, 0, self.yres, self._bgcolor, self._full_burn))
 
     def _multi_pass_render(self, n_processes):
         print('... multi_pass_render')
-        self.n_processes = n_processes
+        self.n_processes = get_n_workers(self.pool, n_processes)
         self.construct_args_list_burn()
         self.burn_pool()
         self.construct_args_list_pixel()
         self.pixel_pool()
 
+    def _tiled_render(self, n_processes, memory_budget):
+        print('... tiled_render')
+        self.n_processes = get_n_workers(self.pool, n_processes)
+        self.construct_args_list_tile(memory_budget)
+        self.tile_pool()
+
+    @time_this(stage='burn')
+    def construct_args_list_hist(self):
+        """
+        construct argument list to pass to hist_worker, every worker gets its
+        own slot of the counts and wsum buffers
+        """
+        print('... construct_args_list_hist', end=" ")
+        # the first point only provides the delta of the second
+        it_ranges = np.linspace(1, len(self._xa), self.n_processes + 1)
+        it_ranges = it_ranges.astype(int)
+
+        # fresh shared files are zero filled
+        shape = (self.n_processes, self.yres, self.xres)
+        self._shared['hist_counts'] = SharedArray(shape, np.uint32)
+        self._shared['hist_wsum'] = SharedArray(shape + (3,), np.float64)
+        hist_handles = tuple(self._shared[key].handle for key in ('hist_counts', 'hist_wsum'))
+
+        params = (
+            self.xres,
+            self.yres,
+            self._bounds['xrng'],
+            self._bounds['xmin'],
+            self._bounds['yrng'],
+            self._bounds['ymin'],
+            self._bounds['zrng'],
+            self._bounds['zmin'],
+            self._max_deltas
+            )
+        self._args_list_hist = [(
+            self._trajectory_handle(),
+            hist_handles,
+            i, it_ranges[i], it_ranges[i+1], params) for i in range(self.n_processes)]
+
+    @time_this(stage='burn')
+    def hist_pool(self):
+        """
+        accumulate hit statistics, uses multiprocessing
+        """
+        print('... hist_pool', end=" ")
+        with get_executor(self.pool, self.n_processes) as executor:
+            list(executor.map(hist_worker, self._args_list_hist))
+        metrics.count('points_burned', len(self._xa) - 1)
+        slots = [self._shared.pop(key) for key in ('hist_counts', 'hist_wsum')]
+        counts, wsum = (np.sum(slot.array, axis=0, dtype=slot.dtype) for slot in slots)
+        for slot in slots:
+            slot.release()
+        self._histogram = Histogram(counts, wsum, self.alpha, self._bgcolor, self._burn_factors)
+
+    @time_this(stage='pixel')
+    def tone_map_histogram(self):
+        print('... tone_map_histogram', end=" ")
+        self._render = self._histogram.tone_map()
+
+    def _histogram_render(self, n_processes):
+        print('... histogram_render')
+        self.n_processes = get_n_workers(self.pool, n_processes)
+        self.construct_args_list_hist()
+        self.hist_pool()
+        self.tone_map_histogram()
+
+    @time_this(stage='burn')
+    def burn_omp(self, n_threads):
+        """
+        compute burn factors with OpenMP threads in this process
+        """
+        print('... burn_omp', end=" ")
+        self._full_burn = np.asarray(compute_burn_omp(
+            self.xres,
+            self.yres,
+            self._xa,
+            self._ya,
+            self._za,
+            self._bounds['xrng'],
+            self._bounds['xmin'],
+            self._bounds['yrng'],
+            self._bounds['ymin'],
+            self._bounds['zrng'],
+            self._bounds['zmin'],
+            self.alpha,
+            self._max_deltas,
+            self._burn_factors,
+            n_threads))
+        metrics.count('points_burned', len(self._xa) - 1)
+
+    @time_this(stage='pixel')
+    def pixel_omp(self, n_threads):
+        print('... pixel_omp', end=" ")
+        self._render = np.asarray(compute_render_omp(
+            self.xres, self.yres, self._bgcolor, self._full_burn, n_threads))
+
+    def _omp_render(self, n_threads):
+        print('... omp_render')
+        self.burn_omp(n_threads)
+        self.pixel_omp(n_threads)
+
     def _one_pass_render(self):
         print('... one_pass_render')
-        self.construct_args_list_one_pass()
-        self.render_one_pass()
+        self.burn_one_pass()
+        self.pixel_one_pass()
 
-    @time_this
-    def _save_image(self, seed):
-        print('... save_image', end=" ")
+    def _output_path(self, seed, suffix):
         output_dir = Path(__file__).parents[2] / "output" 
         output_dir.mkdir(parents=True, exist_ok=True)
-        fname = output_dir / f'D{self.dimension}-{seed}.png'
-        plt.imsave(fname, self._render, dpi=300)
+        return output_dir / f'D{self.dimension}-{seed}{suffix}'
+
+    @time_this(stage='save')
+    def _save_image(self, seed):
+        print('... save_image', end=" ")
+        if self.writer is None:
+            save_image(self._output_path(seed, '.png'), self._render)
+        else:
+            self.writer.save(self._output_path(seed, self.writer.suffix), self._render)
 
-    def render_attractor(self, seed, multi = True, n_processes = 6):
-        if multi:
+    @time_this(stage='save')
+    def _save_histogram(self, seed):
+        print('... save_histogram', end=" ")
+        self._histogram.save(self._output_path(seed, '.npz'))
+
+    def release_shared(self):
+        """
+        remove the shared memory files, arrays held by this pipeline stay
+        valid until the pipeline is garbage collected
+        """
+        for shared in self._shared.values():
+            shared.release()
+
+    def render_attractor(self, seed, multi = True, n_processes = None,
+        tiled = False, memory_budget = 2**30, n_threads = None, histogram = False):
+        """
+        tiled renders bound the image buffers held by workers to memory_budget
+        bytes, use it for large print sizes
+
+        n_threads renders in this process with OpenMP threads instead of the pool
+
+        histogram accumulates hit statistics instead of burning, they are saved
+        next to the image and can be re-toned for other alpha and colours
+        """
+        if tiled:
+            self._tiled_render(n_processes, memory_budget)
+        elif n_threads is not None:
+            self._omp_render(n_threads)
+        elif histogram:
+            self._histogram_render(n_processes)
+            self._save_histogram(seed)
+        elif multi:
             self._multi_pass_render(n_processes)
         else:
             self._one_pass_render()
         self._save_image(seed)
+        self.release_shared()
+
+
+class StreamingRenderPipeline(AttractorRenderPipeline):
+    """
+    render without materializing the trajectory: every worker iterates the map
+    and burns its points directly into an image buffer, so memory scales with
+    the image size instead of the number of iterates
+
+    bounds and max deltas are estimated from a short pilot run, points that
+    fall outside the pilot bounds are skipped
+
+    extents and max_deltas cached in the catalog can be passed in, the pilot
+    run then only provides starting points on the attractor
+
+    percentiles = (low, high) frames the image on those percentiles of the pilot
+    """
+
+    def __init__(self, coeffs, dimension, render_iterates, xres, yres, alpha = 0.025,
+        pilot_iterates = 200_000, transient = 10000, pool = None, extents = None, max_deltas = None,
+        percentiles = None, writer = None):
+
+        self.coeffs = np.asarray(coeffs, dtype=np.float64)
+        self.dimension = dimension
+        self.render_iterates = render_iterates
+        self.pilot_iterates = pilot_iterates
+        self.transient = transient
+
+        self._init_settings(xres, yres, alpha, pool, percentiles, writer)
+        self._args_list_stream = None
+        self._pilot = None
+
+        if extents is not None:
+            self.pilot_iterates = min(pilot_iterates, 1000)
+            self._extents = dict(extents)
+            self._max_deltas = np.asarray(max_deltas, dtype=np.float64)
+
+        self.pilot_run()
+        self.error = self._xnan
+
+    @time_this(stage='bounds')
+    def pilot_run(self):
+        """
+        short iteration used to estimate bounds and starting points on the attractor
+        """
+        print('... pilot_run', end=" ")
+        x0 = np.random.uniform(-1e-1, 1e-1, (self.dimension + 1))
+        n_iterations = self.transient + self.pilot_iterates
+        pilot = np.asarray(iterator_sparse(n_iterations, self.coeffs, x0, self.dimension))
+        self._pilot = pilot[self.transient:]
+        metrics.count('iterations', n_iterations)
+
+        if not np.all(np.isfinite(self._pilot[-1])):
+            self._xnan = True
+            return
+
+        if self._extents is not None:
+            self._frame_extents()
+            return
+
+        n_samples = 0 if self.percentiles is None else len(self._pilot)
+        self.apply_summary(OrbitSummary.from_data(self._pilot, projection_columns(self.dimension),
+            n_samples=n_samples))
+
+    @time_this(stage='burn')
+    def construct_args_list_stream(self):
+        """
+        construct argument list to pass to stream_worker
+        workers start from pilot points so no transient has to be discarded
+        """
+        print('... construct_args_list_stream', end=" ")
+        ix, iy, iz = projection_columns(self.dimension)
+        it_counts = np.full(self.n_processes, self.render_iterates // self.n_processes)
+        it_counts[:self.render_iterates % self.n_processes] += 1
+        start_rows = np.linspace(len(self._pilot) - 1, 0, self.n_processes).astype(int)
+
+        self._shared['burn_slots'] = SharedArray((self.n_processes, self.yres, self.xres, 3), fill = 1)
+
+        self._args_list_stream = []
+        for i in range(self.n_processes):
+            x0 = np.ones(self.dimension + 1)
+            x0[1:] = self._pilot[start_rows[i]]
+            params = (
+                int(it_counts[i]),
+                self.coeffs,
+                x0,
+                self.dimension,
+                ix,
+                iy,
+                iz,
+                self.xres,
+                self.yres,
+                self._bounds['xrng'],
+                self._bounds['xmin'],
+                self._bounds['yrng'],
+                self._bounds['ymin'],
+                self._bounds['zrng'],
+                self._bounds['zmin'],
+                self.alpha,
+                self._max_deltas,
+                self._burn_factors
+                )
+            self._args_list_stream.append((self._shared['burn_slots'].handle, i, params))
+
+    @time_this(stage='burn')
+    def stream_pool(self):
+        """
+        iterate and burn in one go, uses multiprocessing
+        """
+        print('... stream_pool', end=" ")
+        with get_executor(self.pool, self.n_processes) as executor:
+            n_outside = sum(executor.map(stream_worker, self._args_list_stream))
+        metrics.count('iterations', self.render_iterates)
+        metrics.count('points_burned', self.render_iterates - n_outside)
+        metrics.count('out_of_bounds', n_outside)
+        self._reduce_burn_slots()
+
+    def render_attractor(self, seed, n_processes = None):
+        print('... streaming_render')
+        self.n_processes = get_n_workers(self.pool, n_processes)
+        self.construct_args_list_stream()
+        self.stream_pool()
+        self.construct_args_list_pixel()
+        self.pixel_pool()
+        self._save_image(seed)
+        self.release_shared()
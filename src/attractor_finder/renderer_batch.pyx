@@ -1,16 +1,29 @@
 #cython: boundscheck=False, wraparound=False, nonecheck=False
 
+cimport cython
+from libc.stdint cimport uint8_t, uint16_t
 import numpy as np
 
+# trajectories are stored as float64, or float32 for compact projected ones
+ctypedef fused real:
+    float
+    double
+
+# 8 and 16 bit image samples
+ctypedef fused sample:
+    uint8_t
+    uint16_t
+
 
 def compute_burn(int xres, int yres, 
-    double[:] xa, double[:] ya, double[:] za, 
+    real[:] xa, real[:] ya, real[:] za, 
     double[:] dxs, double[:] dys, double[:] dzs,
     double xrng, double xmin, double yrng, double ymin, 
-    double zrng, double zmin, double alpha, double[:] max_deltas, double[:] burn_factors):
+    double zrng, double zmin, double alpha, double[:] max_deltas, double[:] burn_factors,
+    double[:,:,:] render = None):
 
-    cdef double[:,:,:] render = np.ones((yres, xres, 3))
-    cdef int length = np.size(xa)
+    cdef Py_ssize_t length = xa.shape[0]
+    cdef Py_ssize_t i
     cdef int I, J
     cdef double z_alpha
     cdef double mdx = max_deltas[0]
@@ -18,6 +31,10 @@ def compute_burn(int xres, int yres,
     cdef double mdz = max_deltas[2]
     cdef double x, y, z
 
+    # an existing buffer (e.g. shared memory) has to be initialised to ones by the caller
+    if render is None:
+        render = np.ones((yres, xres, 3))
+
     bfr = burn_factors[0]
     bfg = burn_factors[1]
     bfb = burn_factors[2]
@@ -47,11 +64,14 @@ def compute_burn(int xres, int yres,
 
     return render
 
-def compute_render_slice(int xres, int yres, int ymin, int ymax, double[:] bgcolor, double[:,:,:] burn_array):
+def compute_render_slice(int xres, int yres, int ymin, int ymax, double[:] bgcolor, double[:,:,:] burn_array,
+    double[:,:,:] render = None):
 
-    cdef double[:,:,:] render = np.zeros((yres, xres, 3))
     cdef int x, y
 
+    if render is None:
+        render = np.zeros((yres, xres, 3))
+
     for x in range(xres):
         for y in range(ymin, ymax):
             for k in range(3):
@@ -62,3 +82,337 @@ def compute_render_slice(int xres, int yres, int ymin, int ymax, double[:] bgcol
                     render[y,x,k] = 0.0
 
     return render
+
+@cython.cdivision(True)
+def compute_burn_tile(int xres, int yres, int y0, int y1,
+    real[:] xa, real[:] ya, real[:] za,
+    double xrng, double xmin, double yrng, double ymin,
+    double zrng, double zmin, double alpha, double[:] max_deltas, double[:] burn_factors,
+    double[:] bgcolor, double[:,:,:] render, Py_ssize_t[:] index = None):
+
+    """
+    burn the points that land in image rows y0 <= I < y1 into a tile buffer and
+    write the finished pixels into render[y0:y1], points keep their orbit order
+    so no reduction over workers is needed, every point is burned as in
+    compute_burn_inline
+
+    index (ascending point indices, e.g. a band of bin_rows) restricts the
+    points that are visited, without it every point is checked, the first
+    point only provides the delta of the second one
+    """
+
+    cdef double[:,:,:] tile = np.ones((y1 - y0, xres, 3))
+    cdef bint has_index = index is not None
+    cdef Py_ssize_t n, i
+    cdef Py_ssize_t length = index.shape[0] if has_index else xa.shape[0]
+    cdef int I, J, x, y, k
+    cdef double fx, fy, z_alpha, rx, ry, rz, value
+    cdef double mdx = max_deltas[0]
+    cdef double mdy = max_deltas[1]
+    cdef double mdz = max_deltas[2]
+    cdef double bfr = burn_factors[0]
+    cdef double bfg = burn_factors[1]
+    cdef double bfb = burn_factors[2]
+    cdef double xscale = (xres - 1) / xrng
+    cdef double yscale = (yres - 1) / yrng
+
+    with nogil:
+        for n in range(length):
+
+            i = index[n] if has_index else n
+            if i == 0:
+                continue
+
+            fx = (xa[i] - xmin) * xscale
+            fy = (ya[i] - ymin) * yscale
+
+            # comparisons are false for nan, so diverged points are skipped too
+            if not (fx >= 0 and fx < xres and fy >= y0 and fy < y1):
+                continue
+
+            J = <int>fx
+            I = <int>fy - y0
+
+            z_alpha = 0.1 + 0.9 * (za[i] - zmin) / zrng  # scale alpha slightly with z
+            z_alpha = min(max(z_alpha, 0.1), 1.0)
+
+            rx = min(abs(xa[i] - xa[i - 1]) / mdx, 1.0)
+            ry = min(abs(ya[i] - ya[i - 1]) / mdy, 1.0)
+            rz = min(abs(za[i] - za[i - 1]) / mdz, 1.0)
+
+            # Multiplicative burn (scale toward black)
+            tile[I,J,0] *= (1 - alpha * z_alpha * (1 + rx) * bfr * tile[I,J,0])
+            tile[I,J,1] *= (1 - alpha * z_alpha * (1 + ry) * bfg * tile[I,J,1])
+            tile[I,J,2] *= (1 - alpha * z_alpha * (1 + rz) * bfb * tile[I,J,2])
+
+        for y in range(y1 - y0):
+            for x in range(xres):
+                for k in range(3):
+                    value = bgcolor[k] * tile[y,x,k]
+                    if value > 1.0:
+                        value = 1.0
+                    elif value < 0.0:
+                        value = 0.0
+                    render[y0 + y,x,k] = value
+
+    return render
+
+@cython.cdivision(True)
+def bin_rows(real[:] ya, double yrng, double ymin, int yres, int band_rows, Py_ssize_t[:] order):
+
+    """
+    group the points by the band of band_rows image rows they fall into,
+    with a stable counting sort so every band keeps the orbit order
+
+    parameters
+    ----------
+
+    ya : np.ndarray of shape (n_points,)
+        y coordinates, rows are computed as in compute_burn_tile
+
+    order : np.ndarray of shape (n_points,)
+        buffer the point indices are written into, band by band
+
+    returns
+    -------
+
+    starts : np.ndarray of shape (n_bands + 1,)
+        band b holds the points order[starts[b]:starts[b + 1]], points
+        outside the image rows are left out
+    """
+
+    cdef Py_ssize_t length = ya.shape[0]
+    cdef Py_ssize_t i, d
+    cdef int b
+    cdef double fy
+    cdef double yscale = (yres - 1) / yrng
+    cdef int n_bands = (yres + band_rows - 1) // band_rows
+    cdef Py_ssize_t[:] starts = np.zeros(n_bands + 1, dtype=np.intp)
+    cdef Py_ssize_t[:] fill = np.empty(n_bands, dtype=np.intp)
+
+    with nogil:
+        for i in range(length):
+            fy = (ya[i] - ymin) * yscale
+            # comparisons are false for nan, so diverged points are left out too
+            if fy >= 0 and fy < yres:
+                starts[<int>fy // band_rows + 1] += 1
+
+        for b in range(n_bands):
+            starts[b + 1] += starts[b]
+            fill[b] = starts[b]
+
+        for i in range(length):
+            fy = (ya[i] - ymin) * yscale
+            if fy >= 0 and fy < yres:
+                b = <int>fy // band_rows
+                d = fill[b]
+                fill[b] = d + 1
+                order[d] = i
+
+    return np.asarray(starts)
+
+@cython.cdivision(True)
+def compute_burn_inline(int xres, int yres,
+    real[:] xa, real[:] ya, real[:] za,
+    double xrng, double xmin, double yrng, double ymin,
+    double zrng, double zmin, double alpha, double[:] max_deltas, double[:] burn_factors,
+    double[:,:,:] render = None):
+
+    """
+    burn every point with its step from the previous point as the delta,
+    |x[i] - x[i-1]| / max delta clamped to 1, taken on the fly so no delta
+    arrays have to be allocated, max_deltas are the largest steps within an
+    orbit (OrbitSummary.max_steps), the jumps between the orbits stacked in a
+    trajectory are clamped instead of setting the colour scale
+
+    the first point only provides the delta of the second one, points outside
+    the image are skipped and the z weights are clamped, so bounds may come
+    from a summary or percentiles instead of the exact extremes
+
+    the tile, OpenMP and histogram kernels weight the points the same way
+    """
+
+    cdef Py_ssize_t length = xa.shape[0]
+    cdef Py_ssize_t i
+    cdef int I, J
+    cdef double fx, fy, z_alpha, rx, ry, rz
+    cdef double mdx = max_deltas[0]
+    cdef double mdy = max_deltas[1]
+    cdef double mdz = max_deltas[2]
+    cdef double bfr = burn_factors[0]
+    cdef double bfg = burn_factors[1]
+    cdef double bfb = burn_factors[2]
+    cdef double xscale = (xres - 1) / xrng
+    cdef double yscale = (yres - 1) / yrng
+
+    # an existing buffer (e.g. shared memory) has to be initialised to ones by the caller
+    if render is None:
+        render = np.ones((yres, xres, 3))
+
+    with nogil:
+        for i in range(1, length):
+
+            fx = (xa[i] - xmin) * xscale
+            fy = (ya[i] - ymin) * yscale
+
+            # comparisons are false for nan, so diverged points are skipped too
+            if not (fx >= 0 and fx < xres and fy >= 0 and fy < yres):
+                continue
+
+            J = <int>fx
+            I = <int>fy
+
+            z_alpha = 0.1 + 0.9 * (za[i] - zmin) / zrng  # scale alpha slightly with z
+            z_alpha = min(max(z_alpha, 0.1), 1.0)
+            rx = min(abs(xa[i] - xa[i - 1]) / mdx, 1.0)
+            ry = min(abs(ya[i] - ya[i - 1]) / mdy, 1.0)
+            rz = min(abs(za[i] - za[i - 1]) / mdz, 1.0)
+
+            # Multiplicative burn (scale toward black)
+            render[I,J,0] *= (1 - alpha * z_alpha * (1 + rx) * bfr * render[I,J,0])
+            render[I,J,1] *= (1 - alpha * z_alpha * (1 + ry) * bfg * render[I,J,1])
+            render[I,J,2] *= (1 - alpha * z_alpha * (1 + rz) * bfb * render[I,J,2])
+
+    return render
+
+@cython.cdivision(True)
+def compute_burn_sorted(int xres, int yres,
+    real[:] xa, real[:] ya, real[:] za,
+    double xrng, double xmin, double yrng, double ymin,
+    double zrng, double zmin, double alpha, double[:] max_deltas, double[:] burn_factors,
+    double[:,:,:] render = None, int tile_size = 256, Py_ssize_t chunk_size = 2**20):
+
+    """
+    compute_burn_inline with a cache friendly update order: the points of
+    every chunk of chunk_size points are bucketed by image tile (tile_size
+    x tile_size pixels) before they are burned, so the updates sweep the
+    image tile by tile instead of jumping across it with the orbit
+
+    the buckets are filled by a stable counting sort, so the points of a
+    pixel are burned in orbit order and the image is the same as the one
+    of compute_burn_inline (the burn of a pixel depends on the order)
+
+    a float64 tile of the default size (1.5 MB) fits in the L2 cache,
+    chunks have to be large enough to put many points into every tile,
+    the scratch buffers take 36 bytes per point of a chunk
+    """
+
+    cdef Py_ssize_t length = xa.shape[0]
+    cdef Py_ssize_t i, c0, c1, m, n, d
+    cdef int I, J, t
+    cdef double fx, fy, z_alpha, rx, ry, rz
+    cdef double mdx = max_deltas[0]
+    cdef double mdy = max_deltas[1]
+    cdef double mdz = max_deltas[2]
+    cdef double bfr = burn_factors[0]
+    cdef double bfg = burn_factors[1]
+    cdef double bfb = burn_factors[2]
+    cdef double xscale = (xres - 1) / xrng
+    cdef double yscale = (yres - 1) / yrng
+
+    cdef int x_tiles = (xres + tile_size - 1) // tile_size
+    cdef int n_tiles = x_tiles * ((yres + tile_size - 1) // tile_size)
+
+    chunk_size = max(1, min(chunk_size, length))
+    cdef Py_ssize_t[:] starts = np.zeros(n_tiles + 1, dtype=np.intp)
+    cdef int[:] keys = np.empty(chunk_size, dtype=np.int32)
+    cdef int[:,:] pixels = np.empty((chunk_size, 2), dtype=np.int32)
+    cdef double[:,:] weights = np.empty((chunk_size, 3))
+
+    # an existing buffer (e.g. shared memory) has to be initialised to ones by the caller
+    if render is None:
+        render = np.ones((yres, xres, 3))
+
+    with nogil:
+        c0 = 1
+        while c0 < length:
+            c1 = min(c0 + chunk_size, length)
+
+            # tile of every point, -1 for points outside the image
+            starts[:] = 0
+            for i in range(c0, c1):
+
+                fx = (xa[i] - xmin) * xscale
+                fy = (ya[i] - ymin) * yscale
+
+                # comparisons are false for nan, so diverged points are skipped too
+                if not (fx >= 0 and fx < xres and fy >= 0 and fy < yres):
+                    keys[i - c0] = -1
+                    continue
+
+                t = (<int>fy // tile_size) * x_tiles + <int>fx // tile_size
+                keys[i - c0] = t
+                starts[t + 1] += 1
+
+            for t in range(n_tiles):
+                starts[t + 1] += starts[t]
+            n = starts[n_tiles]
+
+            # stable counting sort: pixel and burn weights go straight to their slot
+            for i in range(c0, c1):
+
+                t = keys[i - c0]
+                if t < 0:
+                    continue
+                d = starts[t]
+                starts[t] = d + 1
+
+                pixels[d, 0] = <int>((ya[i] - ymin) * yscale)
+                pixels[d, 1] = <int>((xa[i] - xmin) * xscale)
+
+                z_alpha = 0.1 + 0.9 * (za[i] - zmin) / zrng  # scale alpha slightly with z
+                z_alpha = min(max(z_alpha, 0.1), 1.0)
+                rx = min(abs(xa[i] - xa[i - 1]) / mdx, 1.0)
+                ry = min(abs(ya[i] - ya[i - 1]) / mdy, 1.0)
+                rz = min(abs(za[i] - za[i - 1]) / mdz, 1.0)
+
+                # same products as compute_burn_inline, so the results match bit for bit
+                weights[d, 0] = alpha * z_alpha * (1 + rx) * bfr
+                weights[d, 1] = alpha * z_alpha * (1 + ry) * bfg
+                weights[d, 2] = alpha * z_alpha * (1 + rz) * bfb
+
+            # Multiplicative burn (scale toward black)
+            for m in range(n):
+                I = pixels[m, 0]
+                J = pixels[m, 1]
+                render[I,J,0] *= (1 - weights[m, 0] * render[I,J,0])
+                render[I,J,1] *= (1 - weights[m, 1] * render[I,J,1])
+                render[I,J,2] *= (1 - weights[m, 2] * render[I,J,2])
+
+            c0 = c1
+
+    return render
+
+
+def quantize(double[:,:,:] render, sample[:,:,:] out):
+
+    """
+    round an image with values in [0, 1] to 8 or 16 bit samples, the
+    sample type of out (uint8 or uint16) sets the depth, out can be a
+    strided view, e.g. into the rows of an image file buffer
+    """
+
+    cdef int yres = render.shape[0]
+    cdef int xres = render.shape[1]
+    cdef int x, y, k
+    cdef double value
+    cdef double scale
+
+    if sample is uint8_t:
+        scale = 255.0
+    else:
+        scale = 65535.0
+
+    with nogil:
+        for y in range(yres):
+            for x in range(xres):
+                for k in range(3):
+                    value = render[y,x,k] * scale + 0.5
+                    # also maps nan to 0
+                    if not value > 0.0:
+                        value = 0.0
+                    elif value > scale:
+                        value = scale
+                    out[y,x,k] = <sample>value
+
+    return out
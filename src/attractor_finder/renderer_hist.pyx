@@ -0,0 +1,127 @@
+#cython: boundscheck=False, wraparound=False, nonecheck=False, cdivision=True
+
+from libc.math cimport log1p
+import numpy as np
+
+# trajectories are stored as float64, or float32 for compact projected ones
+ctypedef fused real:
+    float
+    double
+
+
+def accumulate_histogram(int xres, int yres,
+    real[:] xa, real[:] ya, real[:] za,
+    double xrng, double xmin, double yrng, double ymin,
+    double zrng, double zmin, double[:] max_deltas,
+    unsigned int[:,:] counts, double[:,:,:] wsum, int y0 = 0, int y1 = -1):
+
+    """
+    add points to per-pixel statistics that do not depend on alpha or colours,
+    the points are weighted as in renderer_batch.compute_burn_inline, the
+    first point only provides the delta of the second one
+
+    parameters
+    ----------
+
+    y0, y1 : int
+        only points in the image rows y0 <= y < y1 are added (y1 = -1 for
+        all rows), workers that own disjoint bands of rows can add to the
+        same buffers
+
+    counts : np.ndarray of uint32, shape (yres, xres)
+        number of hits per pixel
+
+    wsum : np.ndarray of float64, shape (yres, xres, 3)
+        summed z weight (0.1 to 1, as used by the burn kernels) * (1 + delta
+        / max delta) per channel, float64 so that pixels with millions of
+        hits keep adding the small weights of later points
+
+    returns
+    -------
+
+    n_added : int
+        number of points added
+    """
+
+    cdef Py_ssize_t length = xa.shape[0]
+    cdef Py_ssize_t i
+    cdef Py_ssize_t n_added = 0
+    cdef int I, J
+    cdef double fx, fy, z_alpha
+    cdef double mdx = max_deltas[0]
+    cdef double mdy = max_deltas[1]
+    cdef double mdz = max_deltas[2]
+    cdef double xscale = (xres - 1) / xrng
+    cdef double yscale = (yres - 1) / yrng
+
+    if y1 < 0:
+        y1 = yres
+
+    with nogil:
+        for i in range(1, length):
+
+            fx = (xa[i] - xmin) * xscale
+            fy = (ya[i] - ymin) * yscale
+
+            # comparisons are false for nan, so diverged points are skipped too
+            if not (fx >= 0 and fx < xres and fy >= y0 and fy < y1):
+                continue
+
+            J = <int>fx
+            I = <int>fy
+
+            z_alpha = 0.1 + 0.9 * (za[i] - zmin) / zrng
+            z_alpha = min(max(z_alpha, 0.1), 1.0)
+
+            counts[I,J] += 1
+            wsum[I,J,0] += z_alpha * (1 + min(abs(xa[i] - xa[i - 1]) / mdx, 1.0))
+            wsum[I,J,1] += z_alpha * (1 + min(abs(ya[i] - ya[i - 1]) / mdy, 1.0))
+            wsum[I,J,2] += z_alpha * (1 + min(abs(za[i] - za[i - 1]) / mdz, 1.0))
+            n_added += 1
+
+    return n_added
+
+
+def tone_map(unsigned int[:,:] counts, double[:,:,:] wsum, double alpha, double[:] bgcolor,
+    double[:] burn_factors, double[:,:,:] render = None):
+
+    """
+    final image from the accumulated weights
+
+    every point burns a pixel by r -> r * (1 - b * r) with a small b, which
+    makes 1 / r grow by b + b^2 / (1 / r - b) per point, so the burn of n
+    points with S = sum of b = alpha * burn_factor * wsum is close to
+
+        1 / (1 + S + S / n * log(1 + S))
+
+    the last term (the sum of the b^2 terms for n equal b) needs the hit
+    counts, without it dim pixels come out several percent too dark
+    """
+
+    cdef int yres = wsum.shape[0]
+    cdef int xres = wsum.shape[1]
+    cdef int x, y, k
+    cdef double value, burn
+    cdef double[3] scale
+
+    if render is None:
+        render = np.zeros((yres, xres, 3))
+
+    for k in range(3):
+        scale[k] = alpha * burn_factors[k]
+
+    with nogil:
+        for y in range(yres):
+            for x in range(xres):
+                for k in range(3):
+                    burn = scale[k] * wsum[y,x,k]
+                    if counts[y,x] > 0:
+                        burn = burn + burn / counts[y,x] * log1p(burn)
+                    value = bgcolor[k] / (1 + burn)
+                    if value > 1.0:
+                        value = 1.0
+                    elif value < 0.0:
+                        value = 0.0
+                    render[y,x,k] = value
+
+    return render
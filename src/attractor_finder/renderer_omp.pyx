@@ -0,0 +1,113 @@
+#cython: boundscheck=False, wraparound=False, nonecheck=False, cdivision=True
+
+import numpy as np
+from cython.parallel import prange
+
+# trajectories are stored as float64, or float32 for compact projected ones
+ctypedef fused real:
+    float
+    double
+
+
+cdef inline void _burn_chunk(double[:,:,:] render, int xres, int yres, Py_ssize_t i0, Py_ssize_t i1,
+    real[:] xa, real[:] ya, real[:] za,
+    double xscale, double xmin, double yscale, double ymin,
+    double zrng, double zmin, double alpha,
+    double mdx, double mdy, double mdz, double bfr, double bfg, double bfb) noexcept nogil:
+
+    # burn of renderer_batch.compute_burn_inline, i0 >= 1 so every point has a predecessor
+
+    cdef Py_ssize_t i
+    cdef int I, J
+    cdef double fx, fy, z_alpha, rx, ry, rz
+
+    for i in range(i0, i1):
+
+        fx = (xa[i] - xmin) * xscale
+        fy = (ya[i] - ymin) * yscale
+
+        # comparisons are false for nan, so diverged points are skipped too
+        if not (fx >= 0 and fx < xres and fy >= 0 and fy < yres):
+            continue
+
+        J = <int>fx
+        I = <int>fy
+
+        z_alpha = 0.1 + 0.9 * (za[i] - zmin) / zrng  # scale alpha slightly with z
+        z_alpha = min(max(z_alpha, 0.1), 1.0)
+
+        rx = min(abs(xa[i] - xa[i - 1]) / mdx, 1.0)
+        ry = min(abs(ya[i] - ya[i - 1]) / mdy, 1.0)
+        rz = min(abs(za[i] - za[i - 1]) / mdz, 1.0)
+
+        # Multiplicative burn (scale toward black)
+        render[I,J,0] *= (1 - alpha * z_alpha * (1 + rx) * bfr * render[I,J,0])
+        render[I,J,1] *= (1 - alpha * z_alpha * (1 + ry) * bfg * render[I,J,1])
+        render[I,J,2] *= (1 - alpha * z_alpha * (1 + rz) * bfb * render[I,J,2])
+
+
+def compute_burn_omp(int xres, int yres,
+    real[:] xa, real[:] ya, real[:] za,
+    double xrng, double xmin, double yrng, double ymin,
+    double zrng, double zmin, double alpha, double[:] max_deltas, double[:] burn_factors,
+    int n_threads):
+
+    """
+    same burn as renderer_batch.compute_burn_inline, split over n_threads
+    OpenMP threads that each accumulate a contiguous chunk of points into
+    their own buffer, the buffers are multiplied together at the end
+    """
+
+    cdef double[:,:,:,:] thread_render = np.ones((n_threads, yres, xres, 3))
+    cdef double[:,:,:] render = np.ones((yres, xres, 3))
+    cdef Py_ssize_t n_points = xa.shape[0] - 1
+    cdef int t, s, I, J, k
+
+    cdef double mdx = max_deltas[0]
+    cdef double mdy = max_deltas[1]
+    cdef double mdz = max_deltas[2]
+    cdef double bfr = burn_factors[0]
+    cdef double bfg = burn_factors[1]
+    cdef double bfb = burn_factors[2]
+    cdef double xscale = (xres - 1) / xrng
+    cdef double yscale = (yres - 1) / yrng
+
+    # the first point only provides the delta of the second one
+    for t in prange(n_threads, nogil=True, num_threads=n_threads, schedule='static', chunksize=1):
+        _burn_chunk(thread_render[t], xres, yres,
+            1 + n_points * t // n_threads, 1 + n_points * (t + 1) // n_threads,
+            xa, ya, za,
+            xscale, xmin, yscale, ymin, zrng, zmin, alpha,
+            mdx, mdy, mdz, bfr, bfg, bfb)
+
+    for I in prange(yres, nogil=True, num_threads=n_threads, schedule='static'):
+        for s in range(n_threads):
+            for J in range(xres):
+                for k in range(3):
+                    render[I,J,k] *= thread_render[s,I,J,k]
+
+    return render
+
+
+def compute_render_omp(int xres, int yres, double[:] bgcolor, double[:,:,:] burn_array, int n_threads):
+
+    """
+    same as renderer_batch.compute_render_slice over the full image,
+    rows are split over n_threads OpenMP threads
+    """
+
+    cdef double[:,:,:] render = np.zeros((yres, xres, 3))
+    cdef int x, y, k
+    cdef double value
+
+    for y in prange(yres, nogil=True, num_threads=n_threads, schedule='static'):
+        for x in range(xres):
+            for k in range(3):
+                value = bgcolor[k] * burn_array[y,x,k]
+                if value > 1.0:
+                    value = 1.0
+                elif value < 0.0:
+                    value = 0.0
+                render[y,x,k] = value
+
+    return render
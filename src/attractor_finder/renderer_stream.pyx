@@ -0,0 +1,265 @@
+#cython: boundscheck=False, wraparound=False, nonecheck=False, cdivision=True
+
+import numpy as np
+
+
+def iterate_burn(Py_ssize_t n_iterations, double[:] coeffs, double[:] x0, int dimension,
+    int ix, int iy, int iz, int xres, int yres,
+    double xrng, double xmin, double yrng, double ymin,
+    double zrng, double zmin, double alpha, double[:] max_deltas, double[:] burn_factors,
+    Py_ssize_t n_discard = 0, double[:,:,:] render = None):
+
+    """
+    iterate the map and burn every point straight into the image,
+    the trajectory is never stored
+
+    parameters
+    ----------
+
+    n_iterations : int
+        number of iterations burned into the image
+
+    coeffs : np.ndarray of shape (num_coeffs,)
+        attractor coefficients
+
+    x0 : np.ndarray of shape (dimension + 1,)
+        initial position vector
+
+    dimension : int
+        number of variables
+
+    ix, iy, iz : int
+        coordinate indices used for the x, y and z axes of the image
+
+    n_discard : int
+        number of transient iterations skipped before burning
+
+    render : np.ndarray of shape (yres, xres, 3), optional
+        buffer initialised to ones that the points are burned into
+
+    returns
+    -------
+
+    render : np.ndarray of shape (yres, xres, 3)
+        burn factors (1 = untouched pixel)
+
+    coords : np.ndarray of shape (dimension + 1,)
+        final position vector, can be used to continue the orbit
+
+    n_outside : int
+        number of points that fell outside the image bounds
+    """
+
+    cdef double[:] coords = np.copy(x0)
+    cdef double[:] sums = np.zeros(dimension)
+
+    cdef int d1 = dimension + 1
+    cdef int m, n, i, j, k, I, J
+    cdef Py_ssize_t t
+    cdef Py_ssize_t n_outside = 0
+    cdef double fsum, x, y, z, px, py, pz, fx, fy
+    cdef double z_alpha, rx, ry, rz
+
+    cdef double mdx = max_deltas[0]
+    cdef double mdy = max_deltas[1]
+    cdef double mdz = max_deltas[2]
+    cdef double bfr = burn_factors[0]
+    cdef double bfg = burn_factors[1]
+    cdef double bfb = burn_factors[2]
+    cdef double xscale = (xres - 1) / xrng
+    cdef double yscale = (yres - 1) / yrng
+
+    if render is None:
+        render = np.ones((yres, xres, 3))
+
+    coords[0] = 1
+
+    px = coords[ix + 1]
+    py = coords[iy + 1]
+    pz = coords[iz + 1]
+
+    for t in range(n_discard + n_iterations):
+
+        n = 0
+
+        for m in range(dimension):
+
+            fsum = 0
+
+            for i in range(d1):
+                for j in range(i, d1):
+                    for k in range(j, d1):
+
+                        fsum = fsum + coeffs[n] * coords[i] * coords[j] * coords[k]
+
+                        n += 1
+
+            sums[m] = fsum
+
+        for i in range(dimension):
+            coords[i + 1] = sums[i]
+
+        x = coords[ix + 1]
+        y = coords[iy + 1]
+        z = coords[iz + 1]
+
+        if t >= n_discard:
+
+            fx = (x - xmin) * xscale
+            fy = (y - ymin) * yscale
+
+            # comparisons are false for nan, so diverged points are skipped too
+            if fx >= 0 and fx < xres and fy >= 0 and fy < yres:
+
+                J = <int>fx
+                I = <int>fy
+
+                # bounds come from a pilot run, so clamp values it did not see
+                z_alpha = 0.1 + 0.9 * (z - zmin) / zrng
+                z_alpha = min(max(z_alpha, 0.1), 1.0)
+                rx = min(abs(x - px) / mdx, 1.0)
+                ry = min(abs(y - py) / mdy, 1.0)
+                rz = min(abs(z - pz) / mdz, 1.0)
+
+                # Multiplicative burn (scale toward black)
+                render[I,J,0] *= (1 - alpha * z_alpha * (1 + rx) * bfr * render[I,J,0])
+                render[I,J,1] *= (1 - alpha * z_alpha * (1 + ry) * bfg * render[I,J,1])
+                render[I,J,2] *= (1 - alpha * z_alpha * (1 + rz) * bfb * render[I,J,2])
+
+            else:
+                n_outside += 1
+
+        px = x
+        py = y
+        pz = z
+
+    return render, coords, n_outside
+
+
+def iterate_burn_views(Py_ssize_t n_iterations, double[:] coeffs, double[:] x0, int dimension,
+    double[:,:,:] projections, int[:,:] shapes, double[:,:] bounds, double[:,:] max_deltas,
+    long long[:] offsets, double alpha, double[:] burn_factors, double[:] render):
+
+    """
+    iterate the map once and burn every point into the images of several
+    views, so extra views cost no extra iterations or trajectory reads
+
+    parameters
+    ----------
+
+    projections : np.ndarray of shape (n_views, 3, dimension)
+        rows map the coordinates to the x, y and z axes of a view
+
+    shapes : np.ndarray of int32, shape (n_views, 2)
+        xres and yres of every view
+
+    bounds : np.ndarray of shape (n_views, 6)
+        xrng, xmin, yrng, ymin, zrng, zmin of every view
+
+    max_deltas : np.ndarray of shape (n_views, 3)
+        max step per axis of every view
+
+    offsets : np.ndarray of int64, shape (n_views,)
+        start of every view in render
+
+    render : np.ndarray of shape (sum of yres * xres * 3,)
+        flat buffer initialised to ones, view v occupies
+        render[offsets[v]:offsets[v] + yres * xres * 3] in (yres, xres, 3) order
+
+    returns
+    -------
+
+    coords : np.ndarray of shape (dimension + 1,)
+        final position vector, can be used to continue the orbit
+
+    n_outside : np.ndarray of shape (n_views,)
+        number of points that fell outside the bounds of every view
+    """
+
+    cdef int n_views = projections.shape[0]
+    cdef double[:] coords = np.copy(x0)
+    cdef double[:] sums = np.zeros(dimension)
+    cdef double[:,:] previous = np.zeros((n_views, 3))
+    cdef long long[:] n_outside = np.zeros(n_views, dtype=np.int64)
+
+    cdef int d1 = dimension + 1
+    cdef int m, n, i, j, k, v, I, J, xres, yres
+    cdef Py_ssize_t t, p
+    cdef double fsum, x, y, z, fx, fy
+    cdef double z_alpha, rx, ry, rz
+    cdef double bfr = burn_factors[0]
+    cdef double bfg = burn_factors[1]
+    cdef double bfb = burn_factors[2]
+
+    coords[0] = 1
+
+    for v in range(n_views):
+        for i in range(3):
+            fsum = 0
+            for m in range(dimension):
+                fsum = fsum + projections[v,i,m] * coords[m + 1]
+            previous[v,i] = fsum
+
+    for t in range(n_iterations):
+
+        n = 0
+
+        for m in range(dimension):
+
+            fsum = 0
+
+            for i in range(d1):
+                for j in range(i, d1):
+                    for k in range(j, d1):
+
+                        fsum = fsum + coeffs[n] * coords[i] * coords[j] * coords[k]
+
+                        n += 1
+
+            sums[m] = fsum
+
+        for i in range(dimension):
+            coords[i + 1] = sums[i]
+
+        for v in range(n_views):
+
+            x = 0
+            y = 0
+            z = 0
+            for m in range(dimension):
+                x = x + projections[v,0,m] * coords[m + 1]
+                y = y + projections[v,1,m] * coords[m + 1]
+                z = z + projections[v,2,m] * coords[m + 1]
+
+            xres = shapes[v,0]
+            yres = shapes[v,1]
+            fx = (x - bounds[v,1]) * (xres - 1) / bounds[v,0]
+            fy = (y - bounds[v,3]) * (yres - 1) / bounds[v,2]
+
+            # comparisons are false for nan, so diverged points are skipped too
+            if fx >= 0 and fx < xres and fy >= 0 and fy < yres:
+
+                J = <int>fx
+                I = <int>fy
+                p = offsets[v] + (<Py_ssize_t>I * xres + J) * 3
+
+                # bounds come from a pilot run, so clamp values it did not see
+                z_alpha = 0.1 + 0.9 * (z - bounds[v,5]) / bounds[v,4]
+                z_alpha = min(max(z_alpha, 0.1), 1.0)
+                rx = min(abs(x - previous[v,0]) / max_deltas[v,0], 1.0)
+                ry = min(abs(y - previous[v,1]) / max_deltas[v,1], 1.0)
+                rz = min(abs(z - previous[v,2]) / max_deltas[v,2], 1.0)
+
+                # Multiplicative burn (scale toward black)
+                render[p] *= (1 - alpha * z_alpha * (1 + rx) * bfr * render[p])
+                render[p + 1] *= (1 - alpha * z_alpha * (1 + ry) * bfg * render[p + 1])
+                render[p + 2] *= (1 - alpha * z_alpha * (1 + rz) * bfb * render[p + 2])
+
+            else:
+                n_outside[v] += 1
+
+            previous[v,0] = x
+            previous[v,1] = y
+            previous[v,2] = z
+
+    return np.asarray(coords), np.asarray(n_outside)
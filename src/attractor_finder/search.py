@@ -1,46 +1,154 @@
+from collections import Counter
 import numpy as np
-import time 
+import time
 
-from attractor_finder.iterator import iterator
-from attractor_finder.functions import pixel_density
+from attractor_finder import metrics
+from attractor_finder.iterator import iterator_batch
+from attractor_finder.functions import orbit_stats
+from attractor_finder.pool import get_executor, get_n_workers
 
-def search_attractor(dimension, search_iterates = 2000, seed = None):
+# candidates retired by iterator_batch, by status code
+_KERNEL_REJECTIONS = {1: 'rejected_diverged', 2: 'rejected_fixed_point'}
 
-    start = time.perf_counter()
+def get_ncoeffs(dimension):
+    d = dimension
+    return int(d + 11/6 * d**2 + d**3 + d**4/6)
 
-    found = False
+def draw_candidates(rng, dimension, batch_size):
+    """ draw random coefficients and initial positions for a batch of candidates """
+    coeffs = rng.randint(-10, 11, (batch_size, get_ncoeffs(dimension)))/(10 + 2 * dimension)
+    x0 = rng.uniform(-1e-1, 1e-1, (batch_size, dimension + 1))
+    return coeffs, x0
 
-    d = dimension
+def find_hits(coeffs, x0, dimension, search_iterates, max_hits = 1,
+    min_fill = 1.5, min_lyapunov = 0.005, counts = None):
+    """
+    return (index, fill, lyapunov) of the first max_hits candidates (in candidate order)
+    that are chaotic and fill enough of the image
+
+    counts (a Counter) is updated with the number of candidates and the
+    rejections by reason, candidates after the last hit are not classified
+    """
+    itdata, status = iterator_batch(search_iterates, coeffs, x0, dimension)
+    itdata = np.asarray(itdata)
+    status = np.asarray(status)
+    counts = Counter() if counts is None else counts
+    counts['candidates'] += len(coeffs)
+    for code, name in _KERNEL_REJECTIONS.items():
+        counts[name] += int(np.count_nonzero(status == code))
+
+    hits = []
+    # diverged and fixed point candidates were already retired by the kernel
+    for c in np.flatnonzero(status == 0):
+        fill, lyapunov = orbit_stats(itdata[c], coeffs[c], dimension)
+        if fill > min_fill and lyapunov > min_lyapunov:
+            hits.append((c, fill, lyapunov))
+            if len(hits) == max_hits:
+                break
+        elif not fill > min_fill:
+            counts['rejected_density'] += 1
+        else:
+            counts['rejected_lyapunov'] += 1
+    return hits
+
+def record_counts(counts):
+    """ add the search counts to the metrics being collected """
+    for name, n in counts.items():
+        metrics.count(name, n)
 
-    ncoeffs = int(d + 11/6 * d**2 + d**3 + d**4/6)
+def print_found(dimension, seed, n_tried, fill, lyapunov, start):
+    print("────────────────────────────────────────────")
+    print(" Attractor Found")
+    print("────────────────────────────────────────────")
+    print(f"• Dimension:        {dimension}")
+    print(f"• Seed:             {seed}")
+    print(f"• Candidates:       {n_tried}")
+    print(f"• Fill:             {fill:.1f} %")
+    print(f"• Lyapunov:         {lyapunov:.3f}")
+    print(f"• Discovery Time:   {time.perf_counter()-start:.1f} s\n")
+
+@metrics.span('search')
+def search_attractor(dimension, search_iterates = 2000, seed = None, batch_size = 256, catalog = None):
+
+    start = time.perf_counter()
 
     if seed is None:
         seed = np.random.randint(1, 2e9)
     np.random.seed(seed)
 
-    while not found:
-                
-        coeffs = np.random.randint(-10, 11, ncoeffs)/(10 + 2 * dimension)
-        x0 = np.random.uniform(-1e-1, 1e-1, (dimension + 1))
-        itdata = np.asarray(iterator(search_iterates, coeffs, x0, dimension))
+    n_batches = 0
+    hits = []
+    counts = Counter()
 
-        test = itdata[-1,-1]
+    while not hits:
+        batch_coeffs, x0 = draw_candidates(np.random, dimension, batch_size)
+        hits = find_hits(batch_coeffs, x0, dimension, search_iterates, counts=counts)
+        n_batches += 1
+
+    c, fill, lyapunov = hits[0]
+    counts['hits'] += 1
+    record_counts(counts)
+    coeffs = batch_coeffs[c]
+    print_found(dimension, seed, (n_batches - 1) * batch_size + c + 1, fill, lyapunov, start)
+    if catalog is not None:
+        catalog.add(dimension, seed, coeffs, fill, lyapunov)
 
-        if np.isnan(test) or np.isinf(test):
-            out_of_bounds = True
-        else:
-            out_of_bounds = False
-
-        if not out_of_bounds:
-            xa = itdata[:,0]
-            ya = itdata[:,1]
-            if pixel_density(xa, ya):
-                print("────────────────────────────────────────────")
-                print(" Attractor Found")
-                print("────────────────────────────────────────────")
-                print(f"• Dimension:        {d}")
-                print(f"• Seed:             {seed}")
-                print(f"• Discovery Time:   {time.perf_counter()-start:.1f} s\n")
-                found = True
-            
     return coeffs, seed
+
+def search_worker(args):
+    """
+    search one batch drawn from the random stream belonging to (worker, round),
+    streams are derived from the user seed so results do not depend on scheduling
+
+    returns the hits and the candidate counts of the batch
+    """
+    dimension, search_iterates, batch_size, seed, worker_index, round_index, max_hits = args
+    seed_seq = np.random.SeedSequence(seed, spawn_key=(worker_index, round_index))
+    rng = np.random.RandomState(np.random.MT19937(seed_seq))
+    batch_coeffs, x0 = draw_candidates(rng, dimension, batch_size)
+    counts = Counter()
+    hits = find_hits(batch_coeffs, x0, dimension, search_iterates, max_hits, counts=counts)
+    return [(batch_coeffs[c], fill, lyapunov) for c, fill, lyapunov in hits], counts
+
+@metrics.span('search')
+def search_attractor_parallel(dimension, n_workers = None, n_hits = 1,
+    search_iterates = 2000, seed = None, batch_size = 256, pool = None, catalog = None):
+    """
+    search with one batch per worker per round, hits are collected in
+    (round, worker, candidate) order so the result only depends on the
+    seed and the number of workers
+
+    returned hits are recorded in the catalog if one is given
+
+    returns a list of n_hits coefficient arrays and the seed
+    """
+
+    start = time.perf_counter()
+
+    if seed is None:
+        seed = np.random.randint(1, 2e9)
+    n_workers = get_n_workers(pool, n_workers)
+
+    hits = []
+    counts = Counter()
+    round_index = 0
+
+    with get_executor(pool, n_workers) as executor:
+        while len(hits) < n_hits:
+            args_list = [(dimension, search_iterates, batch_size, seed, w, round_index, n_hits)
+                for w in range(n_workers)]
+            for batch_hits, batch_counts in executor.map(search_worker, args_list):
+                hits.extend(batch_hits)
+                counts.update(batch_counts)
+            round_index += 1
+
+    counts['hits'] += min(len(hits), n_hits)
+    record_counts(counts)
+
+    _, fill, lyapunov = hits[0]
+    print_found(dimension, seed, round_index * n_workers * batch_size, fill, lyapunov, start)
+    if catalog is not None:
+        for coeffs, fill, lyapunov in hits[:n_hits]:
+            catalog.add(dimension, seed, coeffs, fill, lyapunov)
+
+    return [coeffs for coeffs, _, _ in hits[:n_hits]], seed
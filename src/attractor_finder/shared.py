@@ -0,0 +1,110 @@
+import atexit
+import errno
+import os
+import tempfile
+
+import numpy as np
+
+# RAM backed on linux, falls back to the regular temp directory elsewhere
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+_live_paths = set()
+
+
+class SharedArray():
+    """
+    numpy array backed by a memory-mapped file that worker processes can map
+    in place, only the (path, shape, dtype) handle is pickled when it is
+    passed to a worker
+    """
+
+    def __init__(self, shape, dtype = np.float64, fill = None):
+
+        self.shape = tuple(int(n) for n in shape)
+        self.dtype = np.dtype(dtype)
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+
+        directory = shared_dir(nbytes)
+        fd, self.path = tempfile.mkstemp(prefix='attractor_', suffix='.dat', dir=directory)
+        _live_paths.add(self.path)
+        try:
+            try:
+                reserve(fd, nbytes)
+            except OSError:
+                if directory is None:
+                    raise
+                # /dev/shm filled up since it was checked
+                os.close(fd)
+                release_path(self.path)
+                fd, self.path = tempfile.mkstemp(prefix='attractor_', suffix='.dat')
+                _live_paths.add(self.path)
+                reserve(fd, nbytes)
+        finally:
+            os.close(fd)
+
+        self.array = np.asarray(np.memmap(self.path, dtype=self.dtype, mode='r+', shape=self.shape))
+        if fill is not None:
+            self.array.fill(fill)
+
+    @property
+    def handle(self):
+        return (self.path, self.shape, self.dtype.str)
+
+    def release(self):
+        """
+        remove the backing file, the array stays valid in this process
+        until it is garbage collected
+        """
+        release_path(self.path)
+
+def shared_dir(nbytes):
+    """
+    SHARED_DIR if it has room for nbytes, else None (the regular temp
+    directory), containers often mount a small /dev/shm and touching a
+    mapped page past its end kills the process with SIGBUS
+    """
+    if SHARED_DIR is None:
+        return None
+    try:
+        stats = os.statvfs(SHARED_DIR)
+    except OSError:
+        return None
+    return SHARED_DIR if stats.f_bavail * stats.f_frsize >= nbytes else None
+
+def reserve(fd, nbytes):
+    """
+    size the file to nbytes with its blocks allocated where the platform
+    supports it, so running out of space raises OSError here and not
+    SIGBUS on the first write through the mapping
+    """
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, nbytes)
+            return
+        except OSError as e:
+            if e.errno not in (errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    os.ftruncate(fd, nbytes)
+
+def attach_shared(handle):
+    """ map a shared array from its handle (in a worker process) """
+    path, shape, dtype = handle
+    return np.asarray(np.memmap(path, dtype=dtype, mode='r+', shape=shape))
+
+def release_path(path):
+    """
+    remove a shared file, a path that can not be removed yet (a file still
+    mapped on windows) stays registered and is retried at exit
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        return
+    _live_paths.discard(path)
+
+@atexit.register
+def _release_all():
+    for path in list(_live_paths):
+        release_path(path)
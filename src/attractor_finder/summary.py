@@ -0,0 +1,66 @@
+import numpy as np
+
+from attractor_finder.functions_numba import summarize_projection
+
+# points kept per iteration worker for percentile framing
+SAMPLES_PER_CHUNK = 4096
+
+_AXES = ('x', 'y', 'z')
+
+
+def projection_columns(dimension):
+    """ data columns used for the x, y and z axes of the image """
+    return [(dimension - 3) % dimension, (dimension - 2) % dimension, (dimension - 1) % dimension]
+
+class OrbitSummary():
+    """
+    mergeable running summary of the projected orbit: min and max per axis,
+    largest absolute step per axis and an optional strided sample of points
+    for percentile (outlier robust) framing
+
+    iteration workers summarize the chunk they computed, the parent merges
+    the summaries instead of scanning the trajectory again
+    """
+
+    def __init__(self, mins, maxs, max_steps, samples = None):
+        self.mins = np.asarray(mins, dtype=np.float64)
+        self.maxs = np.asarray(maxs, dtype=np.float64)
+        self.max_steps = np.asarray(max_steps, dtype=np.float64)
+        self.samples = np.empty((0, 3)) if samples is None else np.asarray(samples, dtype=np.float64)
+
+    @classmethod
+    def from_data(cls, data, columns, start = 0, orbit_length = None, n_samples = 0):
+        """ summary of data[start:] with the projection columns, orbits of orbit_length rows """
+        if orbit_length is None:
+            orbit_length = len(data)
+        return cls(*summarize_projection(data, np.asarray(columns, dtype=np.int64),
+            start, max(orbit_length, 1), n_samples))
+
+    def merge(self, other):
+        return OrbitSummary(
+            np.minimum(self.mins, other.mins),
+            np.maximum(self.maxs, other.maxs),
+            np.maximum(self.max_steps, other.max_steps),
+            np.concatenate([self.samples, other.samples]))
+
+    @staticmethod
+    def merge_all(summaries):
+        summaries = list(summaries)
+        merged = summaries[0]
+        for summary in summaries[1:]:
+            merged = merged.merge(summary)
+        return merged
+
+    def extents(self, percentiles = None):
+        """
+        raw extents (min and range per axis), percentiles = (low, high)
+        takes them from the sample instead of the extremes
+        """
+        mins, maxs = self.mins, self.maxs
+        if percentiles is not None and len(self.samples):
+            mins, maxs = np.percentile(self.samples, percentiles, axis=0)
+        extents = {}
+        for a, axis in enumerate(_AXES):
+            extents[f'{axis}min'] = float(mins[a])
+            extents[f'{axis}rng'] = float(maxs[a] - mins[a])
+        return extents
@@ -0,0 +1,193 @@
+import numpy as np
+
+from attractor_finder import metrics
+from attractor_finder.functions import frame_bounds, time_this
+from attractor_finder.iterator_sparse import iterator_sparse
+from attractor_finder.pool import get_executor, get_n_workers
+from attractor_finder.render import AttractorRenderPipeline
+from attractor_finder.renderer_batch import compute_render_slice
+from attractor_finder.renderer_stream import iterate_burn_views
+from attractor_finder.shared import SharedArray, attach_shared
+from attractor_finder.summary import OrbitSummary, projection_columns
+
+
+def views_worker(args):
+    """ iterate and burn every view into its own slot of the shared burn buffer """
+    slots_handle, slot, params = args
+    burn_slots = attach_shared(slots_handle)
+    _, n_outside = iterate_burn_views(*params, burn_slots[slot])
+    return n_outside
+
+
+class View():
+    """
+    one image of a multi-view render
+
+    projection is a triple of coordinate indices or a (3, dimension) matrix
+    whose rows give the x, y and z axes of the image, name is used in the
+    file name of the saved image
+    """
+
+    def __init__(self, projection, xres, yres, name = None):
+        self.projection = projection
+        self.xres = xres
+        self.yres = yres
+        self.name = name
+
+    @classmethod
+    def default(cls, dimension, xres, yres, name = None):
+        """ the projection used by the single view renders """
+        return cls(projection_columns(dimension), xres, yres, name)
+
+    @classmethod
+    def random(cls, dimension, xres, yres, name = None, rng = None):
+        """
+        orthonormal projection onto a random 3d subspace, below three
+        dimensions the z axis repeats the first one (a random rotation)
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        k = min(dimension, 3)
+        q, _ = np.linalg.qr(rng.normal(size = (dimension, k)))
+        return cls(q.T[np.arange(3) % k], xres, yres, name)
+
+    def matrix(self, dimension):
+        projection = np.asarray(self.projection)
+        if projection.ndim == 1:
+            return np.eye(dimension)[projection.astype(int)]
+        return projection.astype(np.float64)
+
+
+class MultiViewRenderPipeline(AttractorRenderPipeline):
+    """
+    streaming render of several views of one attractor: every worker iterates
+    the map once and burns each point into the images of all views, so extra
+    views cost a projection and a burn per point instead of another pass
+
+    the burn buffers of all views are concatenated into one flat buffer per
+    worker, bounds and max deltas of every view come from the projected
+    pilot run
+    """
+
+    def __init__(self, coeffs, dimension, render_iterates, views, alpha = 0.025,
+        pilot_iterates = 200_000, transient = 10000, pool = None, writer = None):
+
+        self.coeffs = np.asarray(coeffs, dtype=np.float64)
+        self.dimension = dimension
+        self.render_iterates = render_iterates
+        self.pilot_iterates = pilot_iterates
+        self.transient = transient
+
+        self.views = list(views)
+        for i, view in enumerate(self.views):
+            if view.name is None:
+                view.name = f'view{i}'
+
+        self._init_settings(None, None, alpha, pool, writer=writer)
+        self._args_list_views = None
+        self._pilot = None
+        self._renders = None
+        self._n_outside = None
+
+        self._projections = np.stack([view.matrix(dimension) for view in self.views])
+        self._shapes = np.asarray([(view.xres, view.yres) for view in self.views], dtype=np.int32)
+        sizes = self._shapes[:, 0].astype(np.int64) * self._shapes[:, 1] * 3
+        self._offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        self._n_values = int(sizes.sum())
+
+        self.pilot_run()
+
+    @time_this(stage='bounds')
+    def pilot_run(self):
+        """
+        short iteration used to estimate the bounds of every view and
+        starting points on the attractor
+        """
+        print('... pilot_run', end=" ")
+        x0 = np.random.uniform(-1e-1, 1e-1, (self.dimension + 1))
+        n_iterations = self.transient + self.pilot_iterates
+        pilot = np.asarray(iterator_sparse(n_iterations, self.coeffs, x0, self.dimension))
+        self._pilot = pilot[self.transient:]
+        metrics.count('iterations', n_iterations)
+
+        self._view_bounds = np.zeros((len(self.views), 6))
+        self._view_max_deltas = np.zeros((len(self.views), 3))
+        self.error = not np.all(np.isfinite(self._pilot[-1]))
+        if self.error:
+            return
+
+        for v, view in enumerate(self.views):
+            summary = OrbitSummary.from_data(self._pilot @ self._projections[v].T, (0, 1, 2))
+            e = summary.extents()
+            xmin, ymin, xrng, yrng = frame_bounds(e['xmin'], e['xrng'], e['ymin'], e['yrng'], view.xres, view.yres)
+            self._view_bounds[v] = (xrng, xmin, yrng, ymin, e['zrng'], e['zmin'])
+            self._view_max_deltas[v] = summary.max_steps
+        self.error = bool(np.any(np.isnan(self._view_bounds)))
+
+    @time_this(stage='burn')
+    def construct_args_list_views(self):
+        """
+        construct argument list to pass to views_worker
+        workers start from pilot points so no transient has to be discarded
+        """
+        print('... construct_args_list_views', end=" ")
+        it_counts = np.full(self.n_processes, self.render_iterates // self.n_processes)
+        it_counts[:self.render_iterates % self.n_processes] += 1
+        start_rows = np.linspace(len(self._pilot) - 1, 0, self.n_processes).astype(int)
+
+        self._shared['burn_slots'] = SharedArray((self.n_processes, self._n_values), fill = 1)
+
+        self._args_list_views = []
+        for i in range(self.n_processes):
+            x0 = np.ones(self.dimension + 1)
+            x0[1:] = self._pilot[start_rows[i]]
+            params = (
+                int(it_counts[i]),
+                self.coeffs,
+                x0,
+                self.dimension,
+                self._projections,
+                self._shapes,
+                self._view_bounds,
+                self._view_max_deltas,
+                self._offsets,
+                self.alpha,
+                self._burn_factors
+                )
+            self._args_list_views.append((self._shared['burn_slots'].handle, i, params))
+
+    @time_this(stage='burn')
+    def views_pool(self):
+        """
+        iterate and burn all views in one go, uses multiprocessing
+        """
+        print(f'... views_pool ({len(self.views)} views)', end=" ")
+        with get_executor(self.pool, self.n_processes) as executor:
+            self._n_outside = np.sum(list(executor.map(views_worker, self._args_list_views)), axis=0)
+        metrics.count('iterations', self.render_iterates)
+        metrics.count('points_burned', self.render_iterates * len(self.views) - int(np.sum(self._n_outside)))
+        metrics.count('out_of_bounds', int(np.sum(self._n_outside)))
+        burn_slots = self._shared.pop('burn_slots')
+        self._full_burn = np.prod(burn_slots.array, axis=0)
+        burn_slots.release()
+
+    @time_this(stage='pixel')
+    def render_views(self):
+        print('... render_views', end=" ")
+        self._renders = []
+        for v, view in enumerate(self.views):
+            size = view.yres * view.xres * 3
+            burn = self._full_burn[self._offsets[v]:self._offsets[v] + size].reshape(view.yres, view.xres, 3)
+            self._renders.append(np.asarray(compute_render_slice(view.xres, view.yres, 0, view.yres,
+                self._bgcolor, burn)))
+
+    def render_attractor(self, seed, n_processes = None):
+        """ images are saved as D{dimension}-{seed}-{view name}.png """
+        print('... multi_view_render')
+        self.n_processes = get_n_workers(self.pool, n_processes)
+        self.construct_args_list_views()
+        self.views_pool()
+        self.render_views()
+        for view, render in zip(self.views, self._renders):
+            self._render = render
+            self._save_image(f'{seed}-{view.name}')
+        self.release_shared()
@@ -0,0 +1,29 @@
+from attractor_finder import metrics, search_attractor
+from attractor_finder.animation import AnimationPipeline, smooth_frames
+
+import numpy as np
+
+def test_smooth_frames():
+	values = np.arange(10.0)[:, None]
+	assert np.array_equal(smooth_frames(values, 1), values)
+	smoothed = smooth_frames(values, 3)
+	assert smoothed.shape == values.shape
+	assert np.allclose(smoothed[1:-1], values[1:-1]) and smoothed[0, 0] == 1 / 3
+
+def test_animation(tmp_path):
+	np.random.seed(3)
+	coeffs, _ = search_attractor(dimension = 2, seed = 1)
+	# a small perturbation stays on an attractor, so every frame renders
+	end = coeffs * 1.01
+	with metrics.collecting(metrics.Metrics()) as pilot:
+		animation = AnimationPipeline(coeffs, end, 2, 5, 20_000, 32, 24, pilot_iterates = 5000,
+			framing = 'track', smoothing = 3, batch_size = 2, output_dir = tmp_path)
+	assert not animation.error and not animation._diverged.any()
+	assert np.allclose(animation.coeffs[0], coeffs) and np.allclose(animation.coeffs[-1], end)
+	# only the first frame pays for the transient
+	assert pilot.counters['iterations'] == 10000 + 5000 + 4 * (1000 + 5000)
+
+	animation.render_animation(n_processes = 2)
+	frames = sorted(path.name for path in tmp_path.iterdir())
+	assert frames == [f'frame_{k:05d}.png' for k in range(5)]
+	assert animation.frames_per_minute > 0
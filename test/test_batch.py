@@ -0,0 +1,50 @@
+from attractor_finder import WorkerPool, batch
+from attractor_finder.batch import BatchPipeline
+
+import numpy as np
+import pytest
+
+class RecordingWriter():
+	""" stands in for output.ImageWriter, records the paths in the order they are saved """
+
+	suffix = '.png'
+
+	def __init__(self, fail = False):
+		self.fail = fail
+		self.paths = []
+
+	def save(self, path, render):
+		if self.fail:
+			raise OSError('disk full')
+		self.paths.append(path)
+
+def test_batch_pipeline(monkeypatch):
+	np.random.seed(7)
+	iterate_attractor = batch.iterate_attractor
+	n_calls = []
+
+	def first_diverges(*args, **kwargs):
+		n_calls.append(1)
+		if len(n_calls) == 1:
+			return None, True
+		return iterate_attractor(*args, **kwargs)
+
+	monkeypatch.setattr(batch, 'iterate_attractor', first_diverges)
+	writer = RecordingWriter()
+	with WorkerPool(2) as pool:
+		pipeline = BatchPipeline(50_000, 32, 24, pool = pool, writer = writer)
+		assert pipeline.run(3) == 2
+
+	assert (pipeline.n_searched, pipeline.n_failed, pipeline.n_saved) == (3, 1, 2)
+	# images come out in search order, the diverged first attractor is skipped
+	seeds = [attractor.labels['seed'] for attractor in pipeline.metrics]
+	assert [path.name for path in writer.paths] == [f'D2-{seed}.png' for seed in seeds[1:]]
+
+def test_batch_pipeline_error():
+	np.random.seed(8)
+	with WorkerPool(2) as pool:
+		pipeline = BatchPipeline(50_000, 32, 24, pool = pool, writer = RecordingWriter(fail = True))
+		# the render stage fails, the other stages stop instead of blocking on full queues
+		with pytest.raises(OSError):
+			pipeline.run(5)
+	assert pipeline.n_saved == 0 and pipeline._stop.is_set()
@@ -0,0 +1,32 @@
+from attractor_finder import search_attractor
+from attractor_finder.catalog import AttractorCatalog
+from attractor_finder.functions import frame_bounds, set_aspect
+from attractor_finder.render import StreamingRenderPipeline
+
+import numpy as np
+
+def test_catalog(tmp_path):
+	catalog = AttractorCatalog(tmp_path / "catalog.sqlite")
+	coeffs, seed = search_attractor(dimension = 2, seed = 1, catalog = catalog)
+	entry, = catalog.find(seed = seed)
+	assert np.array_equal(entry['coeffs'], coeffs)
+	assert entry['extents'] is None
+	assert catalog.add(2, seed, coeffs) == entry['id']
+
+	np.random.seed(3)
+	pipeline = StreamingRenderPipeline(coeffs, 2, 100_000, 64, 48, pilot_iterates = 50_000)
+	catalog.update_render(2, coeffs, *pipeline.get_render_info())
+	entry = catalog.get(entry['id'])
+
+	cached = StreamingRenderPipeline(coeffs, 2, 100_000, 64, 48,
+		extents = entry['extents'], max_deltas = entry['max_deltas'])
+	assert not cached.error
+	assert cached._bounds == pipeline._bounds
+	assert np.array_equal(cached._max_deltas, pipeline._max_deltas)
+
+def test_frame_bounds():
+	np.random.seed(4)
+	x, y = np.random.normal(size = (2, 1000))
+	bounds = frame_bounds(x.min(), np.ptp(x), y.min(), np.ptp(y), 64, 48)
+	assert np.allclose(bounds, set_aspect(x, y, 64, 48))
+	assert np.isclose(bounds[2] / bounds[3], 64 / 48)
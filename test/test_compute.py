@@ -0,0 +1,58 @@
+from attractor_finder import search_attractor, compute_attractor, iterate_attractor
+from attractor_finder.compute import compute_attractor_omp, split_tasks, worker
+from attractor_finder.search import get_ncoeffs
+from attractor_finder.shared import SharedArray
+
+import numpy as np
+
+def test_split_tasks():
+	for render_iterates in (1000, 1001, 1017, 37):
+		tasks = split_tasks(render_iterates, 6, 4)
+		assert sum(k * n for k, n in tasks) == render_iterates
+		assert all(k in (1, 4) for k, _ in tasks)
+
+def test_exact_iterates():
+	np.random.seed(5)
+	coeffs, _ = search_attractor(dimension = 3, seed = 2)
+	for projected in (False, True):
+		itdata, error = compute_attractor(coeffs, 100_003, 3, n_processes = 2, n_orbits = 4, projected = projected)
+		assert not error
+		assert len(itdata) == 100_003
+		assert np.all(np.isfinite(itdata))
+
+def test_omp_iterates():
+	np.random.seed(5)
+	coeffs, _ = search_attractor(dimension = 2, seed = 2)
+	# the remainder of the split over the threads is iterated too
+	itdata, error = compute_attractor_omp(coeffs, 10_003, 2, n_threads = 4)
+	assert not error and len(itdata) == 10_003
+	assert np.all(np.isfinite(itdata))
+
+def test_diverged_task():
+	coeffs, _ = search_attractor(dimension = 2, seed = 1)
+	shared = SharedArray((200, 2))
+	x0 = np.ones((2, 3))
+	x0[:, 1:] = 100
+	diverged, summary = worker((100, coeffs, x0, 2, shared.handle, 0, 10, False, True, 16))
+	assert diverged and summary is None
+	shared.release()
+
+def test_distinct_orbits():
+	np.random.seed(6)
+	coeffs, _ = search_attractor(dimension = 3, seed = 2)
+	# 128 orbits, more than the 100 rows a check run of 1 % would give
+	itdata, error = compute_attractor(coeffs, 20_000, 3, n_processes = 2, n_orbits = 16)
+	assert not error
+	first_rows, offset = [], 0
+	for k, n in split_tasks(20_000, 8, 16):
+		first_rows += [itdata[offset + o * n] for o in range(k)]
+		offset += k * n
+	assert len(np.unique(np.asarray(first_rows), axis = 0)) == len(first_rows) == 128
+
+def test_diverged():
+	# x' = 2 + x^2 escapes to infinity from every starting point
+	coeffs = np.zeros(get_ncoeffs(2))
+	coeffs[0], coeffs[3], coeffs[11] = 2, 1, 1
+	assert compute_attractor(coeffs, 100_000, 2, n_processes = 2) == (None, True)
+	assert iterate_attractor(coeffs, 100_000, 2, n_processes = 2) == (None, True)
+	assert compute_attractor_omp(coeffs, 100_000, 2, n_threads = 1) == (None, True)
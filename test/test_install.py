@@ -1,6 +1,22 @@
-from attractor_finder import search_attractor
+from attractor_finder import search_attractor, search_attractor_parallel
 
+from pathlib import Path
 import numpy as np
+import subprocess
+import sys
+
+SCRIPTS = Path(__file__).parent.parent / 'scripts'
+
+# run a script with --help and print the attractor_finder modules and numba if they were imported
+HELP_MODULES = """
+import runpy, sys
+sys.argv = [sys.argv[1], '--help']
+try:
+	runpy.run_path(sys.argv[0], run_name='__main__')
+except SystemExit:
+	pass
+print(' '.join(sorted(name for name in sys.modules if name.startswith('attractor_finder.') or name == 'numba')))
+"""
 
 def test_search_seed():
 	coeffs1, _ = search_attractor(dimension = 2, seed = 1)
@@ -8,3 +24,29 @@ def test_search_seed():
 	assert np.allclose(coeffs1, coeffs2)
 
 
+def test_search_parallel_seed():
+	hits1, _ = search_attractor_parallel(dimension = 2, n_workers = 2, n_hits = 2, seed = 1)
+	hits2, _ = search_attractor_parallel(dimension = 2, n_workers = 2, n_hits = 2, seed = 1)
+	assert len(hits1) == 2
+	for coeffs1, coeffs2 in zip(hits1, hits2):
+		assert np.allclose(coeffs1, coeffs2)
+
+
+def test_help_imports():
+	kernels = {'iterator', 'iterator_sparse', 'renderer', 'renderer_batch', 'renderer_hist', 'renderer_omp',
+		'renderer_stream', 'functions', 'functions_numba', 'numba'}
+	for script in ('main.py', 'rerender.py', 'animate.py', 'retone.py'):
+		result = subprocess.run([sys.executable, '-c', HELP_MODULES, str(SCRIPTS / script)],
+			capture_output = True, text = True, check = True)
+		imported = {name.removeprefix('attractor_finder.') for name in result.stdout.splitlines()[-1].split()}
+		assert not imported & kernels, script
+
+
+def test_ignored_options():
+	# options the chosen render mode would skip are rejected before anything runs
+	for options, message in ((['--histogram', '--threads', '2'], '--histogram can not be combined with --threads'),
+		(['--histogram', '--tile_budget', '1'], '--histogram can not be combined with --tile_budget'),
+		(['--compact', '--stream'], '--compact can not be combined with --stream'),
+		(['--burn_order', 'tile', '--threads', '2', '--views', '3'], '--threads can not be combined with --views')):
+		result = subprocess.run([sys.executable, str(SCRIPTS / 'main.py'), *options], capture_output = True, text = True)
+		assert result.returncode == 2 and message in result.stderr, options
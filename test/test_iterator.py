@@ -0,0 +1,77 @@
+from attractor_finder.iterator import iterator, iterator_batch, iterator_optimized, iterator_orbits_omp
+from attractor_finder.iterator_sparse import iterator_multi, iterator_multi_projected, iterator_projected, iterator_sparse
+from attractor_finder.search import get_ncoeffs
+
+import numpy as np
+
+def test_iterator_batch():
+	np.random.seed(0)
+	coeffs = np.random.randint(-10, 11, (64, get_ncoeffs(2)))/14
+	x0 = np.random.uniform(-1e-1, 1e-1, (64, 3))
+	itdata, status = iterator_batch(2000, coeffs, x0, 2)
+	itdata, status = np.asarray(itdata), np.asarray(status)
+
+	for c in range(64):
+		ref = np.asarray(iterator(2000, coeffs[c], x0[c], 2))
+		if status[c] == 0:
+			assert np.allclose(ref, itdata[c])
+		elif status[c] == 1:
+			assert not np.all(np.abs(ref[-1]) < 1e6)
+
+def test_iterator_orbits_omp():
+	np.random.seed(1)
+	coeffs = np.random.randint(-10, 11, get_ncoeffs(2))/14
+	x0 = np.random.uniform(-1e-1, 1e-1, (3, 3))
+	itdata = np.asarray(iterator_orbits_omp(500, coeffs, x0, 2, 2))
+	for o in range(3):
+		ref = np.asarray(iterator_optimized(500, coeffs, x0[o], 2))
+		assert np.allclose(ref, itdata[o * 500:(o + 1) * 500], equal_nan = True)
+
+	# the first two orbits run one more iteration
+	itdata = np.asarray(iterator_orbits_omp(500, coeffs, x0, 2, 2, 2))
+	assert len(itdata) == 1502
+	for o, (i0, i1) in enumerate(((0, 501), (501, 1002), (1002, 1502))):
+		ref = np.asarray(iterator_optimized(i1 - i0, coeffs, x0[o], 2))
+		assert np.allclose(ref, itdata[i0:i1], equal_nan = True)
+
+def test_iterator_sparse():
+	np.random.seed(2)
+	for dimension in range(2, 8):
+		ncoeffs = get_ncoeffs(dimension)
+		coeffs = np.random.randint(-10, 11, ncoeffs)/(10 + 2 * dimension)
+		x0 = np.random.uniform(-1e-1, 1e-1, dimension + 1)
+		ref = np.asarray(iterator_optimized(20, coeffs, x0, dimension))
+		itdata = np.asarray(iterator_sparse(20, coeffs, x0, dimension))
+		assert np.allclose(ref, itdata, equal_nan = True)
+
+def test_iterator_multi():
+	np.random.seed(3)
+	for dimension in range(2, 6):
+		ncoeffs = get_ncoeffs(dimension)
+		coeffs = np.random.randint(-10, 11, ncoeffs)/(10 + 2 * dimension)
+		x0 = np.random.uniform(-1e-1, 1e-1, (5, dimension + 1))
+		itdata = np.asarray(iterator_multi(20, coeffs, x0, dimension))
+		for o in range(5):
+			ref = np.asarray(iterator_sparse(20, coeffs, x0[o], dimension))
+			assert np.allclose(ref, itdata[o * 20:(o + 1) * 20], equal_nan = True)
+
+def test_iterator_projected():
+	np.random.seed(4)
+	for dimension in range(2, 7):
+		ncoeffs = get_ncoeffs(dimension)
+		coeffs = np.random.randint(-10, 11, ncoeffs)/(10 + 2 * dimension)
+		columns = ((dimension - 3) % dimension, (dimension - 2) % dimension, (dimension - 1) % dimension)
+		x0 = np.random.uniform(-1e-1, 1e-1, (3, dimension + 1))
+		x0[:, 0] = 1
+		ref = [np.asarray(iterator_sparse(25, coeffs, x0[o], dimension))[5:, columns] for o in range(3)]
+
+		itdata = np.asarray(iterator_projected(20, coeffs, x0[0], dimension, columns, n_discard = 5))
+		assert np.allclose(ref[0], itdata, equal_nan = True)
+		itdata = np.asarray(iterator_projected(20, coeffs, x0[0], dimension, columns, 5, np.float32))
+		assert itdata.dtype == np.float32
+		with np.errstate(over = 'ignore'):
+			assert np.array_equal(ref[0].astype(np.float32), itdata, equal_nan = True)
+
+		itdata = np.asarray(iterator_multi_projected(20, coeffs, x0, dimension, columns, n_discard = 5))
+		for o in range(3):
+			assert np.allclose(ref[o], itdata[o * 20:(o + 1) * 20], equal_nan = True)
@@ -0,0 +1,96 @@
+from attractor_finder import metrics
+from attractor_finder.jobs import JobQueue, seed_jobs
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import importlib.util
+import os
+import time
+
+def load_main():
+	""" scripts/main.py as a module """
+	spec = importlib.util.spec_from_file_location('main', Path(__file__).parent.parent / 'scripts' / 'main.py')
+	main = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(main)
+	return main
+
+class NullWriter():
+	def flush(self):
+		pass
+
+def drain(args):
+	""" claim and complete jobs until the queue is empty, returns the ids worked on """
+	directory, worker = args
+	job_queue = JobQueue(directory)
+	ids = []
+	while (job := job_queue.claim(worker)) is not None:
+		ids.append(job['id'])
+		job_queue.complete(job, {'seeds': job['seeds']})
+	return ids
+
+def test_seed_jobs():
+	jobs = seed_jobs(25, 10, 100)
+	assert [job['id'] for job in jobs] == ['job-0000000100-0000000109', 'job-0000000110-0000000119',
+		'job-0000000120-0000000124']
+	assert sum((job['seeds'] for job in jobs), []) == list(range(100, 125))
+
+def test_submit_seeds(tmp_path):
+	job_queue = JobQueue(tmp_path)
+	assert job_queue.submit(seed_jobs(20, 10, 1)) == 2
+	# the same seeds again are known, a second batch from another seed is queued
+	assert job_queue.submit(seed_jobs(20, 10, 1)) == 0
+	assert job_queue.submit(seed_jobs(20, 10, 5000)) == 2
+
+def test_claim_once(tmp_path):
+	job_queue = JobQueue(tmp_path)
+	assert job_queue.submit(seed_jobs(200, 1, 0)) == 200
+	with ProcessPoolExecutor(4) as executor:
+		claimed = list(executor.map(drain, [(tmp_path, f'worker{w}') for w in range(4)]))
+
+	# every job is worked on by exactly one worker
+	ids = sorted(sum(claimed, []))
+	assert ids == [f'job-{k:010d}-{k:010d}' for k in range(200)]
+	assert job_queue.status() == {'pending': 0, 'claimed': 0, 'done': 200, 'failed': 0}
+	assert [result['result']['seeds'] for result in job_queue.results()] == [[k] for k in range(200)]
+
+	# a restarted coordinator does not queue finished work again
+	assert job_queue.submit(seed_jobs(210, 1, 0)) == 10
+
+def test_requeue_stale(tmp_path):
+	job_queue = JobQueue(tmp_path)
+	job_queue.submit(seed_jobs(3, 1, 0))
+	crashed = job_queue.claim('crashed')
+	alive = job_queue.claim('alive')
+	assert job_queue.requeue_stale(60) == 0
+
+	# the crashed worker stops sending heartbeats
+	old = time.time() - 120
+	for job in (crashed, alive):
+		os.utime(job_queue._claim_path(job), (old, old))
+	job_queue.heartbeat(alive)
+	assert job_queue.requeue_stale(60) == 1
+	assert not job_queue.heartbeat(crashed)
+
+	assert job_queue.claim('restarted')['id'] == crashed['id']
+	job_queue.release(alive)
+	assert job_queue.status() == {'pending': 2, 'claimed': 1, 'done': 0, 'failed': 0}
+
+def test_work_jobs_requeued(tmp_path):
+	job_queue = JobQueue(tmp_path)
+	job_queue.submit(seed_jobs(2, 2, 0))
+	generated = []
+
+	def generate(i, seed):
+		generated.append(seed)
+		if len(generated) == 1:
+			# the worker stalls on its first attractor until the claim is requeued
+			claim, = (tmp_path / 'claimed').glob('*.json')
+			old = time.time() - 120
+			os.utime(claim, (old, old))
+			assert job_queue.requeue_stale(60) == 1
+		return metrics.Metrics({'seed': seed})
+
+	load_main().work_jobs(job_queue, generate, NullWriter(), 60)
+	# the requeued job is abandoned, claimed again and done from its first seed
+	assert generated == [0, 0, 1]
+	assert job_queue.status() == {'pending': 0, 'claimed': 0, 'done': 1, 'failed': 0}
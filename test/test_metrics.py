@@ -0,0 +1,47 @@
+from attractor_finder import metrics, search_attractor, iterate_attractor
+from attractor_finder.render import AttractorRenderPipeline
+
+import csv
+import json
+import threading
+
+def test_collecting():
+	outer, inner = metrics.Metrics({'name': 'outer'}), metrics.Metrics()
+	with metrics.collecting(outer):
+		metrics.count('a')
+		with metrics.collecting(inner):
+			with metrics.span('s'):
+				metrics.count('a', 2)
+		# other threads record into their own collectors
+		thread = threading.Thread(target=metrics.count, args=('a', 100))
+		thread.start()
+		thread.join()
+	metrics.count('a', 1000)
+
+	assert outer.counters == {'a': 3} and inner.counters == {'a': 2}
+	assert outer.spans['s'][0] == 1 and 's' in inner.spans
+	merged = metrics.Metrics.merge_all([outer, inner])
+	assert merged.counters['a'] == 5 and merged.spans['s'][0] == 2
+
+def test_pipeline_metrics(tmp_path):
+	with metrics.collecting(metrics.Metrics({'attractor': 0})) as attractor:
+		coeffs, seed = search_attractor(dimension = 2, seed = 3)
+		trajectory, error = iterate_attractor(coeffs, 100_000, 2, n_processes = 2)
+		pipeline = AttractorRenderPipeline(trajectory, 64, 48)
+		pipeline.construct_args_list_burn()
+		pipeline.burn_pool()
+		pipeline.release_shared()
+
+	c = attractor.counters
+	assert c['hits'] == 1
+	rejected = sum(n for name, n in c.items() if name.startswith('rejected_'))
+	assert c['candidates'] > rejected > 0
+	assert c['iterations'] >= 100_000 and c['points_burned'] == 100_000 - 1
+	assert c['bytes_to_workers'] > 0
+	assert {'search', 'iterate', 'burn'} <= set(attractor.spans)
+
+	metrics.write_metrics(tmp_path / 'm.json', [attractor])
+	metrics.write_metrics(tmp_path / 'm.csv', [attractor])
+	assert json.loads((tmp_path / 'm.json').read_text())['batch']['counters']['hits'] == 1
+	rows = list(csv.DictReader(open(tmp_path / 'm.csv')))
+	assert [row['attractor'] for row in rows] == ['0', 'batch']
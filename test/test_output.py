@@ -0,0 +1,51 @@
+from attractor_finder.output import ImageWriter, encode_png, encode_tiff, quantize_image
+
+import numpy as np
+import pytest
+import struct
+import zlib
+
+def decode_png(data):
+	chunks, pos = {}, 8
+	while pos < len(data):
+		n, tag = struct.unpack('>I4s', data[pos:pos + 8])
+		chunks[tag] = chunks.get(tag, b'') + data[pos + 8:pos + 8 + n]
+		pos += 12 + n
+	xres, yres, bit_depth = struct.unpack('>IIB', chunks[b'IHDR'][:9])
+	rows = np.frombuffer(zlib.decompress(chunks[b'IDAT']), np.uint8).reshape(yres, -1)
+	assert np.all(rows[:, 0] == 0)
+	dtype = np.uint8 if bit_depth == 8 else np.dtype('>u2')
+	return rows[:, 1:].copy().view(dtype).reshape(yres, xres, 3)
+
+def test_quantize():
+	render = np.array([[[0.0, 0.5, 1.0], [-0.1, 1.1, np.nan]]])
+	assert quantize_image(render).tolist() == [[[0, 128, 255], [0, 255, 0]]]
+	assert quantize_image(render, 16).tolist() == [[[0, 32768, 65535], [0, 65535, 0]]]
+
+def test_encode_png():
+	render = np.random.default_rng(0).uniform(0, 1, (37, 53, 3))
+	for bit_depth in (8, 16):
+		for compression in (0, 6):
+			image = decode_png(encode_png(render, bit_depth, compression))
+			assert np.array_equal(image, quantize_image(render, bit_depth))
+
+def test_encode_tiff():
+	Image = pytest.importorskip('PIL.Image')
+	import io
+	render = np.random.default_rng(1).uniform(0, 1, (37, 53, 3))
+	for compression in (0, 6):
+		image = np.asarray(Image.open(io.BytesIO(encode_tiff(render, 8, compression))))
+		assert np.array_equal(image, quantize_image(render))
+
+def test_image_writer(tmp_path):
+	render = np.full((8, 8, 3), 0.5)
+	with ImageWriter() as writer:
+		writer.save(tmp_path / 'a.png', render)
+		writer.save(tmp_path / 'b.png', render)
+	assert writer.n_saved == 2
+	assert np.array_equal(decode_png((tmp_path / 'b.png').read_bytes()), quantize_image(render))
+
+	writer = ImageWriter()
+	writer.save(tmp_path / 'missing' / 'c.png', render)
+	with pytest.raises(FileNotFoundError):
+		writer.close()
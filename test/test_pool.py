@@ -0,0 +1,57 @@
+from attractor_finder import metrics
+from attractor_finder.pool import WorkerPool, available_cores, get_executor, get_n_workers
+
+import os
+import subprocess
+import sys
+import pytest
+
+# run a numba parallel kernel, then a temporary executor, the interpreter has to exit afterwards
+PARALLEL_THEN_POOL = """
+import numpy as np
+from attractor_finder.functions_numba import get_dx_numba_parallel
+from attractor_finder.pool import get_executor
+get_dx_numba_parallel(np.random.rand(1000))
+with get_executor(None, 2) as executor:
+	print(sum(executor.map(abs, range(-4, 4))))
+"""
+
+def worker_pid(_):
+	return os.getpid()
+
+def test_get_n_workers():
+	assert get_n_workers(None, 3) == 3
+	assert get_n_workers(None) == available_cores()
+
+def test_pool_reuse():
+	# workers run warm_up when they start, a failing warm up breaks the pool
+	with WorkerPool(2) as pool:
+		assert get_n_workers(pool) == 2 and get_n_workers(pool, 5) == 5
+		pids = set()
+		for _ in range(3):
+			with metrics.collecting(metrics.Metrics()) as collected, get_executor(pool, 2) as executor:
+				pids.update(executor.map(worker_pid, range(8)))
+			assert collected.counters['bytes_to_workers'] > 0
+		# every stage runs in the same two workers, none of them is this process
+		assert 1 <= len(pids) <= 2 and os.getpid() not in pids
+
+		with get_executor(pool, 2) as executor:
+			pass
+		# leaving the context does not shut the shared pool down
+		assert pool.submit(worker_pid, 0).result() in pids
+
+def test_temporary_executor():
+	with get_executor(None, 2) as executor:
+		pids = set(executor.map(worker_pid, range(8)))
+		assert 1 <= len(pids) <= 2 and os.getpid() not in pids
+	# the temporary executor is shut down with the context
+	with pytest.raises(RuntimeError):
+		executor.submit(worker_pid, 0)
+
+def test_parallel_kernels_then_pool():
+	# forked workers inherit the thread pool of the parallel kernels, with numba's tbb layer the
+	# interpreter then deadlocks at exit, the workers start from a fresh interpreter instead
+	env = {key: value for key, value in os.environ.items() if key != 'NUMBA_THREADING_LAYER'}
+	result = subprocess.run([sys.executable, '-c', PARALLEL_THEN_POOL], env = env,
+		capture_output = True, text = True, timeout = 120)
+	assert result.returncode == 0 and result.stdout.split() == ['16']
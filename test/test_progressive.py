@@ -0,0 +1,102 @@
+from attractor_finder import search_attractor
+from attractor_finder.progressive import ProgressiveRenderPipeline
+
+import numpy as np
+import pytest
+
+def test_progressive_resume(tmp_path):
+	coeffs, _ = search_attractor(dimension = 2, seed = 1)
+
+	np.random.seed(3)
+	pipeline = ProgressiveRenderPipeline(coeffs, 2, 300_000, 64, 48, chunk_iterates = 100_000, pilot_iterates = 50_000,
+		checkpoint_interval = 0)
+	pipeline.n_processes = 2
+	pipeline.start(1, tmp_path / "full", n_orbits = 2)
+	for _ in range(3):
+		pipeline.progressive_chunk()
+	assert pipeline.finished()
+	assert pipeline._hist['counts'].sum() + pipeline._n_outside == 300_000
+
+	np.random.seed(3)
+	interrupted = ProgressiveRenderPipeline(coeffs, 2, 300_000, 64, 48, chunk_iterates = 100_000, pilot_iterates = 50_000,
+		checkpoint_interval = 0)
+	interrupted.n_processes = 2
+	interrupted.start(1, tmp_path / "resumed", n_orbits = 2)
+	interrupted.progressive_chunk()
+	interrupted.release_shared()
+
+	resumed = ProgressiveRenderPipeline.resume(tmp_path / "resumed")
+	resumed.n_processes = 2
+	assert resumed._iterations == 100_000
+	while not resumed.finished():
+		resumed.progressive_chunk()
+	assert np.array_equal(resumed._hist['counts'], pipeline._hist['counts'])
+	assert np.array_equal(resumed._hist['wsum'], pipeline._hist['wsum'])
+	assert resumed._noise[-1] < resumed._noise[-2]
+	pipeline.release_shared()
+	resumed.release_shared()
+
+def test_progressive_resume_merge(tmp_path, monkeypatch):
+	coeffs, _ = search_attractor(dimension = 2, seed = 1)
+	pipelines = {}
+	for name in ('full', 'crashed'):
+		np.random.seed(3)
+		pipeline = ProgressiveRenderPipeline(coeffs, 2, 300_000, 64, 48, chunk_iterates = 100_000, pilot_iterates = 50_000,
+		checkpoint_interval = 0)
+		pipeline.n_processes = 2
+		pipeline.start(1, tmp_path / name, n_orbits = 2)
+		pipeline.progressive_chunk()
+		pipelines[name] = pipeline
+
+	# the histogram of the second chunk is copied, the process dies before the orbit state is written
+	crashed = pipelines['crashed']
+	def crash():
+		raise KeyboardInterrupt
+	monkeypatch.setattr(crashed, '_write_state', crash)
+	with pytest.raises(KeyboardInterrupt):
+		crashed.progressive_chunk()
+	crashed.release_shared()
+
+	# resume goes back to the checkpoint of the first chunk and repeats the second one
+	resumed = ProgressiveRenderPipeline.resume(tmp_path / "crashed")
+	resumed.n_processes = 2
+	assert resumed._iterations == 100_000
+	assert sorted(path.name for path in (tmp_path / "crashed").iterdir()) == ['counts.0.npy', 'counts.1.npy', 'state.npz', 'wsum.0.npy', 'wsum.1.npy']
+	full = pipelines['full']
+	while not full.finished():
+		full.progressive_chunk()
+		resumed.progressive_chunk()
+	assert resumed.finished()
+	assert np.array_equal(resumed._hist['counts'], full._hist['counts'])
+	assert np.array_equal(resumed._hist['wsum'], full._hist['wsum'])
+	full.release_shared()
+	resumed.release_shared()
+
+def test_progressive_checkpoint_interval(tmp_path, monkeypatch):
+	coeffs, _ = search_attractor(dimension = 2, seed = 1)
+	np.random.seed(3)
+	pipeline = ProgressiveRenderPipeline(coeffs, 2, 300_000, 64, 48, chunk_iterates = 100_000, pilot_iterates = 50_000,
+		checkpoint_interval = 3600)
+	pipeline.n_processes = 2
+	checkpoint_dir = tmp_path / 'render.ckpt'
+	pipeline.start(1, checkpoint_dir, n_orbits = 2)
+	(checkpoint_dir / 'notes.txt').write_text('not part of the checkpoint')
+	pipeline.progressive_chunk()
+	pipeline.progressive_chunk()
+
+	# nothing is written between checkpoints, a resume starts over
+	resumed = ProgressiveRenderPipeline.resume(checkpoint_dir)
+	assert resumed._iterations == 0 and resumed._hist['counts'].sum() == 0
+	resumed.release_shared()
+
+	pipeline.checkpoint()
+	resumed = ProgressiveRenderPipeline.resume(checkpoint_dir)
+	assert resumed._iterations == 200_000
+	assert np.array_equal(resumed._hist['wsum'], pipeline._hist['wsum'])
+	resumed.release_shared()
+
+	# only the files of the checkpoint are removed, the directory stays with the notes in it
+	monkeypatch.setattr(pipeline, '_output_path', lambda seed, suffix: tmp_path / f'D2-{seed}{suffix}')
+	pipeline.render_attractor()
+	assert (tmp_path / 'D2-1.png').exists()
+	assert [path.name for path in checkpoint_dir.iterdir()] == ['notes.txt']
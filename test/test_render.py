@@ -0,0 +1,138 @@
+from attractor_finder import search_attractor, compute_attractor, iterate_attractor
+from attractor_finder.histogram import Histogram
+from attractor_finder.render import AttractorRenderPipeline
+from attractor_finder.renderer_batch import compute_burn_inline, compute_burn_sorted, compute_render_slice
+
+import numpy as np
+
+def test_render_modes():
+	# a 3d trajectory stacks 16 orbits per task, the jumps between them must not change colours
+	np.random.seed(3)
+	coeffs, _ = search_attractor(dimension = 3, seed = 1)
+	trajectory, error = iterate_attractor(coeffs, 200_000, 3, n_processes = 2)
+	assert not error
+
+	pipeline = AttractorRenderPipeline(trajectory, 64, 48)
+	assert np.array_equal(pipeline._max_deltas, trajectory.summary.max_steps)
+	n = len(pipeline._xa)
+	bounds = pipeline._bounds
+
+	def burn(i0, i1):
+		""" burn of points i0 <= i < i1, the point before i0 provides the first delta """
+		return np.asarray(compute_burn_inline(64, 48,
+			pipeline._xa[i0-1:i1], pipeline._ya[i0-1:i1], pipeline._za[i0-1:i1],
+			bounds['xrng'], bounds['xmin'], bounds['yrng'], bounds['ymin'], bounds['zrng'], bounds['zmin'],
+			pipeline.alpha, pipeline._max_deltas, pipeline._burn_factors))
+
+	render = np.asarray(compute_render_slice(64, 48, 0, 48, pipeline._bgcolor, burn(1, n)))
+
+	pipeline.n_processes = 1
+	pipeline.construct_args_list_burn()
+	pipeline.burn_pool()
+	pipeline.construct_args_list_pixel()
+	pipeline.pixel_pool()
+	assert np.allclose(pipeline._render, render)
+	# the workers map the buffer the trajectory was iterated into, it is not copied
+	assert pipeline._args_list_burn[0][0] == (trajectory.shared.handle, trajectory.columns)
+
+	pipeline._one_pass_render()
+	assert np.allclose(pipeline._render, render)
+
+	pipeline.n_processes = 2
+	pipeline.construct_args_list_tile(memory_budget = 2 * 64 * 3 * 8 * 5)
+	assert len(pipeline._args_list_tile) == 10
+	# the tiles split the binned points between them instead of all scanning every point
+	bands = [args[3:5] for args in pipeline._args_list_tile]
+	assert all(b1 == b0 for (_, b1), (b0, _) in zip(bands, bands[1:]))
+	assert bands[0][0] == 0 and bands[-1][1] == n
+	pipeline.tile_pool()
+	assert np.allclose(pipeline._render, render)
+
+	pipeline.burn_omp(n_threads = 1)
+	pipeline.pixel_omp(n_threads = 1)
+	assert np.allclose(pipeline._render, render)
+
+	# every thread burns a contiguous half into its own buffer, the buffers are multiplied
+	pipeline.burn_omp(n_threads = 2)
+	pipeline.pixel_omp(n_threads = 2)
+	half = 1 + (n - 1) // 2
+	render = np.asarray(compute_render_slice(64, 48, 0, 48, pipeline._bgcolor, burn(1, half) * burn(half, n)))
+	assert np.allclose(pipeline._render, render)
+	pipeline.release_shared()
+
+def test_histogram_render(tmp_path):
+	np.random.seed(3)
+	coeffs, _ = search_attractor(dimension = 2, seed = 1)
+	itdata, error = compute_attractor(coeffs, 200_000, 2, n_processes = 2)
+	pipeline = AttractorRenderPipeline(itdata, 64, 48)
+	pipeline.n_processes = 2
+	pipeline.construct_args_list_burn()
+	pipeline.burn_pool()
+	pipeline.construct_args_list_pixel()
+	pipeline.pixel_pool()
+	render = np.copy(pipeline._render)
+
+	pipeline.construct_args_list_hist()
+	pipeline.hist_pool()
+	pipeline.tone_map_histogram()
+	assert pipeline._histogram.counts.sum() == len(pipeline._xa) - 1
+	assert np.abs(pipeline._render - render).mean() < 0.03
+
+	# the tone map follows a single burn of the whole trajectory pixel by pixel
+	bounds = pipeline._bounds
+	burn = compute_burn_inline(64, 48, pipeline._xa, pipeline._ya, pipeline._za,
+		bounds['xrng'], bounds['xmin'], bounds['yrng'], bounds['ymin'], bounds['zrng'], bounds['zmin'],
+		pipeline.alpha, pipeline._max_deltas, pipeline._burn_factors)
+	render = np.asarray(compute_render_slice(64, 48, 0, 48, pipeline._bgcolor, burn))
+	assert np.abs(pipeline._render - render).max() < 2e-3
+
+	pipeline._histogram.save(tmp_path / "hist.npz")
+	histogram = Histogram.load(tmp_path / "hist.npz")
+	assert np.array_equal(histogram.tone_map(), pipeline._render)
+	assert np.all(histogram.tone_map(alpha = 0.1) <= pipeline._render)
+	pipeline.release_shared()
+
+def test_compact_render():
+	coeffs, _ = search_attractor(dimension = 2, seed = 1)
+	renders = []
+	for projected in (False, True):
+		np.random.seed(3)
+		trajectory, error = iterate_attractor(coeffs, 200_000, 2, n_processes = 2,
+			projected = projected, dtype = np.float32 if projected else np.float64)
+		assert not error
+		pipeline = AttractorRenderPipeline(trajectory, 64, 48)
+		pipeline.n_processes = 2
+		pipeline.construct_args_list_burn()
+		pipeline.burn_pool()
+		pipeline.construct_args_list_pixel()
+		pipeline.pixel_pool()
+		renders.append(np.copy(pipeline._render))
+		pipeline.release_shared()
+
+	assert trajectory.data.shape == (200_000, 3) and trajectory.data.dtype == np.float32
+	assert np.abs(renders[0] - renders[1]).mean() < 0.01
+
+def test_sorted_burn():
+	np.random.seed(4)
+	coeffs, _ = search_attractor(dimension = 2, seed = 1)
+	itdata, error = compute_attractor(coeffs, 100_000, 2, n_processes = 2)
+	pipeline = AttractorRenderPipeline(itdata, 64, 48, percentiles = (5, 95))
+	bounds = pipeline._bounds
+	args = (64, 48, pipeline._xa, pipeline._ya, pipeline._za,
+		bounds['xrng'], bounds['xmin'], bounds['yrng'], bounds['ymin'], bounds['zrng'], bounds['zmin'],
+		pipeline.alpha, pipeline._max_deltas, pipeline._burn_factors)
+
+	# points outside the percentile frame are skipped by both, pixels keep their orbit order
+	burn = np.asarray(compute_burn_inline(*args))
+	for tile_size, chunk_size in ((7, 1000), (16, 2**20), (64, 1)):
+		assert np.array_equal(burn, compute_burn_sorted(*args, tile_size = tile_size, chunk_size = chunk_size))
+
+	renders = []
+	for burn_order in ('orbit', 'tile'):
+		pipeline = AttractorRenderPipeline(itdata, 64, 48, burn_order = burn_order)
+		pipeline.n_processes = 2
+		pipeline.construct_args_list_burn()
+		pipeline.burn_pool()
+		renders.append(np.copy(pipeline._full_burn))
+		pipeline.release_shared()
+	assert np.array_equal(*renders)
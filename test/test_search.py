@@ -0,0 +1,40 @@
+from attractor_finder import search_attractor
+from attractor_finder.functions import orbit_stats
+from attractor_finder.iterator import iterator_optimized
+from attractor_finder.search import find_hits, get_ncoeffs
+
+from collections import Counter
+import numpy as np
+
+X0 = np.array([1, 0.05, 0.05])
+
+def periodic_coeffs():
+	""" x' = 1 - 1.2 x^2, y' = x, every orbit near the origin ends on a stable 2-cycle """
+	coeffs = np.zeros(get_ncoeffs(2))
+	coeffs[0], coeffs[3], coeffs[11] = 1, -1.2, 1
+	return coeffs
+
+def fixed_point_coeffs():
+	""" x' = x / 2, y' = y / 2 """
+	coeffs = np.zeros(get_ncoeffs(2))
+	coeffs[1], coeffs[12] = 0.5, 0.5
+	return coeffs
+
+def test_orbit_stats():
+	chaotic, _ = search_attractor(dimension = 2, seed = 3)
+	orbit = np.asarray(iterator_optimized(3000, chaotic, X0, 2))[1000:]
+	fill, lyapunov = orbit_stats(orbit, chaotic, 2)
+	assert fill > 1.5 and lyapunov > 0
+
+	orbit = np.asarray(iterator_optimized(3000, periodic_coeffs(), X0, 2))[1000:]
+	fill, lyapunov = orbit_stats(orbit, periodic_coeffs(), 2)
+	# two points of the cycle on a 320 x 320 grid
+	assert fill == 100 * 2 / 320**2 and lyapunov < 0
+
+def test_find_hits():
+	chaotic, _ = search_attractor(dimension = 2, seed = 3)
+	coeffs = np.stack([fixed_point_coeffs(), periodic_coeffs(), chaotic])
+	counts = Counter()
+	hits = find_hits(coeffs, np.tile(X0, (3, 1)), 2, 2000, max_hits = 3, counts = counts)
+	assert [c for c, _, _ in hits] == [2]
+	assert counts['rejected_fixed_point'] == 1 and counts['rejected_density'] == 1
@@ -0,0 +1,61 @@
+from attractor_finder import shared
+from attractor_finder.shared import SharedArray, attach_shared, release_path
+
+import errno
+import os
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+def test_shared_array():
+	array = SharedArray((10, 3), np.float32, fill = 2)
+	assert os.path.getsize(array.path) == 120
+	attached = attach_shared(array.handle)
+	attached[0] = 1
+	assert array.array[0, 0] == 1 and array.array[1, 0] == 2
+	array.release()
+	assert not os.path.exists(array.path) and array.path not in shared._live_paths
+
+@pytest.mark.skipif(shared.SHARED_DIR is None, reason = 'no /dev/shm')
+def test_small_shm(monkeypatch):
+	# a 64 MB /dev/shm (docker's default) can not hold the array, it goes to the temp directory
+	monkeypatch.setattr(shared.os, 'statvfs', lambda path: SimpleNamespace(f_bavail = 2**14, f_frsize = 4096))
+	array = SharedArray((2**24,))
+	assert os.path.dirname(array.path) == tempfile.gettempdir()
+	array.release()
+
+	# /dev/shm filled up between the check and the allocation
+	monkeypatch.undo()
+	posix_fallocate = os.posix_fallocate
+	calls = []
+
+	def fallocate(fd, offset, nbytes):
+		calls.append(fd)
+		if len(calls) == 1:
+			raise OSError(errno.ENOSPC, 'No space left on device')
+		posix_fallocate(fd, offset, nbytes)
+
+	monkeypatch.setattr(shared.os, 'posix_fallocate', fallocate)
+	live_paths = set(shared._live_paths)
+	array = SharedArray((100,), fill = 1)
+	assert len(calls) == 2 and os.path.dirname(array.path) == tempfile.gettempdir()
+	# the file in /dev/shm is removed again
+	assert shared._live_paths - live_paths == {array.path}
+	assert array.array.sum() == 100
+	array.release()
+
+def test_release_failed(monkeypatch):
+	array = SharedArray((4,))
+
+	def remove(path):
+		raise PermissionError(errno.EACCES, 'The process cannot access the file')
+
+	# the file is still mapped (windows), it stays registered for the exit handler
+	monkeypatch.setattr(shared.os, 'remove', remove)
+	release_path(array.path)
+	assert array.path in shared._live_paths
+	monkeypatch.undo()
+	release_path(array.path)
+	assert array.path not in shared._live_paths and not os.path.exists(array.path)
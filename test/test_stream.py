@@ -0,0 +1,19 @@
+from attractor_finder import search_attractor
+from attractor_finder.render import StreamingRenderPipeline
+
+import numpy as np
+
+def test_stream_render():
+	np.random.seed(3)
+	coeffs, _ = search_attractor(dimension = 2, seed = 1)
+	pipeline = StreamingRenderPipeline(coeffs, 2, 200_000, 64, 48, pilot_iterates = 50_000)
+	assert not pipeline.error
+
+	pipeline.n_processes = 2
+	pipeline.construct_args_list_stream()
+	assert sum(params[0] for _, _, params in pipeline._args_list_stream) == 200_000
+
+	pipeline.stream_pool()
+	assert pipeline._full_burn.shape == (48, 64, 3)
+	assert np.all(np.isfinite(pipeline._full_burn))
+	assert np.count_nonzero(pipeline._full_burn < 1) > 0.01 * 48 * 64 * 3
@@ -0,0 +1,43 @@
+from attractor_finder import search_attractor, iterate_attractor
+from attractor_finder.render import AttractorRenderPipeline
+from attractor_finder.summary import OrbitSummary, projection_columns
+
+import numpy as np
+
+def test_worker_summary():
+	np.random.seed(3)
+	coeffs, _ = search_attractor(dimension = 3, seed = 2)
+	trajectory, error = iterate_attractor(coeffs, 400_000, 3, n_processes = 2, n_orbits = 4)
+	assert not error
+	itdata, summary = trajectory.data, trajectory.summary
+
+	xyz = itdata[:, projection_columns(3)]
+	assert np.array_equal(summary.mins, xyz.min(axis = 0))
+	assert np.array_equal(summary.maxs, xyz.max(axis = 0))
+
+	# 8 tasks of 4 orbits, steps between the stacked orbits are not part of the summary
+	orbits = itdata.reshape(32, -1, 3)[:, :, projection_columns(3)]
+	steps = np.abs(np.diff(orbits, axis = 1))
+	assert np.allclose(summary.max_steps, steps.max(axis = (0, 1)))
+	assert len(summary.samples) == 2 * 4096
+
+	pipeline = AttractorRenderPipeline(trajectory, 64, 48)
+	parent = AttractorRenderPipeline(itdata, 64, 48)
+	assert pipeline._bounds == parent._bounds
+	assert np.all(pipeline._max_deltas <= parent._max_deltas)
+	pipeline.release_shared()
+	parent.release_shared()
+
+def test_summary_merge():
+	np.random.seed(4)
+	data = np.random.normal(size = (1000, 3))
+	data[500, 1] = 50
+	halves = [OrbitSummary.from_data(data[:500], (0, 1, 2), n_samples = 500),
+		OrbitSummary.from_data(data[500:], (0, 1, 2), n_samples = 500)]
+	merged = OrbitSummary.merge_all(halves)
+	whole = OrbitSummary.from_data(data, (0, 1, 2), orbit_length = 500, n_samples = 1000)
+	assert np.array_equal(merged.mins, whole.mins)
+	assert np.array_equal(merged.maxs, whole.maxs)
+	assert np.array_equal(merged.max_steps, whole.max_steps)
+	assert merged.extents()['yrng'] > 50
+	assert merged.extents((1, 99))['yrng'] < 10
@@ -0,0 +1,30 @@
+from attractor_finder import search_attractor
+from attractor_finder.render import StreamingRenderPipeline
+from attractor_finder.views import MultiViewRenderPipeline, View
+
+import numpy as np
+
+def test_multi_view_render():
+	coeffs, _ = search_attractor(dimension = 4, seed = 84085810)
+	np.random.seed(3)
+	stream = StreamingRenderPipeline(coeffs, 4, 100_000, 64, 48, pilot_iterates = 50_000)
+	stream.n_processes = 2
+	stream.construct_args_list_stream()
+	stream.stream_pool()
+
+	views = [View.default(4, 64, 48), View.random(4, 40, 30, rng = np.random.default_rng(0)), View((0, 1, 2), 32, 32)]
+	np.random.seed(3)
+	pipeline = MultiViewRenderPipeline(coeffs, 4, 100_000, views, pilot_iterates = 50_000)
+	assert not pipeline.error
+	pipeline.n_processes = 2
+	pipeline.construct_args_list_views()
+	pipeline.views_pool()
+	pipeline.render_views()
+
+	# the default view is the same image as the single view streaming render
+	assert np.allclose(pipeline._full_burn[:64 * 48 * 3].reshape(48, 64, 3), stream._full_burn)
+	assert [render.shape for render in pipeline._renders] == [(48, 64, 3), (30, 40, 3), (32, 32, 3)]
+	for render in pipeline._renders[1:]:
+		assert np.count_nonzero(render < 0.8) > 0.01 * render.size
+	stream.release_shared()
+	pipeline.release_shared()